@@ -0,0 +1,76 @@
+import argparse
+import sys
+import tempfile
+import time
+from os.path import join
+
+import WDL
+
+from miniwdl_viz.miniwdl_parser import LITERAL_TYPES, MiniWDLParser
+from miniwdl_viz.synthetic import expressions_wdl
+
+
+class RecursiveParser(MiniWDLParser):
+    """The previous recursive walker, kept as the baseline"""
+
+    def get_referee_name(self, referee):
+        if isinstance(referee, WDL.Gather):
+            return referee.final_referee.workflow_node_id
+        return referee.workflow_node_id
+
+    def parse_input_item(self, input_item, node_ids):
+        if isinstance(input_item, WDL.Expr.Ident):
+            if (ref_name := self.get_referee_name(input_item.referee)) in node_ids:
+                ref = ref_name
+            else:
+                ref = "WorkflowInput"
+            return [{"name": f"{input_item.name}", "ref": f"{ref}", "type": "input"}]
+        elif isinstance(input_item, LITERAL_TYPES):
+            return [{"name": f"{input_item}", "ref": "HardcodedVariable", "type": "input"}]
+        elif isinstance(input_item, WDL.Expr.Base):
+            names = []
+            for child_input_item in input_item.children:
+                names.extend(self.parse_input_item(child_input_item, node_ids))
+            return names
+
+    def iter_input_items(self, input_item, node_ids):
+        for param in self.parse_input_item(input_item, node_ids):
+            yield param["name"], param["ref"], param["type"]
+
+
+def time_parser(parser_cls, doc, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser = parser_cls(doc)
+        parser.parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parser
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times dependency extraction from wide array literals and deeply nested expressions"
+    )
+    arg_parser.add_argument("--elements", type=int, default=10_000)
+    arg_parser.add_argument("--nesting", type=int, default=200)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    # miniwdl itself recurses over the expression tree while loading
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20 * args.nesting))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        wdl_path = join(tmp_dir, "expressions.wdl")
+        with open(wdl_path, "w") as f:
+            f.write(expressions_wdl(args.elements, args.nesting))
+        doc = WDL.load(wdl_path)
+
+    print(f"{'walker':>10} {'edges':>8} {'seconds':>10}")
+    for name, parser_cls in [("recursive", RecursiveParser), ("iterative", MiniWDLParser)]:
+        elapsed, parser = time_parser(parser_cls, doc, args.repeat)
+        print(f"{name:>10} {len(parser.edges):>8} {elapsed:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
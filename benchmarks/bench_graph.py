@@ -0,0 +1,51 @@
+import argparse
+import tempfile
+import time
+from os.path import join
+
+import WDL
+
+from miniwdl_viz.synthetic import generate_wdl
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+
+
+def time_stages(wdl_path):
+    doc = WDL.load(wdl_path)
+
+    start = time.perf_counter()
+    parser = MiniWDLParser(doc)
+    parser.parse()
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pwm = ParsedWDLToMermaid(suppress_workflow_input=False)
+    pwm.create_mermaid_flowchart(parser.workflow_name, parser.nodes, parser.edges)
+    flowchart_time = time.perf_counter() - start
+
+    return len(parser.nodes), len(parser.edges), parse_time, flowchart_time
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times MiniWDLParser.parse and create_mermaid_flowchart over growing synthetic workflows"
+    )
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000])
+    arg_parser.add_argument("--depth", type=int, default=2)
+    args = arg_parser.parse_args()
+
+    print(f"{'calls':>8} {'nodes':>8} {'edges':>8} {'parse s':>10} {'us/node':>8} {'chart s':>10} {'us/edge':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            wdl_path = join(tmp_dir, f"synthetic_{size}.wdl")
+            with open(wdl_path, "w") as f:
+                f.write(generate_wdl(size, depth=args.depth))
+            n_nodes, n_edges, parse_time, flowchart_time = time_stages(wdl_path)
+            print(
+                f"{size:>8} {n_nodes:>8} {n_edges:>8} {parse_time:>10.4f} {parse_time / n_nodes * 1e6:>8.1f} "
+                f"{flowchart_time:>10.4f} {flowchart_time / n_edges * 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
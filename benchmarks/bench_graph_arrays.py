@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from os.path import join
+
+import numpy as np
+
+from benchmarks.bench_streaming import synthetic_graph
+from miniwdl_viz.graph_arrays import GraphArrays
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+def dict_levels(graph):
+    """Longest path levels with Kahn's algorithm over the edge dicts"""
+    remaining = {node["id"]: len(graph.edges_to(node["id"])) for node in graph.nodes}
+    frontier = [node_id for node_id, count in remaining.items() if count == 0]
+    frontier += [node_id for node_id in graph.out_edges if node_id not in graph]
+    levels = {}
+    level = 0
+    while frontier:
+        next_frontier = []
+        for node_id in frontier:
+            levels[node_id] = level
+            for edge in graph.edges_from(node_id):
+                remaining[edge["node_to"]] -= 1
+                if remaining[edge["node_to"]] == 0:
+                    next_frontier.append(edge["node_to"])
+        frontier = next_frontier
+        level += 1
+    return levels
+
+
+def dict_analysis(parsed_dict):
+    graph = WorkflowGraph(parsed_dict["nodes"], parsed_dict["edges"])
+    out_degree = {node_id: len(edges) for node_id, edges in graph.out_edges.items()}
+    in_degree = {node_id: len(edges) for node_id, edges in graph.in_edges.items()}
+    levels = dict_levels(graph)
+    reached = graph.reachable(graph.nodes[0]["id"])
+    return max(out_degree.values()), max(in_degree.values()), max(levels.values()), len(reached)
+
+
+def array_analysis(graph_arrays):
+    levels = graph_arrays.topological_levels()
+    reached = graph_arrays.reachable([0])
+    return (
+        int(graph_arrays.out_degree().max()),
+        int(graph_arrays.in_degree().max()),
+        int(levels.max()),
+        int((reached >= 0).sum()),
+    )
+
+
+def corpus_analysis(graphs):
+    """array_analysis of every graph, from one pass over the concatenated graphs"""
+    combined, node_offsets = GraphArrays.concatenate(graphs)
+    starts = node_offsets[:-1]
+    levels = combined.topological_levels()
+    reached = combined.reachable(starts)
+    columns = [
+        np.maximum.reduceat(combined.out_degree(), starts),
+        np.maximum.reduceat(combined.in_degree(), starts),
+        np.maximum.reduceat(levels, starts),
+        np.add.reduceat(reached >= 0, starts),
+    ]
+    return [tuple(int(column[ind]) for column in columns) for ind in range(len(graphs))]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Compares degree, level and reachability analysis of a synthetic corpus of workflow graphs "
+        "over edge dicts loaded from json and numpy arrays memory-mapped from .npz files"
+    )
+    arg_parser.add_argument("--workflows", type=int, default=200)
+    arg_parser.add_argument("--calls", type=int, default=5000, help="calls in the largest workflow, the others are spread below it")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sizes = {"json": 0, "npz": 0}
+        convert_seconds = 0.0
+        for ind in range(args.workflows):
+            nodes, edges = synthetic_graph(max(1, args.calls * (ind + 1) // args.workflows))
+            parsed_dict = {"name": "synthetic", "workflow_inputs": [], "workflow_outputs": [], "nodes": nodes, "edges": edges}
+            with open(join(tmp_dir, f"w{ind}.json"), "w") as json_file:
+                json.dump(parsed_dict, json_file)
+            elapsed, graph_arrays = timed(lambda: GraphArrays.from_dict(parsed_dict))
+            convert_seconds += elapsed
+            graph_arrays.save(join(tmp_dir, f"w{ind}.npz"))
+            for out_type in sizes:
+                sizes[out_type] += os.path.getsize(join(tmp_dir, f"w{ind}.{out_type}"))
+        print(f"{args.workflows} workflows, converted to arrays in {convert_seconds:.2f}s")
+
+        def load_json(ind):
+            with open(join(tmp_dir, f"w{ind}.json")) as json_file:
+                return json.load(json_file)
+
+        print(f"\n{'path':>8} {'load s':>8} {'analysis s':>11} {'MB on disk':>11}")
+        results = {}
+        for out_type, load, analysis in [
+            ("json", load_json, dict_analysis),
+            ("npz", lambda ind: GraphArrays.load(join(tmp_dir, f"w{ind}.npz")), array_analysis),
+        ]:
+            load_seconds = analysis_seconds = 0.0
+            results[out_type] = []
+            for ind in range(args.workflows):
+                elapsed, loaded = timed(lambda: load(ind))
+                load_seconds += elapsed
+                elapsed, result = timed(lambda: analysis(loaded))
+                analysis_seconds += elapsed
+                results[out_type].append(result)
+            print(f"{out_type:>8} {load_seconds:>8.2f} {analysis_seconds:>11.2f} {sizes[out_type] / 2**20:>11.1f}")
+
+        # numpy pays a fixed cost per operation, which one graph at a time pays once per level
+        # of every graph, and a concatenated corpus once per level of its deepest graph
+        load_seconds, graphs = timed(lambda: [GraphArrays.load(join(tmp_dir, f"w{ind}.npz")) for ind in range(args.workflows)])
+        analysis_seconds, results["corpus"] = timed(lambda: corpus_analysis(graphs))
+        print(f"{'corpus':>8} {load_seconds:>8.2f} {analysis_seconds:>11.2f} {sizes['npz'] / 2**20:>11.1f}")
+        assert results["json"] == results["npz"] == results["corpus"], "the dict and array analyses disagree"
+
+
+if __name__ == "__main__":
+    main()
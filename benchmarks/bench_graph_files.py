@@ -0,0 +1,74 @@
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import dirname, join, realpath
+
+import WDL
+
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parsed_wdl_to_mermaid
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, load_graph_file, write_output
+
+COMPLEX_WDL = join(dirname(dirname(realpath(__file__))), "tests", "test_wdls", "joint-discovery-gatk4-version.wdl")
+
+
+def render(miniwdl_parser):
+    return parsed_wdl_to_mermaid(miniwdl_parser, ParsedWDLToMermaid())
+
+
+def parse(wdl_file):
+    parser = MiniWDLParser(WDL.load(wdl_file))
+    parser.parse()
+    return parser
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def cli_time(input_file, repeat):
+    command = [sys.executable, "-m", "miniwdl_viz.mermaid_wdl", input_file, "--print-flowchart"]
+    return best_time(lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL), repeat)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Compares rendering from a pre-parsed graph file against parsing the WDL every time"
+    )
+    arg_parser.add_argument("--wdl", default=COMPLEX_WDL)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    out_types = ["json", "yaml"]
+    try:
+        import msgpack  # noqa: F401
+
+        out_types.append("msgpack")
+    except ImportError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parsed_dict = parse(args.wdl).to_dict()
+        inputs = {"wdl": args.wdl}
+        for out_type in out_types:
+            write_output(join(tmp_dir, "graph"), out_type, parsed_dict)
+            inputs[out_type] = join(tmp_dir, f"graph.{out_type}")
+
+        print(f"{'input':>8} {'load+render s':>14} {'cli s':>8}")
+        for name, input_file in inputs.items():
+            if name == "wdl":
+                elapsed = best_time(lambda: render(parse(input_file)), args.repeat)
+            else:
+                elapsed = best_time(lambda: render(load_graph_file(input_file)), args.repeat)
+            print(f"{name:>8} {elapsed:>14.4f} {cli_time(input_file, args.repeat):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
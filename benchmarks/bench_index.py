@@ -0,0 +1,119 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from os.path import join
+
+from miniwdl_viz.wdl_index import WdlIndex
+
+
+def library_wdl(library, n_tasks):
+    """A task library of n_tasks tasks, each with one input and two outputs"""
+    lines = ["version 1.0", ""]
+    for task in range(n_tasks):
+        lines.extend([
+            f"task lib{library}_t{task} {{",
+            "  input {",
+            "    String value",
+            "  }",
+            "  command <<<",
+            "    echo ~{value}",
+            "  >>>",
+            "  output {",
+            "    String out = read_string(stdout())",
+            "    File log = stdout()",
+            "  }",
+            "}",
+            "",
+        ])
+    return "\n".join(lines)
+
+
+def workflow_wdl(workflow, libraries, n_tasks, n_calls):
+    """A workflow importing libraries, chaining n_calls calls to their tasks round-robin"""
+    lines = ["version 1.0", ""]
+    lines.extend(f'import "../libs/lib{library}.wdl" as lib{library}' for library in libraries)
+    lines.extend(["", f"workflow w{workflow} {{", "  input {", "    String seed", "  }"])
+    previous = "seed"
+    for ind in range(n_calls):
+        library = libraries[ind % len(libraries)]
+        task = (workflow + ind) % n_tasks
+        lines.append(f"  call lib{library}.lib{library}_t{task} as c{ind} {{ input: value = {previous} }}")
+        previous = f"c{ind}.out"
+    lines.extend(["  output {", f"    String out = {previous}", "  }", "}", ""])
+    return "\n".join(lines)
+
+
+def write_corpus(directory, n_files, n_libraries, n_tasks, n_calls, imports_per_workflow=3):
+    """Writes n_files WDL files, n_libraries task libraries under libs/ and workflows
+    importing imports_per_workflow of them under workflows/, returning the workflow paths"""
+    os.makedirs(join(directory, "libs"))
+    os.makedirs(join(directory, "workflows"))
+    for library in range(n_libraries):
+        with open(join(directory, "libs", f"lib{library}.wdl"), "w") as wdl_file:
+            wdl_file.write(library_wdl(library, n_tasks))
+    paths = []
+    for workflow in range(n_files - n_libraries):
+        libraries = sorted({(workflow + step * 7) % n_libraries for step in range(imports_per_workflow)})
+        path = join(directory, "workflows", f"w{workflow}.wdl")
+        with open(path, "w") as wdl_file:
+            wdl_file.write(workflow_wdl(workflow, libraries, n_tasks, n_calls))
+        paths.append(path)
+    return paths
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def query_latencies(fn, names):
+    """p50 and p99 milliseconds of fn over names"""
+    latencies = sorted(timed(lambda: fn(name))[0] * 1000 for name in names)
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times building the WDL index of a generated corpus, incremental rebuilds and reverse dependency/impact queries"
+    )
+    arg_parser.add_argument("--files", type=int, default=1000)
+    arg_parser.add_argument("--libraries", type=int, default=50)
+    arg_parser.add_argument("--tasks", type=int, default=10, help="tasks per library")
+    arg_parser.add_argument("--calls", type=int, default=8, help="calls per workflow")
+    arg_parser.add_argument("--queries", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = join(tmp_dir, "corpus")
+        workflows = write_corpus(corpus, args.files, args.libraries, args.tasks, args.calls)
+        index = WdlIndex(join(tmp_dir, "index.sqlite"))
+
+        print(f"{'build':>28} {'seconds':>8} {'parsed':>7}")
+        elapsed, stats = timed(lambda: index.build([corpus]))
+        print(f"{'cold':>28} {elapsed:>8.3f} {stats['parsed']:>7}")
+        elapsed, stats = timed(lambda: index.build([corpus]))
+        print(f"{'unchanged':>28} {elapsed:>8.3f} {stats['parsed']:>7}")
+
+        for path in workflows[:10]:
+            os.utime(path, ns=(0, 0))
+        elapsed, stats = timed(lambda: index.build([corpus]))
+        print(f"{'10 touched, same content':>28} {elapsed:>8.3f} {stats['parsed']:>7}")
+
+        with open(join(corpus, "libs", "lib0.wdl"), "a") as wdl_file:
+            wdl_file.write(library_wdl(0, args.tasks + 1).split("version 1.0", 1)[1].replace("lib0_t", "lib0_extra_t"))
+        elapsed, stats = timed(lambda: index.build([corpus]))
+        print(f"{'one library changed':>28} {elapsed:>8.3f} {stats['parsed']:>7}")
+
+        names = [f"lib{ind % args.libraries}_t{ind % args.tasks}" for ind in range(args.queries)]
+        print(f"\n{'query':>28} {'p50 ms':>8} {'p99 ms':>8} {'results':>8}")
+        for query, fn in [("callers", index.callers), ("impact", index.impact), ("impact --output log", lambda name: index.impact(name, outputs=["log"]))]:
+            p50, p99 = query_latencies(fn, names)
+            print(f"{query:>28} {p50:>8.2f} {p99:>8.2f} {len(fn(names[0])):>8}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import tempfile
+import time
+from os.path import join
+
+from benchmarks.bench_streaming import synthetic_graph
+from miniwdl_viz.graph_lod import LevelOfDetail
+from miniwdl_viz.local_renderer import LocalRenderer
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+def time_render(nodes, edges, level_of_detail, tmp_dir):
+    start = time.perf_counter()
+    pwm = ParsedWDLToMermaid(suppress_workflow_input=False, level_of_detail=level_of_detail)
+    mermaid_list = pwm.create_mermaid_flowchart("synthetic", nodes, edges)
+    flowchart_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reduced_nodes, reduced_edges = pwm.reduce_detail("synthetic", nodes, edges)
+    graph = WorkflowGraph(reduced_nodes)
+    LocalRenderer().render("synthetic", graph, pwm.flowchart_edges(graph, reduced_edges), svg_file=join(tmp_dir, "lod.svg"))
+    render_time = time.perf_counter() - start
+    return len("\n".join(mermaid_list)), flowchart_time, render_time
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Compares flowchart size and render time with and without level-of-detail reduction"
+    )
+    arg_parser.add_argument("--calls", type=int, default=5000)
+    arg_parser.add_argument("--section-size", type=int, default=50)
+    arg_parser.add_argument("--max-nodes", type=int, default=4000)
+    args = arg_parser.parse_args()
+
+    nodes, edges = synthetic_graph(args.calls, section_size=args.section_size)
+    configs = [
+        ("full", None),
+        ("max-depth 0", LevelOfDetail(max_depth=0)),
+        (f"max-nodes {args.max_nodes}", LevelOfDetail(max_nodes=args.max_nodes)),
+    ]
+    print(f"{'mode':>16} {'nodes':>12} {'edges':>14} {'mermaid chars':>14} {'chart s':>8} {'svg s':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, level_of_detail in configs:
+            chars, flowchart_time, render_time = time_render(nodes, edges, level_of_detail, tmp_dir)
+            if level_of_detail is None:
+                counts = f"{len(nodes):>12} {len(edges):>14}"
+            else:
+                stats = level_of_detail.stats
+                counts = (
+                    f"{stats['nodes_before']:>5} -> {stats['nodes_after']:<4} "
+                    f"{stats['edges_before']:>6} -> {stats['edges_after']:<5}"
+                )
+            print(f"{name:>16} {counts} {chars:>14} {flowchart_time:>8.3f} {render_time:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import time
+import tracemalloc
+
+from benchmarks.bench_streaming import synthetic_graph
+from miniwdl_viz.mermaid_node import MermaidCallNode
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+
+
+class DictNode:
+    """MermaidNode as it was before slots, for comparison"""
+
+    def __init__(self, id, name):
+        self.open, self.close = "{{", "}}"
+        self.id = id
+        self.name = name
+
+
+class SlottedEdge:
+    """A slotted edge, for comparison with the edge dicts the flowchart is built from"""
+
+    __slots__ = ("node_from", "node_to", "workflow_ref_name", "task_ref_name", "edge_type")
+
+    def __init__(self, node_from, node_to, workflow_ref_name, task_ref_name, edge_type):
+        self.node_from = node_from
+        self.node_to = node_to
+        self.workflow_ref_name = workflow_ref_name
+        self.task_ref_name = task_ref_name
+        self.edge_type = edge_type
+
+
+def bytes_per_item(build, count):
+    """Traced bytes held per item by a list of count items, not counting the list itself"""
+    tracemalloc.start()
+    items = [None] * count
+    base, _ = tracemalloc.get_traced_memory()
+    for ind in range(count):
+        items[ind] = build(ind)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (held - base) / count
+
+
+def seconds_per_item(build, count):
+    """Time to build count items while keeping them, so that garbage collection is included"""
+    items = [None] * count
+    start = time.perf_counter()
+    for ind in range(count):
+        items[ind] = build(ind)
+    return (time.perf_counter() - start) / count
+
+
+def representations(count):
+    ids = [f"call-c{ind}" for ind in range(count)]
+    edge = {"node_from": "call-c0", "node_to": "call-c1", "workflow_ref_name": "c0.out", "task_ref_name": "ins", "edge_type": "input"}
+    builders = [
+        ("unslotted node", lambda ind: DictNode(ids[ind], ids[ind])),
+        ("MermaidNode", lambda ind: MermaidCallNode(ids[ind], ids[ind])),
+        ("edge dict", lambda ind: dict(edge)),
+        ("slotted edge", lambda ind: SlottedEdge(**edge)),
+    ]
+    # the strings are shared across items, so only the containers are measured, except
+    # for the label MermaidNode renders up front
+    return [(name, bytes_per_item(build, count), seconds_per_item(build, count)) for name, build in builders]
+
+
+def labelled_graph(n_calls):
+    """synthetic_graph with a second input from each source, so grouping merges labels"""
+    nodes, edges = synthetic_graph(n_calls)
+    edges += [dict(edge, task_ref_name="more_ins") for edge in edges if edge["node_from"] != "WorkflowInput"]
+    return nodes, edges
+
+
+def flowchart(n_calls):
+    nodes, edges = labelled_graph(n_calls)
+    with open(os.devnull, "w") as devnull:
+        tracemalloc.start()
+        start = time.perf_counter()
+        pwm = ParsedWDLToMermaid(suppress_workflow_input=False, sink=devnull)
+        pwm.create_mermaid_flowchart("synthetic", nodes, edges)
+        elapsed = time.perf_counter() - start
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return len(edges), elapsed, peak, held
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Measures the memory of Mermaid node and edge representations and of streaming a flowchart"
+    )
+    arg_parser.add_argument("--items", type=int, default=100_000)
+    arg_parser.add_argument("--calls", type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    print(f"{'representation':>16} {'bytes each':>11} {'ns each':>8}")
+    for name, size, seconds in representations(args.items):
+        print(f"{name:>16} {size:>11.1f} {seconds * 1e9:>8.0f}")
+
+    n_edges, elapsed, peak, held = flowchart(args.calls)
+    print(f"\nstreamed flowchart of {args.calls} calls, {n_edges} edges")
+    print(f"{'seconds':>8} {'traced peak MB':>15} {'held MB':>8}")
+    print(f"{elapsed:>8.2f} {peak / 2**20:>15.1f} {held / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
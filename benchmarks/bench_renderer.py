@@ -0,0 +1,82 @@
+import argparse
+import io
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import join
+
+from PIL import Image
+
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parse_wdl
+
+
+def stub_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (1600, 900), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def start_stub_server(latency):
+    """Stands in for mermaid.ink: answers every /img/ request with a fixed png"""
+    png = stub_png()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(png)))
+            self.end_headers()
+            self.wfile.write(png)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Times the local renderer against the remote path served by a local stub")
+    arg_parser.add_argument("wdl", nargs="?", default="tests/test_wdls/joint-discovery-gatk4-version.wdl")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="simulated server latency in seconds")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    server = start_stub_server(args.latency)
+    parser = parse_wdl(args.wdl)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pwm = ParsedWDLToMermaid(
+            output_name=join(tmp_dir, "output.mmd"),
+            renderer_url=f"http://127.0.0.1:{server.server_port}",
+        )
+        mermaid_list = pwm.create_mermaid_flowchart(parser.workflow_name, parser.nodes, parser.edges)
+
+        remote = best_of(args.repeat, lambda: pwm.show_mermaid_flowchart(mermaid_list, file_output=True))
+        local = best_of(
+            args.repeat,
+            lambda: pwm.render_local_flowchart(parser.workflow_name, parser.nodes, parser.edges, file_output=True),
+        )
+    server.shutdown()
+
+    print(f"remote (stub, {args.latency * 1000:.0f}ms latency): {remote:.4f}s")
+    print(f"local svg+png: {local:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
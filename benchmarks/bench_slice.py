@@ -0,0 +1,37 @@
+import argparse
+import time
+
+from benchmarks.bench_streaming import synthetic_graph
+from miniwdl_viz.graph_slice import GraphSlice
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times --focus slices of a synthetic graph against indexing the whole graph"
+    )
+    arg_parser.add_argument("--calls", type=int, default=100_000)
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[1, 3, 10])
+    args = arg_parser.parse_args()
+
+    nodes, edges = synthetic_graph(args.calls)
+    start = time.perf_counter()
+    graph = WorkflowGraph(nodes, edges)
+    print(f"indexing {len(nodes)} nodes, {len(edges)} edges: {time.perf_counter() - start:.3f}s\n")
+
+    focus = f"c{args.calls // 2}"
+    start = time.perf_counter()
+    GraphSlice(focus, depth=0).select(graph)
+    print(f"first slice, which builds the name and position indexes: {time.perf_counter() - start:.3f}s\n")
+
+    print(f"{'focus':>12} {'depth':>6} {'nodes':>7} {'edges':>7} {'ms':>8}")
+    for depth in args.depths + [None]:
+        graph_slice = GraphSlice(focus, depth=depth)
+        start = time.perf_counter()
+        sliced_nodes, sliced_edges = graph_slice.select(graph)
+        elapsed = time.perf_counter() - start
+        print(f"{focus:>12} {str(depth):>6} {len(sliced_nodes):>7} {len(sliced_edges):>7} {elapsed * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
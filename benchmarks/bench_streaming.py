@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def synthetic_graph(n_calls, section_size=50):
+    """Node and edge dicts shaped like MiniWDLParser output, without going through miniwdl"""
+    nodes = []
+    edges = []
+    for ind in range(n_calls):
+        section = "synthetic"
+        if ind % section_size == 0:
+            nodes.append({"id": f"scatter-L{ind}C3-i", "name": f"range({ind})", "section": "synthetic", "type": "workflow_section"})
+        if (ind // section_size) % 2:
+            section = f"scatter-L{ind - ind % section_size}C3-i"
+        nodes.append({"id": f"call-c{ind}", "name": f"c{ind}", "section": section, "type": "call"})
+        edges.append({"node_from": "WorkflowInput", "node_to": f"call-c{ind}", "workflow_ref_name": "seed", "task_ref_name": "seed", "edge_type": "input"})
+        for source in range(max(0, ind - 2), ind):
+            edges.append({"node_from": f"call-c{source}", "node_to": f"call-c{ind}", "workflow_ref_name": f"c{source}.out", "task_ref_name": "ins", "edge_type": "input"})
+    return nodes, edges
+
+
+def run_mode(mode, n_calls):
+    from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+
+    nodes, edges = synthetic_graph(n_calls)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        if mode == "stream":
+            pwm = ParsedWDLToMermaid(suppress_workflow_input=False, sink=devnull)
+            pwm.create_mermaid_flowchart("synthetic", nodes, edges)
+        else:
+            pwm = ParsedWDLToMermaid(suppress_workflow_input=False, output_name=os.devnull)
+            mermaid_list = pwm.create_mermaid_flowchart("synthetic", nodes, edges)
+            pwm.output_mermaid(mermaid_list, file_output=True)
+    elapsed = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_traced": peak_traced, "rss_growth_kb": peak_rss - baseline_rss}))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compares peak memory of list and streaming mermaid emission")
+    arg_parser.add_argument("--calls", type=int, default=200_000)
+    arg_parser.add_argument("--mode", choices=["list", "stream"], help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.calls)
+        return
+
+    print(f"{'mode':>8} {'seconds':>8} {'traced peak MB':>15} {'RSS growth MB':>14}")
+    for mode in ["list", "stream"]:
+        # each mode in a fresh interpreter so peak RSS isn't shared
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_streaming", "--calls", str(args.calls), "--mode", mode],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        stats = json.loads(result.stdout)
+        print(f"{mode:>8} {stats['seconds']:>8.2f} {stats['peak_traced'] / 2**20:>15.1f} {stats['rss_growth_kb'] / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
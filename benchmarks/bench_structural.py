@@ -0,0 +1,62 @@
+import argparse
+import glob
+import tempfile
+import time
+from os.path import basename, dirname, join, realpath
+
+import WDL
+
+from miniwdl_viz.synthetic import SECTION_KINDS, write_wdl
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+from miniwdl_viz.structural_parser import parse_structural
+
+TEST_WDLS = join(dirname(dirname(realpath(__file__))), "tests", "test_wdls")
+
+
+def typechecked(wdl_file):
+    parser = MiniWDLParser(WDL.load(wdl_file))
+    parser.parse()
+    return parser
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Compares the structural parse against WDL.load and MiniWDLParser.parse"
+    )
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 400])
+    arg_parser.add_argument("--imports", type=int, default=4)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    # the first parse builds miniwdl's grammar, which both modes share
+    parse_structural(join(TEST_WDLS, "simple.wdl"))
+
+    print(f"{'workflow':>40} {'typechecked s':>14} {'structural s':>13} {'speedup':>8} {'same':>5}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        wdl_files = sorted(glob.glob(join(TEST_WDLS, "*.wdl")))
+        for size in args.sizes:
+            wdl_files.append(write_wdl(
+                tmp_dir, size, name=f"synthetic_{size}.wdl", depth=2, fan_in=3, fan_out=3,
+                section_kinds=SECTION_KINDS, decl_every=4, n_imports=args.imports,
+            ))
+        for wdl_file in wdl_files:
+            full_time, full = best_time(lambda: typechecked(wdl_file), args.repeat)
+            structural_time, structural = best_time(lambda: parse_structural(wdl_file), args.repeat)
+            print(
+                f"{basename(wdl_file):>40} {full_time:>14.4f} {structural_time:>13.4f} "
+                f"{full_time / structural_time:>7.1f}x {str(full.to_dict() == structural.to_dict()):>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import tempfile
+import time
+from os.path import join
+
+import WDL
+
+from miniwdl_viz.synthetic import STEP_TASK
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+
+
+class NoMemo(dict):
+    """Template store that never hits, so every call site re-walks its sub-workflow"""
+
+    def __contains__(self, key):
+        return False
+
+
+def level_wdl(level, fanout, calls):
+    """A workflow calling the previous level fanout times in a chain, level 0 calls the task"""
+    lines = ["version 1.0", ""]
+    if level:
+        lines.append(f'import "level{level - 1}.wdl" as sub')
+        lines.append("")
+    lines.extend([f"workflow level{level} {{", "  input {", "    String seed", "  }"])
+    previous = "seed"
+    for ind in range(fanout if level else calls):
+        if level:
+            lines.append(f"  call sub.level{level - 1} as l{ind} {{ input: seed = {previous} }}")
+        else:
+            lines.append(f"  call step as s{ind} {{ input: ins = [{previous}] }}")
+        previous = f"{'l' if level else 's'}{ind}.out"
+    lines.extend(["  output {", f"    String out = {previous}", "  }", "}"])
+    if not level:
+        lines.append(STEP_TASK)
+    return "\n".join(lines) + "\n"
+
+
+def time_parse(doc, depth, templates=None):
+    start = time.perf_counter()
+    parser = MiniWDLParser(doc, subworkflow_depth=depth, templates=templates)
+    parser.parse()
+    return time.perf_counter() - start, parser
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times sub-workflow expansion over deeply nested synthetic workflows, with and without template memoization"
+    )
+    arg_parser.add_argument("--depth", type=int, default=4)
+    arg_parser.add_argument("--fanout", type=int, default=5)
+    arg_parser.add_argument("--calls", type=int, default=10, help="task calls in the innermost workflow")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for level in range(args.depth + 1):
+            with open(join(tmp_dir, f"level{level}.wdl"), "w") as f:
+                f.write(level_wdl(level, args.fanout, args.calls))
+        start = time.perf_counter()
+        doc = WDL.load(join(tmp_dir, f"level{args.depth}.wdl"))
+        print(f"miniwdl load: {time.perf_counter() - start:.3f}s")
+
+    print(f"{'depth':>6} {'nodes':>8} {'edges':>8} {'templates':>10} {'memo s':>8} {'no memo s':>10}")
+    for depth in range(args.depth + 1):
+        memo_time, parser = time_parse(doc, depth)
+        no_memo_time, _ = time_parse(doc, depth, templates=NoMemo())
+        print(
+            f"{depth:>6} {len(parser.nodes):>8} {len(parser.edges):>8} {len(parser.templates):>10} "
+            f"{memo_time:>8.3f} {no_memo_time:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
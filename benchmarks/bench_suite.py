@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import dirname, join, realpath
+
+import WDL
+
+from miniwdl_viz.synthetic import SECTION_KINDS, write_wdl
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, write_output
+
+BASELINE_FILE = join(dirname(realpath(__file__)), "baselines.json")
+# stages faster than this are too noisy to fail on
+MIN_SECONDS = 0.005
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibration_workload():
+    """Fixed pure-Python work of the same kind as the stages: string formatting, dict
+    updates and a sort"""
+    counts = {}
+    for ind in range(200_000):
+        key = f"call-c{ind % 1000}"
+        counts[key] = counts.get(key, 0) + ind
+    return sorted(counts.items())
+
+
+def calibrate(repeat=10):
+    """Best time of the calibration workload. Stage times are stored as multiples of it, so
+    baselines recorded on one machine compare with runs on another"""
+    return best_time(calibration_workload, repeat)
+
+
+def measure(fn, repeat):
+    """Best wall time of repeat runs, and the peak traced memory of one more run"""
+    best = best_time(fn, repeat)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def stage_functions(wdl_path, tmp_dir):
+    """(stage name, function) pairs, each stage using the results of the ones before it"""
+    state = {}
+
+    def load():
+        state["doc"] = WDL.load(wdl_path)
+
+    def parse():
+        state["parser"] = MiniWDLParser(state["doc"])
+        state["parser"].parse()
+
+    def group_edge():
+        ParsedWDLToMermaid().group_edge(state["parser"].edges)
+
+    def flowchart():
+        parser = state["parser"]
+        state["pwm"] = ParsedWDLToMermaid(suppress_workflow_input=False, output_name=join(tmp_dir, "synthetic.mmd"))
+        state["mermaid_list"] = state["pwm"].create_mermaid_flowchart(parser.workflow_name, parser.nodes, parser.edges)
+
+    def output_mermaid():
+        state["pwm"].output_mermaid(state["mermaid_list"], file_output=True)
+
+    def write_yaml():
+        write_output(join(tmp_dir, "synthetic"), "yaml", state["parser"].to_dict())
+
+    def write_json():
+        write_output(join(tmp_dir, "synthetic"), "json", state["parser"].to_dict())
+
+    return [
+        ("load", load),
+        ("parse", parse),
+        ("group_edge", group_edge),
+        ("flowchart", flowchart),
+        ("output_mermaid", output_mermaid),
+        ("write_output yaml", write_yaml),
+        ("write_output json", write_json),
+    ]
+
+
+def run_suite(sizes, repeat, generator_args):
+    """Results of every stage and size, and the calibration time they're relative to"""
+    # calibrated before and after, so a noisy moment only makes one of them slower
+    calibration_seconds = calibrate()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            wdl_path = write_wdl(tmp_dir, size, **generator_args)
+            for stage, fn in stage_functions(wdl_path, tmp_dir):
+                seconds, peak = measure(fn, repeat)
+                results[f"{stage}/{size}"] = {"seconds": round(seconds, 5), "peak_kb": peak // 1024}
+    calibration_seconds = min(calibration_seconds, calibrate())
+    for result in results.values():
+        result["relative"] = round(result["seconds"] / calibration_seconds, 4)
+    return results, calibration_seconds
+
+
+def regressions(results, baselines, time_tolerance, memory_tolerance, calibration_seconds):
+    """Stages slower (relative to the calibration workload) or larger than their baselines"""
+    min_relative = MIN_SECONDS / calibration_seconds
+    found = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        if result["relative"] > max(baseline["relative"] * time_tolerance, baseline["relative"] + min_relative):
+            found.append(f"{key}: {result['relative']:.3f}x calibration vs baseline {baseline['relative']:.3f}x")
+        if result["peak_kb"] > baseline["peak_kb"] * memory_tolerance + 64:
+            found.append(f"{key}: {result['peak_kb']}KB peak vs baseline {baseline['peak_kb']}KB")
+    return found
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Times and memory-profiles each stage from WDL.load to write_output over a sweep of synthetic workflows, "
+        "and fails when a stage regressed against the stored baselines"
+    )
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 400])
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--fan-in", type=int, default=3)
+    arg_parser.add_argument("--fan-out", type=int, default=3)
+    arg_parser.add_argument("--depth", type=int, default=2, help="scatter/if nesting depth")
+    arg_parser.add_argument("--section-size", type=int, default=20)
+    arg_parser.add_argument("--decl-every", type=int, default=4)
+    arg_parser.add_argument("--imports", type=int, default=2)
+    arg_parser.add_argument("--baseline-file", default=BASELINE_FILE)
+    arg_parser.add_argument("--save-baseline", action='store_true', default=False, help="store these results as the new baselines")
+    arg_parser.add_argument("--time-tolerance", type=float, default=2.0, help="fail when a stage is this many times slower than its baseline, relative to the calibration workload")
+    arg_parser.add_argument("--memory-tolerance", type=float, default=1.25, help="fail when a stage's peak memory is this many times its baseline")
+    args = arg_parser.parse_args()
+
+    generator_args = dict(
+        fan_in=args.fan_in,
+        fan_out=args.fan_out,
+        depth=args.depth,
+        section_size=args.section_size,
+        section_kinds=list(SECTION_KINDS),
+        decl_every=args.decl_every,
+        n_imports=args.imports,
+    )
+    results, calibration_seconds = run_suite(args.sizes, args.repeat, generator_args)
+
+    baselines = {}
+    if os.path.exists(args.baseline_file):
+        with open(args.baseline_file) as baseline_file:
+            stored = json.load(baseline_file)
+        # baselines of other generator settings aren't comparable, nor are absolute seconds
+        # stored before calibration
+        if stored["generator"] == generator_args and "calibration_seconds" in stored:
+            baselines = stored["results"]
+
+    print(f"calibration {calibration_seconds:.4f}s, stage times below are multiples of it\n")
+    print(f"{'stage/calls':>24} {'s':>9} {'x':>9} {'baseline':>9} {'peak KB':>9} {'baseline':>9}")
+    for key, result in results.items():
+        baseline = baselines.get(key, {})
+        print(
+            f"{key:>24} {result['seconds']:>9.4f} {result['relative']:>9.3f} {baseline.get('relative', float('nan')):>9.3f} "
+            f"{result['peak_kb']:>9} {baseline.get('peak_kb', '-'):>9}"
+        )
+
+    if args.save_baseline:
+        with open(args.baseline_file, "w") as baseline_file:
+            json.dump({"generator": generator_args, "calibration_seconds": round(calibration_seconds, 5), "results": results}, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"Saved baselines to {args.baseline_file}")
+        return
+
+    found = regressions(results, baselines, args.time_tolerance, args.memory_tolerance, calibration_seconds)
+    if found:
+        print("\nREGRESSIONS:", file=sys.stderr)
+        for regression in found:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
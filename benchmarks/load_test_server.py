@@ -0,0 +1,86 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from miniwdl_viz.server import DiagramService, create_server
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "tests", "test_wdls")
+
+
+def request(base_url, endpoint, path, cli_args):
+    query = urlencode([("path", path)] + [("arg", arg) for arg in cli_args])
+    start = time.perf_counter()
+    with urllib.request.urlopen(f"{base_url}/{endpoint}?{query}") as response:
+        response.read()
+        status = response.status
+    return time.perf_counter() - start, status
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Measures warm request latency of the wdl_to_mermaid serve mode against a directory of WDL files"
+    )
+    arg_parser.add_argument("--wdl-dir", default=TEST_WDLS)
+    arg_parser.add_argument("--url", help="url of an already running server (by default one is started in this process)")
+    arg_parser.add_argument("--endpoint", choices=["mermaid", "graph"], default="mermaid")
+    arg_parser.add_argument("--requests", type=int, default=500)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("args", nargs="*", help="wdl_to_mermaid options sent with every request")
+    args = arg_parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = create_server(DiagramService(root=args.wdl_dir), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    wdl_dir = server.service.root if server else args.wdl_dir
+    paths = sorted(os.path.relpath(path, wdl_dir) for path in glob.glob(os.path.join(wdl_dir, "**", "*.wdl"), recursive=True))
+    # warm every path once, dropping the ones the server can't draw
+    warm = []
+    for path in paths:
+        try:
+            elapsed, _ = request(base_url, args.endpoint, path, args.args)
+        except urllib.error.HTTPError as exn:
+            print(f"skipping {path}: {exn.code} {exn.read().decode()}")
+            continue
+        print(f"cold {path}: {elapsed * 1000:.1f}ms")
+        warm.append(path)
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(
+            lambda ind: request(base_url, args.endpoint, warm[ind % len(warm)], args.args),
+            range(args.requests),
+        ))
+        wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    print(json.dumps({
+        "files": len(warm),
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "requests_per_s": round(len(results) / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }, indent=2))
+
+    if server:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
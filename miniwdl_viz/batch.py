@@ -0,0 +1,206 @@
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from miniwdl_viz.mermaid_wdl import (
+    add_flowchart_arguments,
+    create_parsed_wdl_to_mermaid,
+    parse_wdl,
+    parsed_wdl_to_mermaid,
+)
+from miniwdl_viz.graph_cache import add_cache_arguments, cache_enabled, create_graph_cache
+from miniwdl_viz.graph_slice import create_graph_slice
+from miniwdl_viz.miniwdl_parser import add_parse_arguments, write_output
+from miniwdl_viz.remote_renderer import DEFAULT_RENDERER_URL, RemoteRenderer, create_render_cache
+from miniwdl_viz.wdl_loader import DocumentLoader
+
+# One loader per worker process, so imported task libraries shared between
+# workflows are only parsed and typechecked once per worker
+_worker_loader = None
+
+
+def init_worker(import_path):
+    global _worker_loader
+    _worker_loader = DocumentLoader(path=import_path)
+
+
+def find_wdl_files(inputs):
+    """Expands directories and glob patterns into a sorted list of WDL files"""
+    wdl_files = set()
+    for input in inputs:
+        if os.path.isdir(input):
+            wdl_files.update(str(path) for path in Path(input).rglob("*.wdl"))
+        else:
+            wdl_files.update(
+                path for path in glob.glob(input, recursive=True) if os.path.isfile(path)
+            )
+    return sorted(os.path.abspath(path) for path in wdl_files)
+
+
+def mirrored_output_path(wdl_file, input_root, output_dir):
+    relative = Path(wdl_file).relative_to(input_root).with_suffix("")
+    return Path(output_dir) / relative
+
+
+class NoWorkflow(Exception):
+    """A document without a workflow, such as a task library, which has nothing to draw"""
+
+
+def process_wdl_file(wdl_file, output_base, args):
+    loader = _worker_loader or DocumentLoader(path=args.import_path)
+    miniwdl_parser = parse_wdl(
+        wdl_file,
+        loader=loader,
+        cache=create_graph_cache(args),
+        subworkflow_depth=args.expand_subworkflows,
+        structural=args.structural,
+    )
+    if not miniwdl_parser.workflow_name:
+        raise NoWorkflow(wdl_file)
+    os.makedirs(os.path.dirname(output_base), exist_ok=True)
+
+    if not args.no_spec:
+        out_type = "json" if args.json_output else "yaml"
+        write_output(output_base, out_type, miniwdl_parser.to_dict())
+    if not args.no_flowchart:
+        # the graph file is always the whole workflow, only the flowchart is sliced
+        graph_slice = create_graph_slice(args)
+        if graph_slice is not None:
+            miniwdl_parser = graph_slice.apply_to(miniwdl_parser)
+        pwm = create_parsed_wdl_to_mermaid(args, f"{output_base}.mmd")
+        mermaid_list = parsed_wdl_to_mermaid(miniwdl_parser, pwm)
+        pwm.output_mermaid(mermaid_list, file_output=True)
+        return "\n".join(mermaid_list)
+    return None
+
+
+def run_wdl_file(wdl_file, output_base, args):
+    """Processes a single file, returning an error message instead of raising, the mermaid
+    text of the flowchart and whether the file was skipped for having no workflow"""
+    try:
+        return None, process_wdl_file(wdl_file, output_base, args), False
+    except NoWorkflow:
+        return None, None, True
+    except Exception as exn:
+        return f"{type(exn).__name__}: {exn}", None, False
+
+
+def render_pngs(flowcharts, args):
+    """Renders the flowcharts through the remote renderer with bounded concurrency. Diagrams
+    already in the render cache cost nothing, so only changed diagrams hit the server."""
+    renderer = RemoteRenderer(
+        base_url=args.renderer_url,
+        cache=create_render_cache(args.cache_dir) if cache_enabled(args) else None,
+        pool_size=args.render_concurrency,
+    )
+    output_bases = list(flowcharts)
+    failures = {}
+    try:
+        images = renderer.render_many(
+            [flowcharts[output_base] for output_base in output_bases],
+            max_workers=args.render_concurrency,
+        )
+    except Exception:
+        # fall back to one at a time so a single bad diagram only fails itself
+        images = []
+        for output_base in output_bases:
+            try:
+                images.append(renderer.render(flowcharts[output_base]))
+            except Exception as exn:
+                failures[output_base] = f"{type(exn).__name__}: {exn}"
+                images.append(None)
+    finally:
+        renderer.close()
+    for output_base, image in zip(output_bases, images):
+        if image is not None:
+            with open(f"{output_base}.png", "wb") as f:
+                f.write(image)
+    return failures
+
+
+def run_batch(wdl_files, input_root, args):
+    failures = {}
+    with ProcessPoolExecutor(
+        max_workers=args.processes,
+        initializer=init_worker,
+        initargs=(args.import_path,),
+    ) as executor:
+        futures = {}
+        for wdl_file in wdl_files:
+            output_base = str(mirrored_output_path(wdl_file, input_root, args.output_dir))
+            future = executor.submit(run_wdl_file, wdl_file, output_base, args)
+            futures[future] = (wdl_file, output_base)
+        flowcharts = {}
+        skipped = 0
+        for future in as_completed(futures):
+            wdl_file, output_base = futures[future]
+            try:
+                error, mermaid_str, no_workflow = future.result()
+            except Exception as exn:
+                # the worker process itself died
+                error, mermaid_str, no_workflow = f"{type(exn).__name__}: {exn}", None, False
+            if error:
+                failures[wdl_file] = error
+                print(f"FAILED {wdl_file}: {error}", file=sys.stderr)
+            elif no_workflow:
+                skipped += 1
+                if args.verbose:
+                    print(f"skipped {wdl_file}: no workflow")
+            else:
+                if mermaid_str is not None:
+                    flowcharts[output_base] = mermaid_str
+                if args.verbose:
+                    print(f"ok {wdl_file}")
+
+    if skipped:
+        print(f"Skipped {skipped} WDL files without a workflow")
+
+    if getattr(args, "render_png", False) and flowcharts:
+        for output_base, error in render_pngs(flowcharts, args).items():
+            failures[f"{output_base}.png"] = error
+            print(f"FAILED rendering {output_base}.png: {error}", file=sys.stderr)
+    return failures
+
+
+def create_arg_parser():
+    arg_parser = argparse.ArgumentParser(
+        prog="WDLBatch",
+        description="Parses and renders many WDL files in parallel into a mirrored output tree",
+    )
+    arg_parser.add_argument("inputs", nargs="+", help="WDL files, directories or glob patterns")
+    arg_parser.add_argument("-d", "--output-dir", required=True)
+    arg_parser.add_argument("-j", "--json-output", action='store_true', default=False)
+    arg_parser.add_argument("-p", "--processes", type=int, default=os.cpu_count(), help="number of worker processes")
+    arg_parser.add_argument("-I", "--import-path", action="append", default=[], help="directory to search for imports")
+    arg_parser.add_argument("--no-spec", action='store_true', default=False, help="skip writing the parsed yaml/json spec")
+    arg_parser.add_argument("--no-flowchart", action='store_true', default=False, help="skip writing the mermaid flowchart")
+    arg_parser.add_argument("--render-png", action='store_true', default=False, help="also render each flowchart to png through the remote renderer")
+    arg_parser.add_argument("--render-concurrency", type=int, default=4, help="maximum concurrent requests to the renderer")
+    arg_parser.add_argument("--renderer-url", default=DEFAULT_RENDERER_URL, help="base url of the remote mermaid renderer")
+    arg_parser.add_argument("-v", "--verbose", action='store_true', default=False)
+    add_flowchart_arguments(arg_parser)
+    add_parse_arguments(arg_parser)
+    add_cache_arguments(arg_parser)
+    return arg_parser
+
+
+def main():
+    args = create_arg_parser().parse_args()
+
+    wdl_files = find_wdl_files(args.inputs)
+    if not wdl_files:
+        print("No WDL files found", file=sys.stderr)
+        sys.exit(1)
+    input_root = os.path.commonpath([os.path.dirname(path) for path in wdl_files])
+
+    failures = run_batch(wdl_files, input_root, args)
+    print(f"Processed {len(wdl_files)} WDL files, {len(failures)} failed")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
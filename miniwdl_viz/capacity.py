@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+import WDL
+
+from miniwdl_viz.miniwdl_parser import parse_wdl
+from miniwdl_viz.run_status import RunDirectoryTracker
+from miniwdl_viz.wdl_loader import DocumentLoader
+
+DEFAULT_SCATTER_SIZE = 10
+DEFAULT_CPU = 1
+DEFAULT_MEMORY = "2 GiB"
+CRITICAL_STYLE_CLASSES = ["classDef critical fill:#f96,stroke:#c33,stroke-width:2px"]
+CRITICAL_LINK_STYLE = "stroke:#c33,stroke-width:3px"
+# "local-disk 100 HDD" or "/mnt/data 50 SSD", sizes in GB
+DISK_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s+(?:HDD|SSD|LOCAL)\b")
+# "2000", "4G" or "1.5 TiB", with the units miniwdl accepts for runtime memory
+BYTE_SIZE_RE = re.compile(r"(\d+(?:\.\d*)?|\.\d+)\s*([A-Za-z]*)")
+BYTE_UNITS = {
+    "": 1,
+    "B": 1,
+    **{
+        f"{prefix}{suffix}": base**power
+        for power, prefix in enumerate("KMGT", 1)
+        for suffix, base in [("", 1000), ("B", 1000), ("i", 1024), ("iB", 1024)]
+    },
+}
+
+
+def parse_byte_size(text):
+    match = BYTE_SIZE_RE.fullmatch(text.strip())
+    if match is None or match.group(2) not in BYTE_UNITS:
+        raise ValueError(f"invalid byte size {text}")
+    return int(float(match.group(1)) * BYTE_UNITS[match.group(2)])
+
+
+def parse_memory(value):
+    """Bytes of a runtime memory value, an Int of bytes or a String like "3.5 GB" """
+    if isinstance(value, (int, float)):
+        return int(value)
+    return parse_byte_size(value)
+
+
+def parse_disks(value):
+    """GB of a runtime disks value, an Int of GiB or specs like "local-disk 100 HDD" """
+    if isinstance(value, (int, float)):
+        return float(value)
+    sizes = DISK_SIZE_RE.findall(value)
+    if not sizes:
+        raise ValueError(f"no disk size in {value}")
+    return sum(float(size) for size in sizes)
+
+
+def iter_calls(body):
+    for node in body:
+        if isinstance(node, WDL.Call):
+            yield node
+        elif isinstance(node, WDL.WorkflowSection):
+            yield from iter_calls(node.body)
+
+
+def runtime_literal(task, key):
+    """The value of a runtime entry when it's a constant, else None"""
+    expr = task.runtime.get(key)
+    literal = expr.literal if expr is not None else None
+    return None if literal is None else literal.value
+
+
+def call_resources(miniwdl_parser, default_cpu=DEFAULT_CPU, default_memory=DEFAULT_MEMORY):
+    """call node id -> cpu, memory_bytes, disk_gb, the task name, and whether the numbers
+    came from the task's runtime section. Entries that aren't constants, calls to
+    sub-workflows and graph files without a WDL document get the defaults."""
+    defaults = {"cpu": float(default_cpu), "memory_bytes": parse_memory(default_memory), "disk_gb": 0.0}
+    resources = {}
+    for node in miniwdl_parser.nodes:
+        if node["type"] == "call":
+            resources[node["id"]] = dict(defaults, task=node["name"], from_runtime=False)
+    if miniwdl_parser.wdl_doc is None or miniwdl_parser.wdl_doc.workflow is None:
+        return resources
+
+    for call in iter_calls(miniwdl_parser.wdl_doc.workflow.body):
+        if call.workflow_node_id not in resources:
+            continue
+        entry = resources[call.workflow_node_id]
+        entry["task"] = call.callee.name
+        if not isinstance(call.callee, WDL.Task):
+            continue
+        for key, resource, parse in [("cpu", "cpu", float), ("memory", "memory_bytes", parse_memory), ("disks", "disk_gb", parse_disks)]:
+            value = runtime_literal(call.callee, key)
+            if value is None:
+                continue
+            try:
+                entry[resource] = parse(value)
+            except (ValueError, TypeError, WDL.Error.SyntaxError):
+                continue
+            entry["from_runtime"] = True
+    return resources
+
+
+def run_dir_durations(run_dirs):
+    """call node id -> mean seconds of its finished jobs in past miniwdl run directories,
+    from when inputs.json was written to when outputs.json was"""
+    seconds = {}
+    for run_dir in run_dirs:
+        with os.scandir(run_dir) as entries:
+            for entry in entries:
+                node_id = RunDirectoryTracker.node_id(entry.name) if entry.is_dir() else None
+                if node_id is None:
+                    continue
+                try:
+                    start = os.stat(os.path.join(entry.path, "inputs.json")).st_mtime
+                    end = os.stat(os.path.join(entry.path, "outputs.json")).st_mtime
+                except FileNotFoundError:
+                    continue
+                seconds.setdefault(node_id, []).append(max(end - start, 0.0))
+    return {node_id: sum(times) / len(times) for node_id, times in seconds.items()}
+
+
+def match_durations(durations, resources):
+    """Keys durations by call node id, accepting node ids, call names or task names"""
+    matched = {}
+    for node_id, entry in resources.items():
+        for key in [node_id, node_id[len("call-"):], entry["task"]]:
+            if key in durations:
+                matched[node_id] = float(durations[key])
+                break
+    return matched
+
+
+class CapacityPlan:
+    """The longest dependency chain of a workflow, and how many calls and how much cpu,
+    memory and disk it needs at once when every call starts as soon as its inputs are ready
+
+    Calls in a scatter run once per element, scatter_sizes[section id] or
+    default_scatter_size times, and conditional sections are assumed to run. Without
+    durations every call takes one step, so the critical path is counted in calls.
+    Stages are the calls at the same number of calls from the start of the workflow."""
+
+    def __init__(self, miniwdl_parser, resources, durations=None, scatter_sizes=None, default_scatter_size=DEFAULT_SCATTER_SIZE):
+        self.miniwdl_parser = miniwdl_parser
+        self.resources = resources
+        graph = miniwdl_parser.graph
+        scatter_sizes = scatter_sizes or {}
+        unknown = [section for section in scatter_sizes if section not in graph]
+        if unknown:
+            raise ValueError(f"no section {', '.join(unknown)} in {miniwdl_parser.workflow_name}")
+        not_scatters = [section for section in scatter_sizes if not section.startswith("scatter-")]
+        if not_scatters:
+            raise ValueError(f"only scatter sections have a size, not {', '.join(not_scatters)}")
+
+        self.durations = durations or {}
+        self.unit = "seconds" if self.durations else "calls"
+        known = list(self.durations.values())
+        # calls without an estimate are assumed to take as long as the average call that has one
+        self.default_duration = sum(known) / len(known) if known else 1.0
+
+        self.scatter_sizes = {}
+        self.multiplicity = {}
+        for node in graph.nodes:
+            count, section = 1, node["section"]
+            while section in graph:
+                section_node = graph.get_node(section)
+                if section.startswith("scatter-"):
+                    size = self.scatter_sizes[section] = scatter_sizes.get(section, default_scatter_size)
+                    count *= size
+                section = section_node["section"]
+            self.multiplicity[node["id"]] = count
+
+        self.schedule(graph)
+        self.critical_path = self.trace_critical_path()
+        self.stages = self.group_stages()
+        self.peak = self.peak_demand()
+
+    def duration(self, node_id):
+        if node_id not in self.resources:
+            return 0.0
+        return self.durations.get(node_id, self.default_duration)
+
+    def predecessors(self, graph, node):
+        """Nodes that have to finish before node starts, its inputs and enclosing section"""
+        preds = [edge["node_from"] for edge in graph.edges_to(node["id"]) if edge["node_from"] in graph]
+        if node["section"] in graph:
+            preds.append(node["section"])
+        return preds
+
+    def schedule(self, graph):
+        """Earliest start and finish of every node, and the predecessor finishing last"""
+        preds = {node["id"]: self.predecessors(graph, node) for node in graph.nodes}
+        pending = {node_id: len(set(node_preds)) for node_id, node_preds in preds.items()}
+        successors = {}
+        for node_id, node_preds in preds.items():
+            for pred in set(node_preds):
+                successors.setdefault(pred, []).append(node_id)
+
+        self.start, self.finish, self.level, self.last_pred = {}, {}, {}, {}
+        order = [node_id for node_id, count in pending.items() if count == 0]
+        for node_id in order:
+            # of predecessors finishing together, the one after the most calls is followed
+            last_pred = max(preds[node_id], key=lambda pred: (self.finish[pred], self.level[pred]), default=None)
+            start = self.finish[last_pred] if last_pred is not None else 0.0
+            level = max((self.level[pred] for pred in preds[node_id]), default=0)
+            self.start[node_id] = start
+            self.finish[node_id] = start + self.duration(node_id)
+            self.level[node_id] = level + (1 if node_id in self.resources else 0)
+            self.last_pred[node_id] = last_pred
+            for successor in successors.get(node_id, []):
+                pending[successor] -= 1
+                if pending[successor] == 0:
+                    order.append(successor)
+
+    def trace_critical_path(self):
+        if not self.finish:
+            return []
+        node_id = max(self.finish, key=lambda node_id: (self.finish[node_id], self.level[node_id]))
+        path = []
+        while node_id is not None:
+            path.append(node_id)
+            node_id = self.last_pred[node_id]
+        return path[::-1]
+
+    def demand(self, node_id):
+        entry = self.resources[node_id]
+        count = self.multiplicity[node_id]
+        return {
+            "width": count,
+            "cpu": entry["cpu"] * count,
+            "memory_bytes": entry["memory_bytes"] * count,
+            "disk_gb": entry["disk_gb"] * count,
+        }
+
+    def group_stages(self):
+        stages = {}
+        for node_id in self.resources:
+            if node_id not in self.level:
+                continue
+            stage = stages.setdefault(self.level[node_id], {"stage": self.level[node_id], "calls": [], "width": 0, "cpu": 0.0, "memory_bytes": 0, "disk_gb": 0.0})
+            stage["calls"].append(node_id)
+            for key, value in self.demand(node_id).items():
+                stage[key] += value
+        return [stages[level] for level in sorted(stages)]
+
+    def peak_demand(self):
+        """The most of each resource in use at once. Each is maximized on its own, so they
+        may peak at different times."""
+        events = []
+        for node_id in self.resources:
+            if node_id in self.start and self.finish[node_id] > self.start[node_id]:
+                demand = self.demand(node_id)
+                events.append((self.start[node_id], 1, demand))
+                events.append((self.finish[node_id], 0, demand))
+        # calls finishing free their resources before calls starting at the same time take them
+        events.sort(key=lambda event: (event[0], event[1]))
+        current = {"width": 0, "cpu": 0.0, "memory_bytes": 0, "disk_gb": 0.0}
+        peak = dict(current)
+        for _, starting, demand in events:
+            for key, value in demand.items():
+                current[key] += value if starting else -value
+                peak[key] = max(peak[key], current[key])
+        return peak
+
+    def to_dict(self):
+        return {
+            "workflow": self.miniwdl_parser.workflow_name,
+            "unit": self.unit,
+            "critical_path": {
+                "length": self.finish[self.critical_path[-1]] if self.critical_path else 0.0,
+                "nodes": self.critical_path,
+            },
+            "peak": self.peak,
+            "stages": self.stages,
+            "scatter_sizes": self.scatter_sizes,
+            "calls": {
+                node_id: dict(
+                    entry,
+                    multiplicity=self.multiplicity[node_id],
+                    duration=self.duration(node_id),
+                    duration_known=node_id in self.durations,
+                    start=self.start.get(node_id),
+                    finish=self.finish.get(node_id),
+                    stage=self.level.get(node_id),
+                )
+                for node_id, entry in self.resources.items()
+            },
+        }
+
+    def report(self):
+        length = self.finish[self.critical_path[-1]] if self.critical_path else 0.0
+        calls = [node_id for node_id in self.critical_path if node_id in self.resources]
+        path = f"critical path of {len(calls)} calls"
+        if self.unit == "seconds":
+            path += f" taking {length:g} seconds"
+        return (
+            f"{path}, peak {self.peak['width']} calls, "
+            f"{self.peak['cpu']:g} cpu, {self.peak['memory_bytes'] / 2**30:.1f} GiB memory, {self.peak['disk_gb']:g} GB disk"
+        )
+
+    def flowchart(self, pwm):
+        """Creates the flowchart with the critical path highlighted. pwm should be created
+        with style_classes=CRITICAL_STYLE_CLASSES and without level of detail or
+        simplification, since links are styled by their position in the flowchart."""
+        from miniwdl_viz.workflow_graph import WorkflowGraph
+
+        parser = self.miniwdl_parser
+        mermaid_list = pwm.create_mermaid_flowchart(parser.workflow_name, parser.nodes, parser.edges)
+        for node_id in self.critical_path:
+            pwm.py_mermaid.set_node_class(node_id, "critical")
+
+        steps = set(zip(self.critical_path, self.critical_path[1:]))
+        links = [
+            str(ind)
+            for ind, edge in enumerate(pwm.flowchart_edges(WorkflowGraph(parser.nodes), parser.edges))
+            if (edge["node_from"], edge["node_to"]) in steps
+        ]
+        if links:
+            pwm.py_mermaid.append_row(f"linkStyle {','.join(links)} {CRITICAL_LINK_STYLE}")
+        return mermaid_list
+
+
+def parse_scatter_size(text):
+    section, _, size = text.rpartition("=")
+    if not section or not size.isdigit():
+        raise argparse.ArgumentTypeError(f"expected SECTION_ID=N, not {text}")
+    return section, int(size)
+
+
+def capacity_main(argv=None):
+    from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, add_style_arguments
+
+    arg_parser = argparse.ArgumentParser(
+        prog="wdl_to_mermaid capacity",
+        description=CapacityPlan.__doc__,
+    )
+    arg_parser.add_argument("input", help="WDL file")
+    arg_parser.add_argument("-I", "--import-path", action="append", default=[], help="directory to search for imports")
+    arg_parser.add_argument("--durations", help="json file of {call name, node id or task name: seconds}")
+    arg_parser.add_argument("--run-dir", action="append", default=[], help="past miniwdl run directory to take call durations from, can be repeated")
+    arg_parser.add_argument("--scatter-size", action="append", type=parse_scatter_size, default=[], metavar="SECTION_ID=N", help="number of elements of a scatter section, can be repeated")
+    arg_parser.add_argument("--default-scatter-size", type=int, default=DEFAULT_SCATTER_SIZE, help="number of elements of the other scatter sections")
+    arg_parser.add_argument("--default-cpu", type=float, default=DEFAULT_CPU, help="cpu of calls whose runtime section doesn't set a constant cpu")
+    arg_parser.add_argument("--default-memory", default=DEFAULT_MEMORY, help="memory of calls whose runtime section doesn't set a constant memory")
+    arg_parser.add_argument("-o", "--output-file", default="capacity.mmd", help="flowchart with the critical path highlighted")
+    arg_parser.add_argument("--json-output", help="write the numbers to this json file instead of the console")
+    add_style_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+
+    miniwdl_parser = parse_wdl(args.input, loader=DocumentLoader(path=args.import_path))
+    try:
+        resources = call_resources(miniwdl_parser, default_cpu=args.default_cpu, default_memory=args.default_memory)
+    except (ValueError, WDL.Error.SyntaxError) as exn:
+        arg_parser.error(f"--default-memory: {exn}")
+
+    durations = run_dir_durations(args.run_dir)
+    if args.durations:
+        with open(args.durations) as durations_file:
+            durations.update(json.load(durations_file))
+    try:
+        plan = CapacityPlan(
+            miniwdl_parser,
+            resources,
+            durations=match_durations(durations, resources),
+            scatter_sizes=dict(args.scatter_size),
+            default_scatter_size=args.default_scatter_size,
+        )
+    except ValueError as exn:
+        arg_parser.error(str(exn))
+
+    pwm = ParsedWDLToMermaid(
+        style_classes=CRITICAL_STYLE_CLASSES,
+        flowchart_dir=args.flowchart_dir,
+        suppress_workflow_input=(not args.show_workflow_input),
+        suppress_hardcoded_variables=(not args.show_hardcoded_variables),
+        max_input_str_length=args.max_input_str_length,
+        hide_input_names=(not args.show_input_names),
+        output_name=args.output_file,
+    )
+    pwm.output_mermaid(plan.flowchart(pwm), file_output=True)
+
+    text = json.dumps(plan.to_dict(), indent=4)
+    if args.json_output:
+        with open(args.json_output, "w") as json_file:
+            json_file.write(text)
+    else:
+        print(text)
+    print(f"Capacity: {plan.report()}", file=sys.stderr)
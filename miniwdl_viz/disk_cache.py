@@ -0,0 +1,95 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "miniwdl_viz")
+
+
+def atomic_write(path, data):
+    """Writes bytes to path via a rename, so concurrent readers never see a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class DiskCache:
+    """Directory of content-addressed entries with least recently used eviction once the
+    total size passes max_size bytes. Entries are written atomically, so several processes
+    can share one cache directory."""
+
+    def __init__(self, cache_dir, max_size=512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        # bytes in the cache directory, counted on the first put and then kept up to date, so
+        # the directory is only scanned again to evict
+        self.size = None
+
+    def entry_path(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # mtime doubles as the last access time for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key, data):
+        path = self.entry_path(key)
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        try:
+            # replacing an entry
+            self.size -= path.stat().st_size
+        except FileNotFoundError:
+            pass
+        atomic_write(path, data)
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        for path in self.cache_dir.glob("??/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= size
+        self.size = total_size
@@ -0,0 +1,328 @@
+import io
+import json
+import struct
+import zipfile
+
+from miniwdl_viz.miniwdl_parser import VIRTUAL_NODES, MiniWDLParser
+
+NODE_TYPES = ("input", "decl", "call", "workflow_section")
+# zip local file header: signature, versions, flags, compression, times, crc, sizes, then
+# the lengths of the file name and extra field
+ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("graph arrays need the numpy package: pip install 'miniwdl_viz[numpy]'")
+    return numpy
+
+
+class StringTable:
+    """Interns strings to consecutive integers, stored as one utf-8 buffer and offsets into it"""
+
+    def __init__(self, strings=None):
+        self.strings = list(strings or [])
+        self.indexes = {string: ind for ind, string in enumerate(self.strings)}
+
+    def index(self, string):
+        ind = self.indexes.get(string)
+        if ind is None:
+            ind = self.indexes[string] = len(self.strings)
+            self.strings.append(string)
+        return ind
+
+    def to_arrays(self):
+        np = import_numpy()
+        encoded = [string.encode() for string in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @classmethod
+    def from_arrays(cls, data, offsets):
+        data = bytes(data)
+        offsets = offsets.tolist()
+        return cls(data[start:end].decode() for start, end in zip(offsets, offsets[1:]))
+
+
+def neighbors(indptr, indices, frontier):
+    """The concatenated CSR rows of the frontier nodes"""
+    np = import_numpy()
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    # position of each row entry: its row's start plus its offset within the row
+    offsets = np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return indices[offsets]
+
+
+class GraphArrays:
+    """A parsed workflow graph as numpy arrays. Nodes are numbered in parse order, followed
+    by the virtual WorkflowInput and HardcodedVariable nodes, and their ids and names are
+    indexes into a string table. Edges are a CSR adjacency of each node's outgoing edges,
+    with the edge labels as string table indexes, and edge_order restores the parsed
+    order of the edges.
+
+    Saved to an uncompressed .npz, so load() can memory-map the arrays in place."""
+
+    ARRAYS = (
+        "string_data", "string_offsets", "meta",
+        "node_ids", "node_names", "node_types", "node_sections",
+        "indptr", "indices", "edge_order", "edge_workflow_refs", "edge_task_refs", "edge_types",
+    )
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self._strings = None
+        self._node_index = None
+        self._reverse = None
+
+    @property
+    def n_nodes(self):
+        """Number of nodes, including the virtual nodes"""
+        return len(self.node_ids)
+
+    @property
+    def strings(self):
+        if self._strings is None:
+            self._strings = StringTable.from_arrays(self.string_data, self.string_offsets).strings
+        return self._strings
+
+    @classmethod
+    def from_dict(cls, parsed_dict):
+        """Arrays of a MiniWDLParser.to_dict() result"""
+        np = import_numpy()
+        strings = StringTable()
+        nodes = parsed_dict["nodes"]
+        node_index = {node["id"]: ind for ind, node in enumerate(nodes)}
+        for name in VIRTUAL_NODES:
+            node_index[name] = len(node_index)
+        node_types = {node_type: ind for ind, node_type in enumerate(NODE_TYPES)}
+
+        n_nodes = len(node_index)
+        node_ids = np.fromiter((strings.index(node_id) for node_id in node_index), dtype=np.int32, count=n_nodes)
+        node_names = np.fromiter(
+            (strings.index(node["name"]) for node in nodes + [{"name": name} for name in VIRTUAL_NODES]), dtype=np.int32, count=n_nodes
+        )
+        node_type_codes = np.array([node_types[node["type"]] for node in nodes] + [node_types["input"]] * len(VIRTUAL_NODES), dtype=np.int8)
+        # -1 for the workflow itself
+        node_sections = np.array([node_index.get(node["section"], -1) for node in nodes] + [-1] * len(VIRTUAL_NODES), dtype=np.int32)
+
+        edges = parsed_dict["edges"]
+        n_edges = len(edges)
+        sources = np.fromiter((node_index[edge["node_from"]] for edge in edges), dtype=np.int32, count=n_edges)
+        targets = np.fromiter((node_index[edge["node_to"]] for edge in edges), dtype=np.int32, count=n_edges)
+        workflow_refs = np.fromiter((strings.index(str(edge["workflow_ref_name"])) for edge in edges), dtype=np.int32, count=n_edges)
+        task_refs = np.fromiter((strings.index(str(edge["task_ref_name"])) for edge in edges), dtype=np.int32, count=n_edges)
+        edge_types = np.fromiter((strings.index(edge["edge_type"]) for edge in edges), dtype=np.int32, count=n_edges)
+
+        # stable, so each node's edges keep their parsed order
+        order = np.argsort(sources, kind="stable").astype(np.int32)
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n_nodes), out=indptr[1:])
+
+        meta = {key: value for key, value in parsed_dict.items() if key not in ("nodes", "edges")}
+        string_data, string_offsets = strings.to_arrays()
+        return cls({
+            "string_data": string_data,
+            "string_offsets": string_offsets,
+            "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            "node_ids": node_ids,
+            "node_names": node_names,
+            "node_types": node_type_codes,
+            "node_sections": node_sections,
+            "indptr": indptr,
+            "indices": targets[order],
+            "edge_order": order,
+            "edge_workflow_refs": workflow_refs[order],
+            "edge_task_refs": task_refs[order],
+            "edge_types": edge_types[order],
+        })
+
+    @classmethod
+    def from_parser(cls, miniwdl_parser):
+        return cls.from_dict(miniwdl_parser.to_dict())
+
+    def to_dict(self):
+        """The MiniWDLParser.to_dict() result the arrays were made from"""
+        np = import_numpy()
+        strings = self.strings
+        n_real = self.n_nodes - len(VIRTUAL_NODES)
+        ids = [strings[ind] for ind in self.node_ids.tolist()]
+        names = self.node_names.tolist()
+        types = self.node_types.tolist()
+        sections = self.node_sections.tolist()
+        meta = json.loads(bytes(self.meta))
+        nodes = [
+            {
+                "id": ids[ind],
+                "name": strings[names[ind]],
+                "section": meta["name"] if sections[ind] < 0 else ids[sections[ind]],
+                "type": NODE_TYPES[types[ind]],
+            }
+            for ind in range(n_real)
+        ]
+
+        sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr)).tolist()
+        targets = self.indices.tolist()
+        workflow_refs = self.edge_workflow_refs.tolist()
+        task_refs = self.edge_task_refs.tolist()
+        edge_types = self.edge_types.tolist()
+        edges = [None] * len(targets)
+        for ind, position in enumerate(self.edge_order.tolist()):
+            edges[position] = {
+                "node_from": ids[sources[ind]],
+                "node_to": ids[targets[ind]],
+                "workflow_ref_name": strings[workflow_refs[ind]],
+                "task_ref_name": strings[task_refs[ind]],
+                "edge_type": strings[edge_types[ind]],
+            }
+        return dict(meta, nodes=nodes, edges=edges)
+
+    @classmethod
+    def concatenate(cls, graphs):
+        """One graph of many, for analyzing a corpus with one pass of numpy operations instead
+        of one per graph. Returns it with the index of each graph's first node, and the
+        graphs' nodes, virtual nodes included, are numbered one graph after the other."""
+        np = import_numpy()
+        node_offsets = np.cumsum([0] + [graph.n_nodes for graph in graphs])
+        edge_offsets = np.cumsum([0] + [len(graph.indices) for graph in graphs])
+        string_offsets = np.cumsum([0] + [len(graph.string_offsets) - 1 for graph in graphs])
+        byte_offsets = np.cumsum([0] + [len(graph.string_data) for graph in graphs])
+
+        def joined(name, offsets=None, keep_negative=False):
+            parts = []
+            for ind, graph in enumerate(graphs):
+                part = getattr(graph, name)
+                if offsets is not None:
+                    part = np.where(part < 0, part, part + offsets[ind]) if keep_negative else part + offsets[ind]
+                parts.append(part)
+            return np.concatenate(parts)
+
+        meta = {"name": "", "workflow_inputs": [], "workflow_outputs": [], "workflows": [json.loads(bytes(graph.meta))["name"] for graph in graphs]}
+        combined = cls({
+            "string_data": joined("string_data"),
+            "string_offsets": np.concatenate([graphs[0].string_offsets[:1]] + [graph.string_offsets[1:] + byte_offsets[ind] for ind, graph in enumerate(graphs)]),
+            "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            "node_ids": joined("node_ids", string_offsets),
+            "node_names": joined("node_names", string_offsets),
+            "node_types": joined("node_types"),
+            "node_sections": joined("node_sections", node_offsets, keep_negative=True),
+            "indptr": np.concatenate([graphs[0].indptr[:1]] + [graph.indptr[1:] + edge_offsets[ind] for ind, graph in enumerate(graphs)]),
+            "indices": joined("indices", node_offsets),
+            "edge_order": joined("edge_order", edge_offsets),
+            "edge_workflow_refs": joined("edge_workflow_refs", string_offsets),
+            "edge_task_refs": joined("edge_task_refs", string_offsets),
+            "edge_types": joined("edge_types", string_offsets),
+        })
+        return combined, node_offsets
+
+    def to_parser(self):
+        """A MiniWDLParser of the graph, to render it"""
+        return MiniWDLParser.from_dict(self.to_dict())
+
+    def node_index(self, node_id):
+        """Index of the node with id node_id"""
+        if self._node_index is None:
+            strings = self.strings
+            self._node_index = {strings[ind]: node for node, ind in enumerate(self.node_ids.tolist())}
+        return self._node_index[node_id]
+
+    def out_degree(self):
+        np = import_numpy()
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        np = import_numpy()
+        return np.bincount(self.indices, minlength=self.n_nodes)
+
+    def reverse(self):
+        """(indptr, indices) of each node's incoming edges"""
+        if self._reverse is None:
+            np = import_numpy()
+            order = np.argsort(self.indices, kind="stable")
+            sources = np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+            indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(self.in_degree(), out=indptr[1:])
+            self._reverse = (indptr, sources[order])
+        return self._reverse
+
+    def topological_levels(self):
+        """Level of every node, the number of edges on the longest path to it from a node
+        without inputs, or -1 for nodes on or after a cycle. Sections are nodes like any
+        other, the nodes inside them aren't below them."""
+        np = import_numpy()
+        remaining = self.in_degree()
+        levels = np.full(self.n_nodes, -1, dtype=np.int32)
+        frontier = np.flatnonzero(remaining == 0)
+        level = 0
+        while len(frontier):
+            levels[frontier] = level
+            # only the targets are touched, so a level costs its own edges, not the graph's nodes
+            targets, counts = np.unique(neighbors(self.indptr, self.indices, frontier), return_counts=True)
+            remaining[targets] -= counts
+            # each node is released once, by the last of its inputs
+            frontier = targets[remaining[targets] == 0]
+            level += 1
+        return levels
+
+    def reachable(self, sources, upstream=False, depth=None):
+        """Distance in edges from the nearest of the source node indexes to every node, along
+        edges or against them when upstream, -1 for nodes that can't be reached"""
+        np = import_numpy()
+        indptr, indices = self.reverse() if upstream else (self.indptr, self.indices)
+        distances = np.full(self.n_nodes, -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        distances[frontier] = 0
+        distance = 0
+        while len(frontier) and (depth is None or distance < depth):
+            distance += 1
+            targets = neighbors(indptr, indices, frontier)
+            frontier = np.unique(targets[distances[targets] < 0])
+            distances[frontier] = distance
+        return distances
+
+    def save(self, output):
+        """Writes the arrays to a path or binary file as an uncompressed .npz"""
+        np = import_numpy()
+        np.savez(output, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    def dumps(self):
+        output = io.BytesIO()
+        self.save(output)
+        return output.getvalue()
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Reads arrays saved with save(), memory-mapping them when mmap"""
+        np = import_numpy()
+        if not mmap:
+            with np.load(path) as npz:
+                return cls({name: npz[name] for name in cls.ARRAYS})
+        return cls(map_npz(path))
+
+
+def map_npz(path):
+    """{name: array} of an uncompressed .npz, with each array memory-mapped from the file"""
+    np = import_numpy()
+    header_readers = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as npz_file:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")]
+            npz_file.seek(info.header_offset)
+            local_header = ZIP_LOCAL_HEADER.unpack(npz_file.read(ZIP_LOCAL_HEADER.size))
+            npz_file.seek(info.header_offset + ZIP_LOCAL_HEADER.size + local_header[-2] + local_header[-1])
+            version = np.lib.format.read_magic(npz_file)
+            shape, fortran_order, dtype = header_readers[version](npz_file) if version in header_readers else ((0,), False, None)
+            if info.compress_type != zipfile.ZIP_STORED or 0 in shape:
+                # compressed arrays can't be mapped, and empty ones map nothing
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            mapped = np.memmap(path, dtype=dtype, mode="r", offset=npz_file.tell(), shape=shape, order="F" if fortran_order else "C")
+            # a plain view of the mapping, since every operation on a memmap pays for wrapping its result
+            arrays[name] = mapped.view(np.ndarray)
+    return arrays
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import re
+
+from miniwdl_viz.disk_cache import DiskCache, default_cache_dir
+
+# Bump whenever MiniWDLParser.to_dict() output changes for the same WDL source
+PARSER_VERSION = "2"
+
+IMPORT_RE = re.compile(r"""^\s*import\s+(?:"([^"]+)"|'([^']+)')""", re.MULTILINE)
+
+
+def import_candidates(uri, importer_path, import_path):
+    """Paths a file import may resolve to, in the order miniwdl tries them"""
+    if uri.startswith("file:///"):
+        uri = uri[7:]
+    if os.path.isabs(uri):
+        return [os.path.abspath(uri)]
+    return [os.path.abspath(os.path.join(directory, uri)) for directory in [os.path.dirname(importer_path)] + list(reversed(import_path))]
+
+
+def resolve_import(uri, importer_path, import_path):
+    """Mirrors the miniwdl file import resolution without loading miniwdl"""
+    for candidate in import_candidates(uri, importer_path, import_path):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def source_digest(wdl_file, import_path=None, variant=""):
+    """Hashes a WDL file and all transitively imported sources. Returns None if an import
+    can't be resolved locally, since the result then can't be keyed reliably. variant
+    separates entries parsed with different options."""
+    import_path = import_path or []
+    digest = hashlib.sha256(f"miniwdl_viz-parser-{PARSER_VERSION}{variant}".encode())
+    seen = set()
+    pending = [(os.path.abspath(wdl_file), None)]
+    while pending:
+        path, uri = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            with open(path, "rb") as f:
+                source = f.read()
+        except OSError:
+            return None
+        # the import uri is hashed too, since it determines the namespace
+        digest.update(f"\0{uri}\0".encode())
+        digest.update(hashlib.sha256(source).digest())
+        imports = []
+        for match in IMPORT_RE.finditer(source.decode("utf-8", errors="replace")):
+            import_uri = match.group(1) or match.group(2)
+            if import_uri.startswith(("http://", "https://")):
+                return None
+            import_file = resolve_import(import_uri, path, import_path)
+            if import_file is None:
+                return None
+            imports.append((import_file, import_uri))
+        pending.extend(reversed(imports))
+    return digest.hexdigest()
+
+
+class GraphCache:
+    """Persistent cache of MiniWDLParser.to_dict() results keyed by the WDL source tree"""
+
+    def __init__(self, cache_dir=None, max_size=512 * 1024 * 1024, import_path=None):
+        self.disk_cache = DiskCache(
+            os.path.join(cache_dir or default_cache_dir(), "graphs"), max_size=max_size
+        )
+        self.import_path = import_path or []
+
+    def key(self, wdl_file, variant=""):
+        return source_digest(wdl_file, self.import_path, variant)
+
+    def get(self, wdl_file, key=None):
+        key = key or self.key(wdl_file)
+        if key is None:
+            return None
+        data = self.disk_cache.get(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put(self, wdl_file, parsed_dict, key=None):
+        key = key or self.key(wdl_file)
+        if key is None:
+            return
+        self.disk_cache.put(key, json.dumps(parsed_dict, separators=(",", ":")).encode())
+
+
+def add_cache_arguments(arg_parser):
+    arg_parser.add_argument("--cache", action='store_true', default=False, help=f"cache parsed graphs and remote renders on disk, in --cache-dir or {default_cache_dir()}")
+    arg_parser.add_argument("--cache-dir", default=None, help="cache directory, implies --cache")
+
+
+def cache_enabled(args):
+    """Nothing is written to disk unless asked for"""
+    return args.cache or args.cache_dir is not None
+
+
+def create_graph_cache(args):
+    if not cache_enabled(args):
+        return None
+    return GraphCache(cache_dir=args.cache_dir, import_path=getattr(args, "import_path", None))
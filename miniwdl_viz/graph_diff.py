@@ -0,0 +1,212 @@
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
+
+from miniwdl_viz.graph_cache import add_cache_arguments
+from miniwdl_viz.miniwdl_parser import VIRTUAL_NODES, add_parse_arguments
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+DIFF_STYLE_CLASSES = [
+    "classDef added fill:#9e9,stroke:#393",
+    "classDef removed fill:#f99,stroke:#c33,stroke-dasharray:5 5",
+    "classDef changed fill:#fe8,stroke:#b90",
+]
+LINK_STYLES = {
+    "added": "stroke:#393,stroke-width:2px",
+    "removed": "stroke:#c33,stroke-width:2px,stroke-dasharray:5 5",
+    "changed": "stroke:#b90,stroke-width:2px",
+}
+
+
+def content_hash(obj):
+    """Hex digest of the canonical json of obj, independent of dict key order"""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def node_hash(node):
+    return content_hash(node)
+
+
+def edge_hash(edge):
+    return content_hash(edge)
+
+
+def edge_key(edge):
+    """What identifies an edge across revisions: the input of node_to it feeds, and from where"""
+    return edge["node_from"], edge["node_to"], edge["task_ref_name"]
+
+
+def canonical_graph(miniwdl_parser):
+    """The parsed graph with nodes, edges, inputs and outputs in a traversal independent order"""
+    return {
+        "name": miniwdl_parser.workflow_name,
+        "workflow_inputs": sorted(miniwdl_parser.inputs, key=lambda item: item["name"]),
+        "workflow_outputs": sorted(miniwdl_parser.outputs, key=lambda item: item["name"]),
+        "nodes": sorted(miniwdl_parser.nodes, key=lambda node: node["id"]),
+        "edges": sorted(miniwdl_parser.edges, key=lambda edge: (edge_key(edge), edge_hash(edge))),
+    }
+
+
+def graph_hash(miniwdl_parser):
+    """Hash of the workflow structure, the same whatever order it was parsed in. Stable across
+    runs and machines, so it can key caches of anything derived from the graph."""
+    return content_hash(canonical_graph(miniwdl_parser))
+
+
+class GraphDiff:
+    """Added, removed and changed nodes and edges between two parsed workflows
+
+    Nodes are matched by id and edges by edge_key, then compared by hash, so the diff
+    takes a single pass over each graph. Edges sharing a key are matched as a multiset of
+    hashes, and only the ones left over on both sides count as changed."""
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        old_nodes = {node["id"]: node for node in old.nodes}
+        new_nodes = {node["id"]: node for node in new.nodes}
+        self.added_nodes = [node_id for node_id in new_nodes if node_id not in old_nodes]
+        self.removed_nodes = [node_id for node_id in old_nodes if node_id not in new_nodes]
+        self.changed_nodes = [
+            node_id
+            for node_id, node in new_nodes.items()
+            if node_id in old_nodes and node_hash(node) != node_hash(old_nodes[node_id])
+        ]
+
+        self.added_edges = []
+        self.removed_edges = []
+        self.changed_edges = []
+        old_edges = self.edges_by_key(old.edges)
+        for key, new_group in self.edges_by_key(new.edges).items():
+            added, removed = self.unmatched(new_group, old_edges.pop(key, []))
+            # what's left on both sides of a key is an edge that changed, the rest came or went
+            self.changed_edges.extend(added[: len(removed)])
+            self.added_edges.extend(added[len(removed) :])
+            self.removed_edges.extend(removed[len(added) :])
+        for old_group in old_edges.values():
+            self.removed_edges.extend(old_group)
+        # in the order of the graphs they come from
+        for edges, graph in [(self.added_edges, new), (self.changed_edges, new), (self.removed_edges, old)]:
+            order = {id(edge): ind for ind, edge in enumerate(graph.edges)}
+            edges.sort(key=lambda edge: order[id(edge)])
+
+    @staticmethod
+    def edges_by_key(edges):
+        """edge_key -> edges, since one expression can read several outputs of the same call"""
+        grouped = {}
+        for edge in edges:
+            grouped.setdefault(edge_key(edge), []).append(edge)
+        return grouped
+
+    @staticmethod
+    def unmatched(new_group, old_group):
+        """The edges of each group without an identical edge in the other, counting duplicates"""
+        new_hashes = Counter(edge_hash(edge) for edge in new_group)
+        old_hashes = Counter(edge_hash(edge) for edge in old_group)
+        common = new_hashes & old_hashes
+
+        def remaining(group):
+            left = Counter(common)
+            unmatched = []
+            for edge in group:
+                digest = edge_hash(edge)
+                if left[digest]:
+                    left[digest] -= 1
+                else:
+                    unmatched.append(edge)
+            return unmatched
+
+        return remaining(new_group), remaining(old_group)
+
+    @property
+    def changed(self):
+        return any(
+            [self.added_nodes, self.removed_nodes, self.changed_nodes, self.added_edges, self.removed_edges, self.changed_edges]
+        )
+
+    def report(self):
+        return (
+            f"nodes +{len(self.added_nodes)} -{len(self.removed_nodes)} ~{len(self.changed_nodes)}, "
+            f"edges +{len(self.added_edges)} -{len(self.removed_edges)} ~{len(self.changed_edges)}"
+        )
+
+    def union_graph(self):
+        """Nodes and edges of the new workflow, plus the removed ones in their old sections"""
+        nodes = list(self.new.nodes)
+        removed = set(self.removed_nodes)
+        for node in self.old.nodes:
+            if node["id"] in removed:
+                section = self.new.workflow_name if node["section"] == self.old.workflow_name else node["section"]
+                nodes.append(dict(node, section=section))
+        return nodes, list(self.new.edges) + self.removed_edges
+
+    def edge_states(self):
+        """id() of each edge of union_graph() -> added, removed or changed, by identity since
+        edges can share a key"""
+        states = {}
+        for state, edges in [("added", self.added_edges), ("removed", self.removed_edges), ("changed", self.changed_edges)]:
+            for edge in edges:
+                states[id(edge)] = state
+        return states
+
+    def flowchart(self, pwm):
+        """Creates one flowchart of both revisions. pwm should be created with
+        style_classes=DIFF_STYLE_CLASSES and without level of detail or simplification,
+        since links are styled by their position in the flowchart."""
+        nodes, edges = self.union_graph()
+        mermaid_list = pwm.create_mermaid_flowchart(self.new.workflow_name, nodes, edges)
+
+        for state, node_ids in [("added", self.added_nodes), ("removed", self.removed_nodes), ("changed", self.changed_nodes)]:
+            if node_ids:
+                pwm.py_mermaid.append_row(f"class {','.join(node_ids)} {state}")
+
+        # grouped edges between the same nodes are a single link, styled by what changed
+        # between those nodes: added or removed if all of it was, else changed
+        edge_states = self.edge_states()
+        pair_states = {}
+        for edge in edges:
+            pair = (edge["node_from"], edge["node_to"])
+            pair_states.setdefault(pair, set()).add(edge_states.get(id(edge)))
+        links = {}
+        for ind, edge in enumerate(pwm.flowchart_edges(WorkflowGraph(nodes), edges)):
+            states = pair_states[(edge["node_from"], edge["node_to"])] if pwm.group_edges else {edge_states.get(id(edge))}
+            if states == {None}:
+                continue
+            state = states.pop() if len(states) == 1 else "changed"
+            links.setdefault(state, []).append(str(ind))
+        for state, indices in links.items():
+            pwm.py_mermaid.append_row(f"linkStyle {','.join(indices)} {LINK_STYLES[state]}")
+        return mermaid_list
+
+
+def diff_main(argv=None):
+    from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, add_style_arguments, load_input
+
+    arg_parser = argparse.ArgumentParser(
+        prog="wdl_to_mermaid diff",
+        description=GraphDiff.__doc__,
+    )
+    arg_parser.add_argument("old", help="WDL file, or a json/yaml/msgpack/npz graph file written by miniwdl_parser")
+    arg_parser.add_argument("new", help="WDL file, or a json/yaml/msgpack/npz graph file written by miniwdl_parser")
+    arg_parser.add_argument("-o", "--output-file", default="diff.mmd")
+    arg_parser.add_argument("--print-flowchart", action='store_true', default=False, help="print the flowchart to the console instead of output_file")
+    add_style_arguments(arg_parser)
+    add_parse_arguments(arg_parser)
+    add_cache_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+
+    graph_diff = GraphDiff(load_input(args, path=args.old), load_input(args, path=args.new))
+    pwm = ParsedWDLToMermaid(
+        style_classes=DIFF_STYLE_CLASSES,
+        flowchart_dir=args.flowchart_dir,
+        suppress_workflow_input=(not args.show_workflow_input),
+        suppress_hardcoded_variables=(not args.show_hardcoded_variables),
+        max_input_str_length=args.max_input_str_length,
+        hide_input_names=(not args.show_input_names),
+        output_name=args.output_file,
+    )
+    pwm.output_mermaid(graph_diff.flowchart(pwm), file_output=not args.print_flowchart)
+    print(f"Diff: {graph_diff.report()}", file=sys.stderr)
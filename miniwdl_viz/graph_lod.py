@@ -0,0 +1,259 @@
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+# at most this many distinct input names are listed on an aggregated edge
+MAX_EDGE_LABELS = 3
+
+
+def format_labels(names, max_labels=MAX_EDGE_LABELS):
+    """Joins edge labels, listing at most max_labels of them"""
+    label = ", ".join(names[:max_labels])
+    if len(names) > max_labels:
+        label += f", +{len(names) - max_labels} more"
+    return label
+
+
+def edge_count(edges):
+    """Number of edges in the rendered flowchart, where edges between the same nodes are grouped"""
+    return len({(edge["node_from"], edge["node_to"]) for edge in edges})
+
+
+class LevelOfDetail:
+    """Reduces the nodes and edges of a parsed workflow so huge workflows stay renderable.
+
+    Sections (scatter/if) can be collapsed by id or by nesting depth into a single summary
+    node whose edges are re-routed and aggregated, decl nodes can be dropped by splicing
+    their inputs through to their consumers, and with a node/edge budget the largest
+    sections are collapsed first until the flowchart fits."""
+
+    def __init__(self, collapse_sections=None, max_depth=None, drop_decls=False, max_nodes=None, max_edges=None):
+        self.collapse_sections = set(collapse_sections or [])
+        self.max_depth = max_depth
+        self.drop_decls = drop_decls
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.stats = {}
+
+    @staticmethod
+    def section_depths(workflow_name, graph):
+        """Nesting depth of every section, 1 for sections directly in the workflow"""
+        depths = {}
+        for node in graph.nodes:
+            if node["type"] == "workflow_section":
+                depth, section = 1, node["section"]
+                while section != workflow_name and section in graph:
+                    depth += 1
+                    section = graph.get_node(section)["section"]
+                depths[node["id"]] = depth
+        return depths
+
+    @staticmethod
+    def descendant_counts(workflow_name, graph):
+        """Number of nodes inside each section, including nested sections and their contents"""
+        counts = {}
+        for node in graph.nodes:
+            section = node["section"]
+            while section != workflow_name and section in graph:
+                counts[section] = counts.get(section, 0) + 1
+                section = graph.get_node(section)["section"]
+        return counts
+
+    @staticmethod
+    def representatives(workflow_name, graph, collapsed):
+        """Maps every node inside a collapsed section to its outermost collapsed section"""
+        representative = {}
+        for node in graph.nodes:
+            rep, section = None, node["id"]
+            while section != workflow_name and section in graph:
+                if section in collapsed:
+                    rep = section
+                section = graph.get_node(section)["section"]
+            if rep is not None and rep != node["id"]:
+                representative[node["id"]] = rep
+        return representative
+
+    @staticmethod
+    def splice_decls(graph):
+        """Returns the edges with decl nodes removed, connecting each decl's inputs to its consumers"""
+        sources = {}
+
+        def decl_sources(decl_id):
+            if decl_id not in sources:
+                sources[decl_id] = []  # guards against cycles
+                found = {}
+                for edge in graph.edges_to(decl_id):
+                    if edge["node_from"] in graph and graph.get_node(edge["node_from"])["type"] == "decl":
+                        for source in decl_sources(edge["node_from"]):
+                            found.setdefault(source["node_from"], source)
+                    else:
+                        found.setdefault(edge["node_from"], edge)
+                sources[decl_id] = list(found.values())
+            return sources[decl_id]
+
+        edges = []
+        for edge in graph.edges:
+            if edge["node_to"] in graph and graph.get_node(edge["node_to"])["type"] == "decl":
+                continue
+            if edge["node_from"] in graph and graph.get_node(edge["node_from"])["type"] == "decl":
+                for source in decl_sources(edge["node_from"]):
+                    edges.append(dict(edge, node_from=source["node_from"], edge_type=source["edge_type"]))
+            else:
+                edges.append(edge)
+        return edges
+
+    @staticmethod
+    def aggregate_edges(edges, representative):
+        """Re-routes edges to the collapsed sections, merging edges between the same nodes"""
+        if not representative:
+            return edges
+        aggregated = {}
+        labels = {}
+        for edge in edges:
+            node_from = representative.get(edge["node_from"], edge["node_from"])
+            node_to = representative.get(edge["node_to"], edge["node_to"])
+            if node_from == node_to:
+                continue
+            if node_from == edge["node_from"] and node_to == edge["node_to"]:
+                aggregated[id(edge)] = edge
+                continue
+            key = (node_from, node_to)
+            if key not in aggregated:
+                aggregated[key] = dict(edge, node_from=node_from, node_to=node_to)
+                labels[key] = {}
+            labels[key][edge["task_ref_name"]] = None
+
+        for key, key_labels in labels.items():
+            aggregated[key]["task_ref_name"] = format_labels(list(key_labels))
+        return list(aggregated.values())
+
+    def collapsed_nodes(self, graph, representative, collapsed, counts):
+        nodes = []
+        for node in graph.nodes:
+            if node["id"] in representative or (self.drop_decls and node["type"] == "decl"):
+                continue
+            if node["id"] in collapsed:
+                node = dict(node, name=f"{node['name']} ({counts.get(node['id'], 0)} nodes collapsed)")
+            nodes.append(node)
+        return nodes
+
+    @staticmethod
+    def descendants(graph, section):
+        """Ids of every node nested in section"""
+        ids = []
+        stack = [section]
+        while stack:
+            for child in graph.children(stack.pop()):
+                ids.append(child["id"])
+                if child["type"] == "workflow_section":
+                    stack.append(child["id"])
+        return ids
+
+    def fit_budget(self, graph, edges, collapsed, representative, counts, depths):
+        """Collapses the largest sections until the node and edge budgets are met, updating
+        collapsed and representative in place. The visible node count and the rendered
+        (node_from, node_to) pairs are kept up to date as each section collapses, so every
+        collapse only touches the nodes inside it and their edges."""
+        def hidden(node):
+            return node["id"] in representative or (self.drop_decls and node["type"] == "decl")
+
+        # (node_from, node_to) -> number of edges drawn between them
+        pairs = {}
+
+        def route(edge, change):
+            key = (representative.get(edge["node_from"], edge["node_from"]), representative.get(edge["node_to"], edge["node_to"]))
+            if key[0] == key[1]:
+                return
+            pairs[key] = pairs.get(key, 0) + change
+            if not pairs[key]:
+                del pairs[key]
+
+        n_visible = sum(1 for node in graph.nodes if not hidden(node))
+        # indexes of each node's edges, only needed to count edges
+        incident = {}
+        if self.max_edges is not None:
+            for ind, edge in enumerate(edges):
+                incident.setdefault(edge["node_from"], []).append(ind)
+                incident.setdefault(edge["node_to"], []).append(ind)
+                route(edge, 1)
+
+        def fits():
+            if self.max_nodes is not None and n_visible > self.max_nodes:
+                return False
+            return self.max_edges is None or len(pairs) <= self.max_edges
+
+        # largest first, so the fewest sections are collapsed to fit the budget
+        candidates = sorted(depths, key=lambda section: (-counts.get(section, 0), depths[section]))
+        for section in candidates:
+            if fits():
+                break
+            if section in collapsed or section in representative or not counts.get(section):
+                continue
+            contents = self.descendants(graph, section)
+            moved = {ind for node_id in contents for ind in incident.get(node_id, [])}
+            for ind in moved:
+                route(edges[ind], -1)
+            for node_id in contents:
+                if not hidden(graph.get_node(node_id)):
+                    n_visible -= 1
+                representative[node_id] = section
+            for ind in moved:
+                route(edges[ind], 1)
+            collapsed.add(section)
+
+    def apply(self, workflow_name, nodes, edges):
+        """Returns the reduced (nodes, edges), recording before/after counts in self.stats"""
+        graph = WorkflowGraph(nodes, edges)
+        counts = self.descendant_counts(workflow_name, graph)
+        depths = self.section_depths(workflow_name, graph)
+        collapsed = {section for section in self.collapse_sections if section in depths}
+        if self.max_depth is not None:
+            collapsed.update(section for section, depth in depths.items() if depth > self.max_depth)
+
+        if self.drop_decls:
+            edges = self.splice_decls(graph)
+
+        representative = self.representatives(workflow_name, graph, collapsed)
+        dropped_decls = sum(1 for node in graph.nodes if node["type"] == "decl") if self.drop_decls else 0
+
+        if self.max_nodes is not None or self.max_edges is not None:
+            self.fit_budget(graph, edges, collapsed, representative, counts, depths)
+
+        reduced_edges = self.aggregate_edges(edges, representative)
+        reduced_nodes = self.collapsed_nodes(graph, representative, collapsed, counts)
+        self.stats = {
+            "nodes_before": len(graph.nodes),
+            "edges_before": edge_count(graph.edges),
+            "nodes_after": len(reduced_nodes),
+            "edges_after": edge_count(reduced_edges),
+            "collapsed_sections": len({section for section in collapsed if section not in representative}),
+            "dropped_decls": dropped_decls,
+        }
+        return reduced_nodes, reduced_edges
+
+    def report(self):
+        stats = self.stats
+        return (
+            f"nodes {stats['nodes_before']} -> {stats['nodes_after']}, "
+            f"edges {stats['edges_before']} -> {stats['edges_after']}, "
+            f"{stats['collapsed_sections']} sections collapsed, {stats['dropped_decls']} decls dropped"
+        )
+
+
+def add_lod_arguments(arg_parser):
+    arg_parser.add_argument("--collapse-section", action="append", default=[], help="id of a scatter/if section to collapse into a single node, can be repeated")
+    arg_parser.add_argument("--max-depth", type=int, default=None, help="collapse sections nested deeper than this, 0 collapses every section")
+    arg_parser.add_argument("--drop-decls", action='store_true', default=False, help="remove decl nodes, connecting their inputs directly to their consumers")
+    arg_parser.add_argument("--max-nodes", type=int, default=None, help="collapse the largest sections until the flowchart has at most this many nodes")
+    arg_parser.add_argument("--max-edges", type=int, default=None, help="collapse the largest sections until the flowchart has at most this many edges")
+
+
+def create_level_of_detail(args):
+    """Returns a LevelOfDetail for the parsed arguments, or None when nothing is reduced"""
+    if not (args.collapse_section or args.max_depth is not None or args.drop_decls or args.max_nodes or args.max_edges):
+        return None
+    return LevelOfDetail(
+        collapse_sections=args.collapse_section,
+        max_depth=args.max_depth,
+        drop_decls=args.drop_decls,
+        max_nodes=args.max_nodes,
+        max_edges=args.max_edges,
+    )
@@ -0,0 +1,140 @@
+from miniwdl_viz.graph_lod import MAX_EDGE_LABELS, edge_count, format_labels
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+class GraphSimplifier:
+    """Removes redundant edges before the flowchart is emitted.
+
+    transitive_reduction drops an edge when its target is also reachable through another
+    path, drop_implied drops edges implied by subgraph membership (from a section into its
+    own contents, or into a node whose enclosing section already has an edge from the same
+    source), and bundle_edges merges all edges between two nodes into one edge listing at
+    most max_labels input names."""
+
+    def __init__(self, transitive_reduction=False, drop_implied=False, bundle_edges=False, max_labels=MAX_EDGE_LABELS):
+        self.transitive_reduction = transitive_reduction
+        self.drop_implied = drop_implied
+        self.bundle_edges = bundle_edges
+        self.max_labels = max_labels
+        self.stats = {}
+
+    @staticmethod
+    def ancestors(graph, node_id):
+        """Sections enclosing a node, innermost first"""
+        sections = []
+        section = graph.get_node(node_id)["section"] if node_id in graph else None
+        while section in graph:
+            sections.append(section)
+            section = graph.get_node(section)["section"]
+        return sections
+
+    def implied_edges(self, graph, edges):
+        pairs = {(edge["node_from"], edge["node_to"]) for edge in edges}
+        implied = set()
+        for node_from, node_to in pairs:
+            for section in self.ancestors(graph, node_to):
+                if section == node_from or (node_from, section) in pairs:
+                    implied.add((node_from, node_to))
+                    break
+        return implied
+
+    @staticmethod
+    def redundant_edges(edges):
+        """Pairs (u, v) where v is also reachable from u through a longer path"""
+        children = {}
+        in_degree = {}
+        for edge in edges:
+            node_from, node_to = edge["node_from"], edge["node_to"]
+            targets = children.setdefault(node_from, {})
+            if node_to not in targets:
+                targets[node_to] = None
+                in_degree[node_to] = in_degree.get(node_to, 0) + 1
+            in_degree.setdefault(node_from, 0)
+
+        # Kahn's algorithm, nodes on a cycle never reach in-degree 0 and are left alone
+        order = [node for node, degree in in_degree.items() if degree == 0]
+        for node in order:
+            for child in children.get(node, {}):
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    order.append(child)
+
+        # reachable sets as int bitsets, filled in reverse topological order
+        bit = {node: 1 << ind for ind, node in enumerate(order)}
+        reach = {}
+        redundant = set()
+        for node in reversed(order):
+            node_reach = 0
+            through_children = 0
+            for child in children.get(node, {}):
+                if child not in bit:
+                    continue
+                child_reach = reach[child]
+                node_reach |= bit[child] | child_reach
+                through_children |= child_reach
+            for child in children.get(node, {}):
+                if child in bit and through_children & bit[child]:
+                    redundant.add((node, child))
+            reach[node] = node_reach
+        return redundant
+
+    def bundle(self, edges):
+        bundled = {}
+        labels = {}
+        for edge in edges:
+            key = (edge["node_from"], edge["node_to"])
+            if key not in bundled:
+                bundled[key] = edge
+                labels[key] = {}
+            labels[key][edge["task_ref_name"]] = None
+        for key, key_labels in labels.items():
+            if len(key_labels) > 1:
+                bundled[key] = dict(bundled[key], task_ref_name=format_labels(list(key_labels), self.max_labels))
+        return list(bundled.values())
+
+    def apply(self, workflow_name, nodes, edges):
+        """Returns (nodes, simplified edges), recording what each pass removed in self.stats"""
+        graph = WorkflowGraph(nodes)
+        self.stats = {"edges_before": edge_count(edges), "implied": 0, "transitive": 0}
+
+        if self.drop_implied:
+            implied = self.implied_edges(graph, edges)
+            edges = [edge for edge in edges if (edge["node_from"], edge["node_to"]) not in implied]
+            self.stats["implied"] = len(implied)
+        if self.transitive_reduction:
+            redundant = self.redundant_edges(edges)
+            edges = [edge for edge in edges if (edge["node_from"], edge["node_to"]) not in redundant]
+            self.stats["transitive"] = len(redundant)
+        if self.bundle_edges:
+            edges = self.bundle(edges)
+
+        self.stats["edges_after"] = edge_count(edges)
+        return nodes, edges
+
+    def report(self):
+        stats = self.stats
+        return (
+            f"edges {stats['edges_before']} -> {stats['edges_after']}, "
+            f"{stats['implied']} implied by subgraphs, {stats['transitive']} transitive"
+        )
+
+
+def add_simplify_arguments(arg_parser):
+    arg_parser.add_argument("--transitive-reduction", action='store_true', default=False, help="drop edges whose target is also reachable through another path")
+    arg_parser.add_argument("--drop-implied-edges", action='store_true', default=False, help="drop edges implied by subgraph membership")
+    arg_parser.add_argument("--bundle-edges", action='store_true', default=False, help="merge edges between the same nodes into one edge with a bounded label list")
+    arg_parser.add_argument("--simplify", action='store_true', default=False, help="all of --transitive-reduction, --drop-implied-edges and --bundle-edges")
+
+
+def create_graph_simplifier(args):
+    """Returns a GraphSimplifier for the parsed arguments, or None to keep every edge"""
+    transitive_reduction = args.simplify or args.transitive_reduction
+    drop_implied = args.simplify or args.drop_implied_edges
+    bundle_edges = args.simplify or args.bundle_edges
+    if not (transitive_reduction or drop_implied or bundle_edges):
+        return None
+    return GraphSimplifier(
+        transitive_reduction=transitive_reduction,
+        drop_implied=drop_implied,
+        bundle_edges=bundle_edges,
+    )
@@ -0,0 +1,104 @@
+from miniwdl_viz.graph_diff import content_hash
+from miniwdl_viz.miniwdl_parser import VIRTUAL_NODES, MiniWDLParser
+from miniwdl_viz.profiler import stage
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+class SliceError(ValueError):
+    """Raised when the focus of a slice isn't a node of the workflow, or names several"""
+
+
+class GraphSlice:
+    """Keeps only the nodes upstream and/or downstream of a focus node, at most depth edges
+    away, and the scatter/if sections enclosing them for context.
+
+    The walk is a breadth first search over the graph's edge indexes, so it only visits
+    the slice, and the name and position indexes it needs are kept on the graph for the
+    next slice. Edges are kept between nodes of the slice, sections only kept for context
+    have none."""
+
+    def __init__(self, focus, upstream=True, downstream=True, depth=None):
+        self.focus = focus
+        self.upstream = upstream
+        self.downstream = downstream
+        self.depth = depth
+        self.stats = {}
+
+    def key(self, workflow_hash):
+        """Cache key of this slice of the workflow with the given graph_hash"""
+        return content_hash([workflow_hash, self.focus, self.upstream, self.downstream, self.depth])
+
+    def resolve(self, graph):
+        """The node id of the focus, which is a node id or the name of a node"""
+        if self.focus in graph or self.focus in VIRTUAL_NODES:
+            return self.focus
+        matches = graph.nodes_named(self.focus)
+        if not matches:
+            raise SliceError(f"no node {self.focus} to focus on")
+        if len(matches) > 1:
+            raise SliceError(f"{self.focus} names several nodes, focus on one of {', '.join(matches)}")
+        return matches[0]
+
+    def select(self, graph):
+        """Returns the (nodes, edges) of the slice of an indexed WorkflowGraph"""
+        focus = self.resolve(graph)
+        kept = {focus: 0}
+        if self.upstream:
+            kept.update(graph.reachable(focus, upstream=True, depth=self.depth))
+        if self.downstream:
+            kept.update(graph.reachable(focus, depth=self.depth))
+
+        context = set()
+        for node_id in kept:
+            section = graph.get_node(node_id)["section"] if node_id in graph else None
+            while section in graph and section not in kept and section not in context:
+                context.add(section)
+                section = graph.get_node(section)["section"]
+
+        # in the order of the whole graph, so the flowchart is laid out the same way
+        node_ids = sorted([node_id for node_id in kept if node_id in graph] + list(context), key=graph.position)
+        nodes = [graph.get_node(node_id) for node_id in node_ids]
+        edges = [
+            edge
+            for node in nodes
+            if node["id"] in kept
+            for edge in graph.edges_to(node["id"])
+            if edge["node_from"] in kept
+        ]
+        self.stats = {
+            "nodes_before": len(graph.nodes),
+            "nodes_after": len(nodes),
+            "edges_before": len(graph.edges),
+            "edges_after": len(edges),
+        }
+        return nodes, edges
+
+    def apply(self, workflow_name, nodes, edges):
+        return self.select(WorkflowGraph(nodes, edges))
+
+    def apply_to(self, miniwdl_parser):
+        """A parser of the slice, reusing the edge indexes of the parsed graph. The workflow
+        inputs and outputs are kept as they are."""
+        with stage("slice", focus=self.focus):
+            nodes, edges = self.select(miniwdl_parser.graph)
+        return MiniWDLParser.from_dict(dict(miniwdl_parser.to_dict(), nodes=nodes, edges=edges))
+
+    def report(self):
+        stats = self.stats
+        return f"nodes {stats['nodes_before']} -> {stats['nodes_after']}, edges {stats['edges_before']} -> {stats['edges_after']}"
+
+
+def add_slice_arguments(arg_parser):
+    arg_parser.add_argument("--focus", default=None, help="only draw the nodes upstream and downstream of this call (a name or node id)")
+    arg_parser.add_argument("--upstream", action='store_true', default=False, help="with --focus, only draw what the call depends on")
+    arg_parser.add_argument("--downstream", action='store_true', default=False, help="with --focus, only draw what depends on the call")
+    arg_parser.add_argument("--depth", type=int, default=None, help="with --focus, only draw nodes at most this many edges away")
+
+
+def create_graph_slice(args):
+    """Returns a GraphSlice for the parsed arguments, or None to draw the whole workflow"""
+    if args.focus is None:
+        return None
+    # neither direction given means both
+    both = not (args.upstream or args.downstream)
+    return GraphSlice(args.focus, upstream=both or args.upstream, downstream=both or args.downstream, depth=args.depth)
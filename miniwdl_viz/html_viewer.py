@@ -0,0 +1,233 @@
+import html
+import json
+import os
+
+from miniwdl_viz.graph_lod import LevelOfDetail
+from miniwdl_viz.mermaid_node import NodeType
+from miniwdl_viz.miniwdl_parser import VIRTUAL_NODES
+from miniwdl_viz.profiler import stage
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+# a mermaid build the page works with, to download for --mermaid-js
+MERMAID_CDN_URL = "https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.min.js"
+COLLAPSED_STYLE_CLASS = "classDef collapsed fill:#eef,stroke:#557,stroke-dasharray:4,cursor:pointer"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em; }}
+details {{ margin: 0.5em 0 0.5em 1.5em; }}
+summary {{ cursor: pointer; font-weight: bold; }}
+.diagram {{ overflow: auto; }}
+.error {{ color: #c33; white-space: pre-wrap; }}
+</style>
+{mermaid_script}
+</head>
+<body>
+<h1>{title}</h1>
+<p>Click a dashed section, or open it below, to draw its contents.</p>
+<div id="miniwdl-viz-top" class="diagram">Rendering...</div>
+<div id="miniwdl-viz-sections"></div>
+<script type="application/json" id="miniwdl-viz-data">{data}</script>
+<script>
+(function () {{
+  mermaid.initialize({{startOnLoad: false, securityLevel: "loose", maxTextSize: 100000000}});
+  var sections = JSON.parse(document.getElementById("miniwdl-viz-data").textContent);
+  var byId = {{}};
+  // section id -> promise of its drawn diagram, so every section is laid out once
+  var rendered = {{}};
+
+  function renderMermaid(elementId, text) {{
+    // mermaid 10 resolves to {{svg, bindFunctions}}, 9 returns the svg. Neither is given a
+    // callback: 10 takes its third argument as the element to render in.
+    return new Promise(function (resolve) {{
+      resolve(mermaid.render(elementId, text));
+    }}).then(function (result) {{
+      return typeof result === "string" ? {{svg: result}} : result;
+    }});
+  }}
+
+  function draw(section) {{
+    if (!rendered[section.id]) {{
+      rendered[section.id] = renderMermaid("miniwdl-viz-svg-" + section.index, section.mermaid).then(
+        function (result) {{
+          section.element.innerHTML = result.svg;
+          if (result.bindFunctions) {{
+            result.bindFunctions(section.element);
+          }}
+        }},
+        function (error) {{
+          section.element.className = "diagram error";
+          section.element.textContent = String(error);
+        }}
+      );
+    }}
+    return rendered[section.id];
+  }}
+
+  sections.forEach(function (section, index) {{
+    section.index = index;
+    byId[section.id] = section;
+    if (section.parent === null) {{
+      section.element = document.getElementById("miniwdl-viz-top");
+      section.children = document.getElementById("miniwdl-viz-sections");
+      return;
+    }}
+    var details = document.createElement("details");
+    var summary = document.createElement("summary");
+    summary.textContent = section.name;
+    section.element = document.createElement("div");
+    section.element.className = "diagram";
+    section.children = document.createElement("div");
+    details.appendChild(summary);
+    details.appendChild(section.element);
+    details.appendChild(section.children);
+    details.addEventListener("toggle", function () {{
+      if (details.open) {{
+        draw(section);
+      }}
+    }});
+    section.details = details;
+    byId[section.parent].children.appendChild(details);
+  }});
+
+  window.miniwdlVizExpand = function (sectionId) {{
+    var section = byId[sectionId];
+    for (var open = section; open && open.details; open = byId[open.parent]) {{
+      open.details.open = true;
+    }}
+    draw(section).then(function () {{
+      section.details.scrollIntoView();
+    }});
+  }};
+
+  draw(sections[0]);
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def mermaid_script(mermaid_js):
+    """A script tag inlining mermaid_js when it's a local file, so the page works offline,
+    or else loading it from the url"""
+    if os.path.isfile(mermaid_js):
+        with open(mermaid_js) as script:
+            # a script element ends at the first </script
+            source = script.read().replace("</script", "<\\/script")
+        return f"<script>{source}</script>"
+    return f'<script src="{html.escape(mermaid_js)}"></script>'
+
+
+class HtmlViewer:
+    """Writes a workflow as a page that draws its top level first, with every scatter/if
+    section and sub-workflow collapsed into a node. The flowchart of each section's own
+    level is embedded separately, and only drawn when the section is opened.
+
+    Edges into a section from outside are drawn on the level that contains both ends,
+    re-routed to the collapsed sections they enter."""
+
+    def __init__(self, create_pwm, mermaid_js=None):
+        # called with style_classes for a new ParsedWDLToMermaid per flowchart, since each
+        # collects its own rows
+        self.create_pwm = create_pwm
+        self.mermaid_js = mermaid_js
+        self.stats = {}
+
+    @staticmethod
+    def descendants(graph, section, found):
+        """Ids of every node nested in section, memoized in found"""
+        if section not in found:
+            ids = []
+            for child in graph.children(section):
+                ids.append(child["id"])
+                if child["type"] == "workflow_section":
+                    ids.extend(HtmlViewer.descendants(graph, child["id"], found))
+            found[section] = ids
+        return found[section]
+
+    @staticmethod
+    def level(graph, section, found):
+        """(nodes, edges) of one level: the children of section, with nested sections as
+        single nodes that edges to and from their contents are re-routed to"""
+        nodes = []
+        representative = {}
+        for child in graph.children(section):
+            if child["type"] != "workflow_section":
+                nodes.append(child)
+                continue
+            contents = HtmlViewer.descendants(graph, child["id"], found)
+            nodes.append(dict(child, type=NodeType.COLLAPSED.value, name=f"{child['name']} ({len(contents)} nodes)"))
+            representative.update(dict.fromkeys(contents, child["id"]))
+
+        contents = HtmlViewer.descendants(graph, section, found)
+        inside = set(contents)
+        edges = [
+            edge
+            for node_id in contents
+            for edge in graph.edges_to(node_id)
+            if edge["node_from"] in inside or edge["node_from"] in VIRTUAL_NODES
+        ]
+        return nodes, LevelOfDetail.aggregate_edges(edges, representative)
+
+    def sections(self, workflow_name, nodes, edges):
+        """The flowchart of every level, the workflow's first and then each section after
+        the section containing it, as dicts of id, name, parent and mermaid text"""
+        graph = WorkflowGraph(nodes, edges)
+        found = {}
+        sections = []
+        pending = [(workflow_name, workflow_name, None)]
+        while pending:
+            section, name, parent = pending.pop()
+            level_nodes, level_edges = self.level(graph, section, found)
+            collapsed = [node["id"] for node in level_nodes if node["type"] == NodeType.COLLAPSED.value]
+
+            pwm = self.create_pwm(style_classes=[COLLAPSED_STYLE_CLASS])
+            mermaid_list = pwm.create_mermaid_flowchart(section, level_nodes, level_edges)
+            for node_id in collapsed:
+                pwm.py_mermaid.set_node_class(node_id, "collapsed")
+                mermaid_list.append(f"click {node_id} call miniwdlVizExpand()")
+            sections.append({
+                "id": section,
+                "name": name,
+                "parent": parent,
+                "mermaid": "".join(pwm.indented_rows(mermaid_list)),
+            })
+            self.stats["largest_level"] = max(self.stats.get("largest_level", 0), len(level_nodes))
+
+            # reversed, so sections are listed in the order they're drawn in
+            for node_id in reversed(collapsed):
+                pending.append((node_id, graph.get_node(node_id)["name"], section))
+
+        self.stats["sections"] = len(sections) - 1
+        return sections
+
+    def render(self, miniwdl_parser):
+        if self.mermaid_js is None:
+            raise ValueError("a page needs mermaid_js, a local mermaid.min.js to inline or the url to load it from")
+        with stage("html"):
+            sections = self.sections(miniwdl_parser.workflow_name, miniwdl_parser.nodes, miniwdl_parser.edges)
+            # </ can't appear inside a script element
+            data = json.dumps(sections).replace("</", "<\\/")
+            return PAGE_TEMPLATE.format(
+                title=html.escape(miniwdl_parser.workflow_name),
+                mermaid_script=mermaid_script(self.mermaid_js),
+                data=data,
+            )
+
+    def write(self, miniwdl_parser, output_file):
+        page = self.render(miniwdl_parser)
+        with open(output_file, "w") as output:
+            output.write(page)
+
+    def report(self):
+        return f"{self.stats['sections']} sections, at most {self.stats['largest_level']} nodes per flowchart"
+
+
+def add_html_arguments(arg_parser):
+    arg_parser.add_argument("--html-output", default=None, help="also write a page that draws each scatter/if section and sub-workflow when it's opened")
+    arg_parser.add_argument("--mermaid-js", default=None, help=f"mermaid.min.js for the --html-output page, which needs it: a local file is inlined so the page works offline, a url (e.g. {MERMAID_CDN_URL}) is loaded when the page is opened")
@@ -0,0 +1,345 @@
+import html
+
+NODE_WIDTH_RANGE = (90, 260)
+NODE_HEIGHT = 40
+CHAR_WIDTH = 7
+NODE_GAP = 30
+LAYER_GAP = 50
+CLUSTER_PADDING = 12
+CLUSTER_LABEL_HEIGHT = 18
+MAX_PNG_PIXELS = 100_000_000
+
+NODE_FILLS = {
+    "call": "#ececff",
+    "decl": "#fff5ad",
+    "input": "#e3f6e3",
+    "workflow_section": "#ffffff",
+}
+CLUSTER_FILL = "#f6f6f6"
+STROKE = "#555555"
+
+
+class FlowchartLayout:
+    """Positions and draw operations for a laid out flowchart"""
+
+    def __init__(self, width, height, operations):
+        self.width = width
+        self.height = height
+        self.operations = operations
+
+
+class LocalRenderer:
+    """Lays out parsed workflow nodes and edges as a layered DAG, with boxes around
+    scatter/if sections, and draws it as SVG or PNG without a mermaid server"""
+
+    def __init__(self, flowchart_dir="TD", hide_input_names=False, max_length_input_names=200):
+        self.horizontal = flowchart_dir == "LR"
+        self.hide_input_names = hide_input_names
+        self.max_length_input_names = max_length_input_names
+
+    @staticmethod
+    def truncate(text, length):
+        return text if len(text) <= length else text[: length - 3] + "..."
+
+    def layers(self, workflow_name, graph, leaves, edges):
+        """Longest path layering. An edge into a section pushes every member of the section
+        below the edge source, through a virtual entry node per section."""
+        successors = {}
+        indegree = {node_id: 0 for node_id in leaves}
+        for node in graph.nodes:
+            if node["type"] == "workflow_section":
+                indegree.setdefault(("entry", node["id"]), 0)
+
+        def link(source, target, weight):
+            successors.setdefault(source, []).append((target, weight))
+            indegree[target] += 1
+
+        for node in graph.nodes:
+            if node["type"] == "workflow_section" and node["id"] not in leaves:
+                for child in graph.children(node["id"]):
+                    if child["type"] == "workflow_section" and child["id"] not in leaves:
+                        link(("entry", node["id"]), ("entry", child["id"]), 0)
+                    else:
+                        link(("entry", node["id"]), child["id"], 0)
+
+        for edge in edges:
+            source, target = edge["node_from"], edge["node_to"]
+            if source not in leaves:
+                if self.section_contains(graph, workflow_name, source, target):
+                    continue
+                source = ("entry", source)
+            if target not in leaves:
+                target = ("entry", target)
+            link(source, target, 1)
+
+        layer = {node_id: 0 for node_id in indegree}
+        ready = [node_id for node_id, degree in indegree.items() if degree == 0]
+        while ready:
+            node_id = ready.pop()
+            for target, weight in successors.get(node_id, []):
+                layer[target] = max(layer[target], layer[node_id] + weight)
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    ready.append(target)
+        return {node_id: layer[node_id] for node_id in leaves}
+
+    @staticmethod
+    def section_contains(graph, workflow_name, section_id, node_id):
+        section = graph.get_node(node_id)["section"] if node_id in graph else workflow_name
+        while section != workflow_name:
+            if section == section_id:
+                return True
+            section = graph.get_node(section)["section"]
+        return False
+
+    def layout(self, workflow_name, graph, edges):
+        # Leaves are drawn as boxes: every non-section node, referenced pseudo inputs
+        # (WorkflowInput, HardcodedVariable), and sections with nothing in them
+        leaves = {}
+        for node in graph.nodes:
+            if node["type"] != "workflow_section" or not graph.children(node["id"]):
+                leaves[node["id"]] = node
+        direct_leaves = {}
+        for node in leaves.values():
+            direct_leaves.setdefault(node["section"], []).append(node)
+        for edge in edges:
+            if edge["node_from"] not in graph and edge["node_from"] not in leaves:
+                node = {
+                    "id": edge["node_from"],
+                    "name": edge["node_from"],
+                    "section": workflow_name,
+                    "type": "input",
+                }
+                leaves[node["id"]] = node
+                direct_leaves.setdefault(workflow_name, []).insert(0, node)
+
+        layer = self.layers(workflow_name, graph, leaves, edges)
+        n_layers = max(layer.values(), default=0) + 1
+
+        longest_name = max((len(node["name"]) for node in leaves.values()), default=0)
+        node_width = min(max(longest_name * CHAR_WIDTH + 24, NODE_WIDTH_RANGE[0]), NODE_WIDTH_RANGE[1])
+        node_chars = (node_width - 16) // CHAR_WIDTH
+        # extent of a node along the layer axis and across it
+        main_size, cross_size = (node_width, NODE_HEIGHT) if self.horizontal else (NODE_HEIGHT, node_width)
+
+        sections = [node for node in graph.nodes if node["type"] == "workflow_section" and node["id"] not in leaves]
+        child_sections = {}
+        for section in sections:
+            child_sections.setdefault(section["section"], []).append(section)
+
+        # nesting height below each section, for cluster padding
+        nesting = {}
+
+        def nesting_height(section_id):
+            if section_id not in nesting:
+                nesting[section_id] = 1 + max(
+                    (nesting_height(child["id"]) for child in child_sections.get(section_id, [])),
+                    default=0,
+                )
+            return nesting[section_id]
+
+        max_nesting = nesting_height(workflow_name) - 1
+        cluster_margin = CLUSTER_PADDING + CLUSTER_LABEL_HEIGHT
+        layer_step = main_size + LAYER_GAP + max_nesting * (cluster_margin + CLUSTER_PADDING)
+        layer_offset = max_nesting * cluster_margin + CLUSTER_PADDING
+        cross_step = cross_size + NODE_GAP
+
+        # Each section gets its own band across the layer axis, so cluster boxes never overlap:
+        # direct members first, then nested sections side by side
+        band_start = {}
+        band_end = {}
+        leaf_start = {}
+        leaf_columns = {}
+
+        def place_band(section_id, start):
+            pad = 0 if section_id == workflow_name else cluster_margin
+            band_start[section_id] = start
+            position = start + pad
+            counts = {}
+            for node in direct_leaves.get(section_id, []):
+                counts[layer[node["id"]]] = counts.get(layer[node["id"]], 0) + 1
+            leaf_start[section_id] = position
+            leaf_columns[section_id] = max(counts.values(), default=0)
+            position += leaf_columns[section_id] * cross_step
+            for child in child_sections.get(section_id, []):
+                position = place_band(child["id"], position) + NODE_GAP
+            band_end[section_id] = position + (pad - NODE_GAP if pad else 0)
+            return band_end[section_id]
+
+        total_cross = place_band(workflow_name, NODE_GAP)
+
+        # Within each band and layer, order members by the barycenter of their predecessors
+        predecessors = {}
+        for edge in edges:
+            predecessors.setdefault(edge["node_to"], []).append(edge["node_from"])
+        by_layer = {}
+        for section_id, nodes in direct_leaves.items():
+            for node in nodes:
+                by_layer.setdefault((layer[node["id"]], section_id), []).append(node)
+
+        cross = {}
+        for (node_layer, section_id), nodes in sorted(by_layer.items(), key=lambda item: item[0][0]):
+            def barycenter(node):
+                placed = [cross[pred] for pred in predecessors.get(node["id"], []) if pred in cross]
+                return sum(placed) / len(placed) if placed else 0
+
+            nodes = sorted(nodes, key=barycenter)
+            start = leaf_start[section_id] + (leaf_columns[section_id] - len(nodes)) * cross_step / 2
+            for ind, node in enumerate(nodes):
+                cross[node["id"]] = start + ind * cross_step
+
+        def box(cross_pos, main_pos, cross_len, main_len):
+            if self.horizontal:
+                return main_pos, cross_pos, main_len, cross_len
+            return cross_pos, main_pos, cross_len, main_len
+
+        positions = {
+            node_id: box(cross[node_id], layer_offset + layer[node_id] * layer_step, cross_size, main_size)
+            for node_id in leaves
+        }
+
+        operations = []
+        clusters = {}
+
+        def section_layers(section_id):
+            found = [layer[node["id"]] for node in direct_leaves.get(section_id, [])]
+            for child in child_sections.get(section_id, []):
+                found.extend(section_layers(child["id"]))
+            return found
+
+        for section in sections:
+            found = section_layers(section["id"])
+            if not found:
+                continue
+            outer = nesting[section["id"]]
+            main_start = layer_offset + min(found) * layer_step - outer * cluster_margin
+            main_end = layer_offset + max(found) * layer_step + main_size + outer * CLUSTER_PADDING
+            clusters[section["id"]] = box(
+                band_start[section["id"]],
+                main_start,
+                band_end[section["id"]] - band_start[section["id"]],
+                main_end - main_start,
+            )
+            operations.append(("rect", clusters[section["id"]], CLUSTER_FILL, False))
+            x, y, _, _ = clusters[section["id"]]
+            label = self.truncate(section["name"], 60)
+            operations.append(("text", (x + 6, y + 14), label, 12, "start"))
+
+        for edge in edges:
+            if edge["node_from"] not in positions and edge["node_from"] not in clusters:
+                continue
+            if edge["node_from"] in clusters:
+                # edges from a section into its own members start at the top of the box
+                inner = self.section_contains(graph, workflow_name, edge["node_from"], edge["node_to"])
+                start = self.anchor(clusters[edge["node_from"]], end=not inner)
+            else:
+                start = self.anchor(positions[edge["node_from"]], end=True)
+            target_box = positions.get(edge["node_to"]) or clusters.get(edge["node_to"])
+            if target_box is None:
+                continue
+            end = self.anchor(target_box, end=False)
+            operations.append(("arrow", start, end))
+            label = "" if self.hide_input_names else self.truncate(edge["task_ref_name"], min(self.max_length_input_names, 40))
+            if label:
+                middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+                operations.append(("text", middle, label, 10, "middle"))
+
+        for node_id, node in leaves.items():
+            x, y, w, h = positions[node_id]
+            fill = NODE_FILLS.get(node["type"], NODE_FILLS["call"])
+            if node["type"] == "call":
+                operations.append(("polygon", [(x + 10, y), (x + w - 10, y), (x + w, y + h / 2), (x + w - 10, y + h), (x + 10, y + h), (x, y + h / 2)], fill))
+            elif node["type"] == "decl":
+                operations.append(("polygon", [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x + 12, y + h / 2)], fill))
+            elif node["type"] == "input":
+                operations.append(("ellipse", (x, y, w, h), fill))
+            else:
+                operations.append(("rect", (x, y, w, h), fill, True))
+            operations.append(("text", (x + w / 2, y + h / 2 + 4), self.truncate(node["name"], node_chars), 12, "middle"))
+
+        n_main = layer_offset + n_layers * layer_step
+        width, height = (n_main, total_cross + NODE_GAP) if self.horizontal else (total_cross + NODE_GAP, n_main)
+        return FlowchartLayout(int(width), int(height), operations)
+
+    def anchor(self, box, end):
+        x, y, w, h = box
+        if self.horizontal:
+            return (x + w, y + h / 2) if end else (x, y + h / 2)
+        return (x + w / 2, y + h) if end else (x + w / 2, y)
+
+    def to_svg(self, layout):
+        rows = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width}" height="{layout.height}" '
+            f'viewBox="0 0 {layout.width} {layout.height}" font-family="sans-serif">',
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" '
+            f'markerHeight="8" orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="{STROKE}"/></marker></defs>',
+            f'<rect width="{layout.width}" height="{layout.height}" fill="white"/>',
+        ]
+        for operation in layout.operations:
+            kind = operation[0]
+            if kind == "rect":
+                (x, y, w, h), fill, dashed = operation[1:]
+                dash = ' stroke-dasharray="4 3"' if dashed else ""
+                rows.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="4" fill="{fill}" stroke="{STROKE}"{dash}/>')
+            elif kind == "polygon":
+                points, fill = operation[1:]
+                points_str = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+                rows.append(f'<polygon points="{points_str}" fill="{fill}" stroke="{STROKE}"/>')
+            elif kind == "ellipse":
+                (x, y, w, h), fill = operation[1:]
+                rows.append(f'<ellipse cx="{x + w / 2:.1f}" cy="{y + h / 2:.1f}" rx="{w / 2:.1f}" ry="{h / 2:.1f}" fill="{fill}" stroke="{STROKE}"/>')
+            elif kind == "arrow":
+                (x1, y1), (x2, y2) = operation[1:]
+                rows.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{STROKE}" marker-end="url(#arrow)"/>')
+            elif kind == "text":
+                (x, y), text, size, anchor = operation[1:]
+                rows.append(f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" text-anchor="{anchor}">{html.escape(text)}</text>')
+        rows.append("</svg>")
+        return "\n".join(rows) + "\n"
+
+    def to_image(self, layout):
+        """Draws the layout with PIL, returns None if PIL is not installed or the image is too large"""
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            return None
+        if layout.width * layout.height > MAX_PNG_PIXELS:
+            return None
+
+        # palette mode: the drawing only uses a handful of colors and encodes much faster
+        image = Image.new("P", (layout.width, layout.height), "white")
+        draw = ImageDraw.Draw(image)
+        for operation in layout.operations:
+            kind = operation[0]
+            if kind == "rect":
+                (x, y, w, h), fill, _ = operation[1:]
+                draw.rectangle([x, y, x + w, y + h], fill=fill, outline=STROKE)
+            elif kind == "polygon":
+                points, fill = operation[1:]
+                draw.polygon(points, fill=fill, outline=STROKE)
+            elif kind == "ellipse":
+                (x, y, w, h), fill = operation[1:]
+                draw.ellipse([x, y, x + w, y + h], fill=fill, outline=STROKE)
+            elif kind == "arrow":
+                (x1, y1), (x2, y2) = operation[1:]
+                draw.line([(x1, y1), (x2, y2)], fill=STROKE)
+                length = max(((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5, 1)
+                ux, uy = (x2 - x1) / length, (y2 - y1) / length
+                draw.polygon(
+                    [(x2, y2), (x2 - 8 * ux - 4 * uy, y2 - 8 * uy + 4 * ux), (x2 - 8 * ux + 4 * uy, y2 - 8 * uy - 4 * ux)],
+                    fill=STROKE,
+                )
+            elif kind == "text":
+                (x, y), text, _, anchor = operation[1:]
+                draw.text((x, y), text, fill="black", anchor="ms" if anchor == "middle" else "ls")
+        return image
+
+    def render(self, workflow_name, graph, edges, svg_file, png_file=None):
+        """Writes the flowchart to svg_file, and to png_file when possible. Returns the PIL image or None"""
+        layout = self.layout(workflow_name, graph, edges)
+        with open(svg_file, "w") as f:
+            f.write(self.to_svg(layout))
+        image = self.to_image(layout) if png_file else None
+        if image is not None:
+            image.save(png_file, compress_level=1)
+        return image
@@ -1,17 +1,62 @@
+import enum
+
+
+class NodeType(enum.Enum):
+    INPUT = "input"
+    DECL = "decl"
+    CALL = "call"
+    WORKFLOW_SECTION = "workflow_section"
+    # a section drawn as a single node, by the html viewer
+    COLLAPSED = "collapsed_section"
+
+
+# open and close brackets of each node type's shape
+NODE_SHAPES = {
+    NodeType.INPUT: ("((", "))"),
+    NodeType.DECL: (">", "]"),
+    NodeType.CALL: ("{{", "}}"),
+    NodeType.WORKFLOW_SECTION: ("[", "]"),
+    NodeType.COLLAPSED: ("[", "]"),
+}
+
+
 class MermaidNode:
+    """A node as it's written in a flowchart. The label is escaped and rendered once, since
+    a node is referenced by every edge to and from it."""
+
+    __slots__ = ("id", "name", "label")
+    node_type = None
+    shape = (None, None)
+
     def __init__(self, id, name):
-        self.open, self.close = self.set_parens()
         self.id = self.clean_string(id)
         self.name = self.clean_string(name)
+        open_paren, close_paren = self.set_parens()
+        self.label = f'{self.id}{open_paren}"{self.name}"{close_paren}'
+
+    @staticmethod
+    def from_dict(node):
+        return NODE_CLASSES[NodeType(node["type"])](node["id"], node["name"])
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "type": self.node_type.value}
+
+    @property
+    def open(self):
+        return self.set_parens()[0]
+
+    @property
+    def close(self):
+        return self.set_parens()[1]
 
     def set_parens(self):
-        return None, None
+        return self.shape
 
     def __str__(self):
-        return f'{self.id}{self.open}"{self.name}"{self.close}'
+        return self.label
 
     def __repr__(self):
-        return f'{self.id}{self.open}"{self.name}"{self.close}'
+        return self.label
 
     @staticmethod
     def clean_string(text):
@@ -19,20 +64,36 @@ class MermaidNode:
 
 
 class MermaidInputNode(MermaidNode):
-    def set_parens(self):
-        return "((", "))"
+    __slots__ = ()
+    node_type = NodeType.INPUT
+    shape = NODE_SHAPES[node_type]
 
 
 class MermaidCallNode(MermaidNode):
-    def set_parens(self):
-        return "{{", "}}"
+    __slots__ = ()
+    node_type = NodeType.CALL
+    shape = NODE_SHAPES[node_type]
 
 
 class MermaidDeclNode(MermaidNode):
-    def set_parens(self):
-        return ">", "]"
+    __slots__ = ()
+    node_type = NodeType.DECL
+    shape = NODE_SHAPES[node_type]
 
 
 class MermaidSubgraphNode(MermaidNode):
-    def set_parens(self):
-        return "[", "]"
+    __slots__ = ()
+    node_type = NodeType.WORKFLOW_SECTION
+    shape = NODE_SHAPES[node_type]
+
+
+class MermaidCollapsedNode(MermaidNode):
+    __slots__ = ()
+    node_type = NodeType.COLLAPSED
+    shape = NODE_SHAPES[node_type]
+
+
+NODE_CLASSES = {
+    node_class.node_type: node_class
+    for node_class in [MermaidInputNode, MermaidCallNode, MermaidDeclNode, MermaidSubgraphNode, MermaidCollapsedNode]
+}
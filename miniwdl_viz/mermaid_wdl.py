@@ -1,14 +1,27 @@
 import argparse
+import contextlib
 import sys
-import subprocess
-import WDL
+from miniwdl_viz.mermaid_node import NodeType
 from miniwdl_viz.py_mermaid import PyMermaid
-from miniwdl_viz.miniwdl_parser import MiniWDLParser
-import requests
+from miniwdl_viz.miniwdl_parser import VIRTUAL_NODES, MiniWDLParser, add_parse_arguments, load_graph_file, parse_wdl, profiled_loader
+from miniwdl_viz.graph_cache import add_cache_arguments, cache_enabled, create_graph_cache
+from miniwdl_viz.graph_lod import add_lod_arguments, create_level_of_detail
+from miniwdl_viz.graph_simplify import add_simplify_arguments, create_graph_simplifier
+from miniwdl_viz.graph_slice import SliceError, add_slice_arguments, create_graph_slice
+from miniwdl_viz.html_viewer import HtmlViewer, add_html_arguments
+from miniwdl_viz.profiler import add_profile_arguments, profile_from_args, stage
+from miniwdl_viz.workflow_graph import WorkflowGraph
+from miniwdl_viz.remote_renderer import DEFAULT_RENDERER_URL, RemoteRenderer, create_render_cache
 import io
-import base64
-from PIL import Image
-import matplotlib.pyplot as plt
+
+# requests, PIL and matplotlib are imported where they're used, so text-only
+# modes (--print-flowchart) don't pay for loading the plotting stack
+
+# shared by every edge from a virtual node, which aren't in the parsed graph
+VIRTUAL_MERMAID_NODES = {
+    name: {"id": name, "name": name, "type": NodeType.INPUT.value}
+    for name in VIRTUAL_NODES
+}
 
 
 class ParsedWDLToMermaid:
@@ -22,16 +35,30 @@ class ParsedWDLToMermaid:
         flowchart_dir="TD",
         max_input_str_length=200,
         output_name="output.mmd",
+        renderer_url=DEFAULT_RENDERER_URL,
+        render_cache=None,
+        sink=None,
+        style_classes=None,
+        level_of_detail=None,
+        simplifier=None,
     ):
         self.group_edges = group_edges
         self.suppress_workflow_input = suppress_workflow_input
         self.suppress_hardcoded_variables = suppress_hardcoded_variables
         self.output_name = output_name
+        self.remote_renderer = RemoteRenderer(base_url=renderer_url, cache=render_cache)
+        self.flowchart_dir = flowchart_dir
+        self.hide_input_names = hide_input_names
+        self.max_input_str_length = max_input_str_length
+        self.level_of_detail = level_of_detail
+        self.simplifier = simplifier
 
         self.py_mermaid = PyMermaid(
             hide_input_names=hide_input_names,
             max_length_input_names=max_input_str_length,
             flowchart_dir=flowchart_dir,
+            sink=sink,
+            **({"style_classes": style_classes} if style_classes is not None else {}),
         )
 
     def suppress_node(self, node):
@@ -43,69 +70,122 @@ class ParsedWDLToMermaid:
 
     def group_edge(self, edges):
         grouped = {}
-        seen = set()
+        # labels of the other edges between each pair of nodes, only tracked for pairs with
+        # more than one edge. Tuples, since most of these pairs have two edges and small
+        # tuples are a third of the size of a dict.
+        labels = {}
 
         for edge in edges:
             edge_id_tuple = (edge["node_from"], edge["node_to"])
-            seen_tuple = (*edge_id_tuple, edge["task_ref_name"])
 
-            if edge_id_tuple in grouped:
-                if seen_tuple not in seen:
-                    grouped[edge_id_tuple][
-                        "task_ref_name"
-                    ] += f", {edge['task_ref_name']}"
-            else:
+            if edge_id_tuple not in grouped:
                 grouped[edge_id_tuple] = edge
-            seen.add(seen_tuple)
+                continue
+            labels[edge_id_tuple] = labels.get(edge_id_tuple, ()) + (edge["task_ref_name"],)
+
+        for edge_id_tuple, other_labels in labels.items():
+            edge_labels = dict.fromkeys((grouped[edge_id_tuple]["task_ref_name"],) + other_labels)
+            if len(edge_labels) > 1:
+                # copy before merging labels, so the parsed edges are left untouched
+                grouped[edge_id_tuple] = dict(grouped[edge_id_tuple], task_ref_name=", ".join(edge_labels))
 
         return list(grouped.values())
 
-    def get_node(self, nodes, node_name):
-        if node_name in ["WorkflowInput", "HardcodedVariable"]:
-            return {"id": node_name, "name": node_name, "type": "input"}
-        else:
-            nodes_matching = [node for node in nodes if node["id"] == node_name]
-            assert len(nodes_matching) == 1
-            return nodes_matching[0]
+    def get_node(self, graph, node_name):
+        virtual_node = VIRTUAL_MERMAID_NODES.get(node_name)
+        if virtual_node is not None:
+            return virtual_node
+        assert node_name in graph
+        return graph.get_node(node_name)
 
-    def add_mermaid_edge(self, nodes, edge):
-        node_from = self.get_node(nodes, edge["node_from"])
+    def add_mermaid_edge(self, graph, edge):
+        node_from = self.get_node(graph, edge["node_from"])
         if not self.suppress_node(node_from):
             self.py_mermaid.add_mermaid_edge_id(
                 edge["node_from"], edge["node_to"], edge
             )
 
-    def create_subgraphs(self, workflow_name, nodes):
-        for node in nodes:
+    def create_subgraphs(self, workflow_name, graph):
+        for node in graph.nodes:
             if node["type"] == "workflow_section":
-                nodes_in_subgraph = [
-                    sg_node for sg_node in nodes if sg_node["section"] == node["id"]
-                ]
                 self.py_mermaid.add_subgraph(
-                    node.get("id"), node.get("name"), nodes_in_subgraph
+                    node.get("id"), node.get("name"), graph.children(node["id"])
                 )
             elif node["section"] == workflow_name:
                 self.py_mermaid.add_node(node)
 
+    def reduce_detail(self, workflow_name, nodes, edges):
+        if self.level_of_detail is not None:
+            with stage("level_of_detail"):
+                nodes, edges = self.level_of_detail.apply(workflow_name, nodes, edges)
+        if self.simplifier is not None:
+            with stage("simplify"):
+                nodes, edges = self.simplifier.apply(workflow_name, nodes, edges)
+        return nodes, edges
+
     def create_mermaid_flowchart(self, workflow_name, nodes, edges):
+        nodes, edges = self.reduce_detail(workflow_name, nodes, edges)
+        with stage("index_graph"):
+            graph = WorkflowGraph(nodes)
         if self.group_edges:
-            edge_map = self.group_edge(edges)
+            with stage("group_edge"):
+                edge_map = self.group_edge(edges)
         else:
             edge_map = edges
 
-        self.create_subgraphs(workflow_name, nodes)
+        with stage("subgraphs"):
+            self.create_subgraphs(workflow_name, graph)
 
-        for edge in edge_map:
-            self.add_mermaid_edge(nodes, edge)
+        with stage("edges"):
+            for edge in edge_map:
+                self.add_mermaid_edge(graph, edge)
 
+        self.py_mermaid.finish()
         return self.py_mermaid.mermaid_list
 
+    def flowchart_edges(self, graph, edges):
+        edge_map = self.group_edge(edges) if self.group_edges else edges
+        return [
+            edge
+            for edge in edge_map
+            if not self.suppress_node(self.get_node(graph, edge["node_from"]))
+        ]
+
+    def render_local_flowchart(self, workflow_name, nodes, edges, plot_time=2, file_output=False):
+        """Renders the flowchart offline to an svg (and png) next to output_name"""
+        from miniwdl_viz.local_renderer import LocalRenderer
+
+        nodes, edges = self.reduce_detail(workflow_name, nodes, edges)
+        graph = WorkflowGraph(nodes)
+        renderer = LocalRenderer(
+            flowchart_dir=self.flowchart_dir,
+            hide_input_names=self.hide_input_names,
+            max_length_input_names=self.max_input_str_length,
+        )
+        output_base = self.output_name.rsplit(".", 1)[0]
+        with stage("render.local"):
+            img = renderer.render(
+                workflow_name,
+                graph,
+                self.flowchart_edges(graph, edges),
+                svg_file=output_base + ".svg",
+                png_file=output_base + ".png",
+            )
+        if not file_output and img is not None:
+            import matplotlib.pyplot as plt
+
+            plt.figure(figsize=(15, 9), dpi=100)
+            plt.axis("off")
+            plt.imshow(img.convert("RGB"))
+            plt.pause(plot_time)
+
     def show_mermaid_flowchart(self, mermaid_list, plot_time=2, file_output=False):
+        from PIL import Image
+        import matplotlib.pyplot as plt
+
         mermaid_str = "\n".join(mermaid_list)
-        base64_str = base64.b64encode(mermaid_str.encode("ascii")).decode("ascii")
-        img = Image.open(
-            io.BytesIO(requests.get("https://mermaid.ink/img/" + base64_str).content)
-        )
+        with stage("render.remote"):
+            img = Image.open(io.BytesIO(self.remote_renderer.render(mermaid_str)))
         plt.figure(figsize=(15, 9), dpi=100)
         plt.axis("off")
         plt.imshow(img)
@@ -115,76 +195,208 @@ class ParsedWDLToMermaid:
         else:
             plt.pause(plot_time)
 
-    def output_mermaid(self, mermaid_list, file_output=False):
-        if file_output:
-            with open(self.output_name, "w") as output:
-                for ind, row in enumerate(mermaid_list):
-                    if ind == 0:
-                        output.write(f"{row}\n")
-                    else:
-                        output.write(f"    {row}\n")
-        else:
-            for ind, row in enumerate(mermaid_list):
-                if ind == 0:
-                    print(f"{row}")
-                else:
-                    print(f"    {row}")
+    @staticmethod
+    def indented_rows(mermaid_list):
+        for ind, row in enumerate(mermaid_list):
+            if ind == 0:
+                yield f"{row}\n"
+            else:
+                yield f"    {row}\n"
 
+    def output_mermaid(self, mermaid_list, file_output=False):
+        with stage("output"):
+            if file_output:
+                with open(self.output_name, "w") as output:
+                    output.writelines(self.indented_rows(mermaid_list))
+            else:
+                sys.stdout.writelines(self.indented_rows(mermaid_list))
 
-def parse_wdl(input_file):
-    doc = WDL.load(uri=input_file)
-    parser = MiniWDLParser(doc)
-    parser.parse()
-    return parser
 
 def parsed_wdl_to_mermaid(miniwdl_parser, pwm):
     return pwm.create_mermaid_flowchart(
         miniwdl_parser.workflow_name, miniwdl_parser.nodes, miniwdl_parser.edges
     )
 
-def main():
-    arg_parser = argparse.ArgumentParser(
-        prog="ParsedWDLToMermaid",
-        description=ParsedWDLToMermaid.__doc__,
-    )
-    arg_parser.add_argument("input")
-    arg_parser.add_argument("-o", "--output-file", default="output.mmd")
+def add_style_arguments(arg_parser):
     arg_parser.add_argument("--show-input-names", action='store_true', default=False, help="hides the input name strings")
     arg_parser.add_argument("--show-workflow-input", action='store_true', default=False, help="suppresses the workflow input node")
     arg_parser.add_argument("--show-hardcoded-variables", action='store_true', default=False, help="suppresses hardcoded variable node")
     arg_parser.add_argument("--flowchart-dir", choices=["TD", "LR"], default="LR", help="direction of the flow chart, TD (top down) or LR (left right)")
     arg_parser.add_argument("--max_input_str_length", type=int, default=200, help="if input names aren't hidden sets a max length for them")
 
+def add_flowchart_arguments(arg_parser):
+    add_style_arguments(arg_parser)
+    add_slice_arguments(arg_parser)
+    add_lod_arguments(arg_parser)
+    add_simplify_arguments(arg_parser)
+
+def create_parsed_wdl_to_mermaid(args, output_name, sink=None, style_classes=None):
+    return ParsedWDLToMermaid(
+        sink=sink,
+        style_classes=style_classes,
+        level_of_detail=create_level_of_detail(args),
+        simplifier=create_graph_simplifier(args),
+        renderer_url=args.renderer_url,
+        render_cache=create_render_cache(args.cache_dir) if cache_enabled(args) else None,
+        flowchart_dir=args.flowchart_dir,
+        suppress_workflow_input=(not args.show_workflow_input),
+        suppress_hardcoded_variables=(not args.show_hardcoded_variables),
+        max_input_str_length=args.max_input_str_length,
+        hide_input_names=(not args.show_input_names),
+        output_name=output_name,
+    )
+
+def load_input(args, loader=None, path=None):
+    """Parses a WDL file, or loads a graph file already written by miniwdl_parser"""
+    path = args.input if path is None else path
+    if path.endswith(".wdl"):
+        return parse_wdl(path, loader=loader, cache=create_graph_cache(args), subworkflow_depth=args.expand_subworkflows, structural=args.structural)
+    return load_graph_file(path)
+
+def slice_input(args, miniwdl_parser):
+    """The slice of the parsed workflow chosen with --focus, or all of it"""
+    graph_slice = create_graph_slice(args)
+    if graph_slice is None:
+        return miniwdl_parser
+    miniwdl_parser = graph_slice.apply_to(miniwdl_parser)
+    print(f"Slice: {graph_slice.report()}", file=sys.stderr)
+    return miniwdl_parser
+
+def create_arg_parser(arg_parser_class=argparse.ArgumentParser):
+    arg_parser = arg_parser_class(
+        prog="ParsedWDLToMermaid",
+        description=ParsedWDLToMermaid.__doc__,
+    )
+    arg_parser.add_argument("input", help="WDL file, or a json/yaml/msgpack/npz graph file written by miniwdl_parser")
+    arg_parser.add_argument("-o", "--output-file", default="output.mmd")
+    add_flowchart_arguments(arg_parser)
+    add_parse_arguments(arg_parser)
+    add_cache_arguments(arg_parser)
+    add_profile_arguments(arg_parser)
+
     arg_parser.add_argument("--plot-flowchart", action='store_true', default=False, help="plot flowchart with matplotlib")
     arg_parser.add_argument("--plot-flowchart-file-output", action='store_true', default=False, help="plot outputs flowchart as a png file")
     arg_parser.add_argument("--plot-time", type=int, default=10, help="time to plot flowchart flow default:10")
+    arg_parser.add_argument("--renderer", choices=["remote", "local"], default="remote", help="render plots through the mermaid server (remote) or offline to svg/png (local)")
+    arg_parser.add_argument("--renderer-url", default=DEFAULT_RENDERER_URL, help="base url of the remote mermaid renderer")
 
     arg_parser.add_argument("--print-flowchart", action='store_true', default=False, help="print flowchart to console")
     arg_parser.add_argument("--print-flowchart-file-output", action='store_true', default=False, help="print flowchart to file output_file")
+    arg_parser.add_argument("--stream", action='store_true', default=False, help="with --print-flowchart, write rows as they are generated instead of building the whole flowchart in memory")
+    add_html_arguments(arg_parser)
 
+    arg_parser.add_argument("-w", "--watch", action='store_true', default=False, help="keep running, and rewrite output_file when the WDL file or its imports change (or with --run-dir, when the run progresses)")
+    arg_parser.add_argument("--run-dir", help="miniwdl run directory of this workflow, colors the flowchart written to output_file by call state")
+    arg_parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between run directory polls with --run-dir --watch")
+    return arg_parser
 
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        from miniwdl_viz.server import serve_main
 
-    args = arg_parser.parse_args()
+        serve_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["diff"]:
+        from miniwdl_viz.graph_diff import diff_main
 
-    if args.input.endswith(".wdl"):
-        miniwdl_parser = parse_wdl(args.input)
+        diff_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["capacity"]:
+        from miniwdl_viz.capacity import capacity_main
 
-    pwm = ParsedWDLToMermaid(
-        flowchart_dir=args.flowchart_dir,
-        suppress_workflow_input=(not args.show_workflow_input), 
-        suppress_hardcoded_variables=(not args.show_hardcoded_variables),
-        max_input_str_length=args.max_input_str_length,
-        hide_input_names=(not args.show_input_names),
-        output_name=args.output_file,
+        capacity_main(sys.argv[2:])
+        return
+
+    arg_parser = create_arg_parser()
+    arg_parser.epilog = (
+        "Run 'wdl_to_mermaid serve --help' for the long-lived diagram service, 'wdl_to_mermaid diff --help' "
+        "to compare two revisions of a workflow, or 'wdl_to_mermaid capacity --help' for its critical path and peak resource demand."
     )
-    mermaid_list = parsed_wdl_to_mermaid(miniwdl_parser, pwm)
+    args = arg_parser.parse_args()
+    with profile_from_args(args) as profiler:
+        try:
+            run(args, arg_parser, loader=profiled_loader(profiler))
+        except SliceError as exn:
+            arg_parser.error(str(exn))
+
+def create_html_viewer(args):
+    return HtmlViewer(lambda style_classes: create_parsed_wdl_to_mermaid(args, args.html_output, style_classes=style_classes), mermaid_js=args.mermaid_js)
+
+def run(args, arg_parser, loader=None):
+    if args.html_output and not args.mermaid_js:
+        arg_parser.error("--html-output needs --mermaid-js, a local mermaid.min.js to inline so the page works offline, or the url to load it from")
+    if args.run_dir:
+        from miniwdl_viz.run_status import RunDirectoryTracker, STATUS_STYLE_CLASSES, follow_run
+
+        follow_run(
+            slice_input(args, load_input(args, loader)),
+            RunDirectoryTracker(args.run_dir),
+            lambda: create_parsed_wdl_to_mermaid(args, args.output_file, style_classes=STATUS_STYLE_CLASSES),
+            args.output_file,
+            interval=args.poll_interval,
+            once=not args.watch,
+        )
+        return
+
+    if args.watch:
+        from miniwdl_viz.watch import WorkflowWatcher
+
+        if not args.input.endswith(".wdl"):
+            arg_parser.error("--watch needs a .wdl input")
+        if cache_enabled(args):
+            arg_parser.error("--watch keeps the parsed documents in memory and doesn't use --cache")
+
+        def render(miniwdl_parser):
+            pwm = create_parsed_wdl_to_mermaid(args, args.output_file)
+            miniwdl_parser = slice_input(args, miniwdl_parser)
+            mermaid_list = parsed_wdl_to_mermaid(miniwdl_parser, pwm)
+            outputs = {args.output_file: "".join(pwm.indented_rows(mermaid_list))}
+            if args.html_output:
+                outputs[args.html_output] = create_html_viewer(args).render(miniwdl_parser)
+            return outputs
 
-    if args.plot_flowchart:
+        WorkflowWatcher(args.input, render, subworkflow_depth=args.expand_subworkflows, structural=args.structural).run()
+        return
+
+    miniwdl_parser = slice_input(args, load_input(args, loader))
+
+    # the instance that emitted the flowchart, which has the level of detail and simplification stats
+    emitting_pwm = None
+    if args.print_flowchart and args.stream:
+        if args.print_flowchart_file_output:
+            sink_context = open(args.output_file, "w")
+        else:
+            sink_context = contextlib.nullcontext(sys.stdout)
+        with sink_context as sink:
+            emitting_pwm = create_parsed_wdl_to_mermaid(args, args.output_file, sink=sink)
+            parsed_wdl_to_mermaid(miniwdl_parser, emitting_pwm)
+
+    pwm = create_parsed_wdl_to_mermaid(args, args.output_file)
+    mermaid_list = None
+    if (args.plot_flowchart and args.renderer == "remote") or (args.print_flowchart and not args.stream):
+        mermaid_list = parsed_wdl_to_mermaid(miniwdl_parser, pwm)
+        emitting_pwm = pwm
+
+    if args.plot_flowchart and args.renderer == "local":
+        pwm.render_local_flowchart(miniwdl_parser.workflow_name, miniwdl_parser.nodes, miniwdl_parser.edges, plot_time=args.plot_time, file_output=args.plot_flowchart_file_output)
+    elif args.plot_flowchart:
         pwm.show_mermaid_flowchart(mermaid_list=mermaid_list, plot_time=args.plot_time, file_output=args.plot_flowchart_file_output)
     
-    if args.print_flowchart:
+    if args.print_flowchart and not args.stream:
         pwm.output_mermaid(mermaid_list=mermaid_list, file_output=args.print_flowchart_file_output)
 
+    if args.html_output:
+        html_viewer = create_html_viewer(args)
+        html_viewer.write(miniwdl_parser, args.html_output)
+        print(f"HTML viewer: {html_viewer.report()}", file=sys.stderr)
+
+    if emitting_pwm is None:
+        return
+    if emitting_pwm.level_of_detail is not None and emitting_pwm.level_of_detail.stats:
+        print(f"Level of detail: {emitting_pwm.level_of_detail.report()}", file=sys.stderr)
+    if emitting_pwm.simplifier is not None and emitting_pwm.simplifier.stats:
+        print(f"Simplified: {emitting_pwm.simplifier.report()}", file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,88 @@
 import argparse
-import yaml
 import json
 from pathlib import Path
 
 import WDL
 
+from miniwdl_viz.graph_cache import add_cache_arguments, cache_enabled, create_graph_cache
+from miniwdl_viz.profiler import add_profile_arguments, profile_from_args, stage
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+# nesting levels of sub-workflow calls expanded by a bare --expand-subworkflows
+MAX_SUBWORKFLOW_DEPTH = 10
+VIRTUAL_NODES = ("WorkflowInput", "HardcodedVariable")
+# graph file suffix -> output type written by miniwdl_parser
+GRAPH_FILE_TYPES = {".json": "json", ".yaml": "yaml", ".yml": "yaml", ".msgpack": "msgpack", ".npz": "npz"}
+LITERAL_TYPES = (
+    WDL.Expr.String,
+    WDL.Expr.Int,
+    WDL.Expr.Float,
+    WDL.Expr.Boolean,
+    WDL.Expr.Null,
+)
+
+# expression class -> how iter_input_items treats it, since isinstance checks against the
+# abstract WDL.Expr.Base are slow enough to dominate walking large expressions
+EXPR_KINDS = {}
+
+
+def expr_kind(cls):
+    kind = EXPR_KINDS.get(cls)
+    if kind is None:
+        if issubclass(cls, WDL.Expr.Ident):
+            kind = "ident"
+        elif issubclass(cls, LITERAL_TYPES):
+            kind = "literal"
+        elif issubclass(cls, WDL.Expr.Base):
+            kind = "expr"
+        else:
+            kind = "other"
+        EXPR_KINDS[cls] = kind
+    return kind
+
 
 class MiniWDLParser:
     """Parses a miniwdl file into inputs, outputs, nodes, and edges"""
 
-    def __init__(self, wdl_doc):
+    def __init__(self, wdl_doc, subworkflow_depth=0, templates=None):
         self.wdl_doc = wdl_doc
         self.workflow_name = ""
-        self.nodes = []
-        self.edges = []
+        self.graph = WorkflowGraph()
         self.inputs = []
         self.outputs = []
+        # calls to sub-workflows are expanded into subgraphs up to this many levels deep
+        self.subworkflow_depth = subworkflow_depth
+        # (callee, depth) -> parsed sub-workflow, shared with the parsers of nested sub-workflows
+        self.templates = {} if templates is None else templates
+        # expanded call id -> (call name, {output name: [source edges]})
+        self.expanded_outputs = {}
+        self.referee_names = {}
+        # (node_from, node_to, workflow_ref_name, task_ref_name) of the edges added so far
+        self.edge_keys = set()
+
+    @classmethod
+    def from_dict(cls, parsed_dict):
+        """Rebuilds a parser from a to_dict() result, without the underlying WDL document"""
+        parser = cls(None)
+        parser.workflow_name = parsed_dict["name"]
+        parser.inputs = parsed_dict["workflow_inputs"]
+        parser.outputs = parsed_dict["workflow_outputs"]
+        parser.graph = WorkflowGraph(parsed_dict["nodes"], parsed_dict["edges"])
+        return parser
+
+    def slice(self, focus, upstream=True, downstream=True, depth=None):
+        """A parser of only the nodes upstream and/or downstream of focus, see GraphSlice"""
+        from miniwdl_viz.graph_slice import GraphSlice
+
+        return GraphSlice(focus, upstream=upstream, downstream=downstream, depth=depth).apply_to(self)
+
+    @property
+    def nodes(self):
+        return self.graph.nodes
+
+    @property
+    def edges(self):
+        return self.graph.edges
 
     def parse_inputs(self, inputs):
         if inputs is None: 
@@ -38,66 +105,76 @@ class MiniWDLParser:
             })
 
     def get_referee_name(self, referee):
-        if isinstance(referee, WDL.Gather):
-            return referee.final_referee.workflow_node_id
-        else:
-            return referee.workflow_node_id
+        # Idents of the same declaration or call output share the referee, so each is only
+        # resolved once. Keyed by id() since tree nodes aren't hashable, they live as long as the doc
+        name = self.referee_names.get(id(referee))
+        if name is None:
+            if isinstance(referee, WDL.Gather):
+                name = referee.final_referee.workflow_node_id
+            else:
+                name = referee.workflow_node_id
+            self.referee_names[id(referee)] = name
+        return name
+
+    def iter_input_items(self, input_item, node_ids):
+        """Yields (name, ref, type) for every identifier and literal in an expression, in the
+        order they appear. Walks with an explicit stack, so deeply nested expressions and long
+        array literals don't recurse or build intermediate lists."""
+        stack = [input_item]
+        while stack:
+            input_item = stack.pop()
+            kind = expr_kind(type(input_item))
+            if kind == "ident":
+                # If referee is not a defined node_id, probably comes from workflow_input
+                if (ref_name := self.get_referee_name(input_item.referee)) in node_ids:
+                    ref = ref_name
+                else:
+                    ref = "WorkflowInput"
+                yield str(input_item.name), ref, "input"
+            elif kind == "literal":
+                yield str(input_item), "HardcodedVariable", "input"
+            elif kind == "expr":
+                children = input_item.children
+                if not isinstance(children, list):
+                    children = list(children)
+                stack.extend(reversed(children))
 
     def parse_input_item(self, input_item, node_ids):
-        if isinstance(input_item, WDL.Expr.Ident):
-            # If referee is not a defined node_id, probably comes from workflow_input
-            if (ref_name := self.get_referee_name(input_item.referee)) in node_ids:
-                ref = ref_name
-            else:
-                ref = "WorkflowInput"
-            return [{"name": f"{input_item.name}", "ref": f"{ref}", "type": "input"}]
-        elif isinstance(
-            input_item,
-            (
-                WDL.Expr.String,
-                WDL.Expr.Int,
-                WDL.Expr.Float,
-                WDL.Expr.Boolean,
-                WDL.Expr.Null,
-            ),
-        ):
-            return [
-                {"name": f"{input_item}", "ref": "HardcodedVariable", "type": "input"}
-            ]
-        elif isinstance(input_item, WDL.Expr.Base):
-            names = []
-            for child_input_item in input_item.children:
-                names.extend(self.parse_input_item(child_input_item, node_ids))
-            return names
-
-    def add_node(self, nodes, parent, id, name, type):
+        return [
+            {"name": name, "ref": ref, "type": type}
+            for name, ref, type in self.iter_input_items(input_item, node_ids)
+        ]
+
+    def add_node(self, graph, parent, id, name, type):
         section = (
             parent.name if isinstance(parent, WDL.Workflow) else parent.workflow_node_id
         )
-        nodes.append({"id": id, "name": name, "section": section, "type": type})
+        graph.add_node({"id": id, "name": name, "section": section, "type": type})
 
-    def add_edge(self, nodes, edges, input, node_id, task_name=None):
-        input_param_list = self.parse_input_item(
-            input, [node["id"] for node in nodes]
-        )
-        for input_param in input_param_list:
+    def add_edge(self, graph, input, node_id, task_name=None):
+        for name, ref, type in self.iter_input_items(input, graph.node_map):
             if not task_name:
                 task_name = self.remove_prefix(
-                        input_param["name"],
-                        self.remove_prefix(input_param["ref"], "call-") + ".",
+                        name,
+                        self.remove_prefix(ref, "call-") + ".",
                 )
 
-            edges.append(
+            # the same reference repeated in an expression is a single dependency
+            edge_key = (ref, node_id, name, task_name)
+            if edge_key in self.edge_keys:
+                continue
+            self.edge_keys.add(edge_key)
+            graph.add_edge(
                 {
-                    "node_from": input_param["ref"],
+                    "node_from": ref,
                     "node_to": node_id,
-                    "workflow_ref_name": input_param["name"],
+                    "workflow_ref_name": name,
                     "task_ref_name": task_name,
-                    "edge_type": input_param["type"],
+                    "edge_type": type,
                 }
             )
 
-    def parse_workflow(self, wdl_doc, nodes, edges):
+    def parse_workflow(self, wdl_doc, graph):
         """Parse WDL workflow. Handles WDL Workflow, Call, Decl, and WorkflowSection (if/scatter) nodes"""
         if isinstance(wdl_doc, WDL.Workflow):
             """If workflow, parse the inputs, outputs and recursively parse each call"""
@@ -105,45 +182,142 @@ class MiniWDLParser:
                 self.workflow_name = wdl_doc.name
             self.parse_inputs(wdl_doc.inputs)
             for task in wdl_doc.body:
-                self.parse_workflow(task, nodes, edges)
+                self.parse_workflow(task, graph)
             self.parse_outputs(wdl_doc.outputs)
 
         elif isinstance(wdl_doc, WDL.Call):
             """If Call, add the node and parse each input item to determine the type and referee"""
+            if self.subworkflow_depth > 0 and isinstance(wdl_doc.callee, WDL.Workflow):
+                self.expand_call(wdl_doc, graph)
+                return
             self.add_node(
-                nodes=nodes,
+                graph=graph,
                 parent=wdl_doc.parent,
                 id=wdl_doc.workflow_node_id,
                 name=wdl_doc.name,
                 type="call",
             )
             for task_name, workflow_input in wdl_doc.inputs.items():
-                self.add_edge(nodes, edges, workflow_input, wdl_doc.workflow_node_id, task_name)
+                self.add_edge(graph, workflow_input, wdl_doc.workflow_node_id, task_name)
 
         elif isinstance(wdl_doc, WDL.WorkflowSection):
             """If WorkflowSection (if/scatter), add node and recurse on each call in the section"""
             self.add_node(
-                nodes=nodes,
+                graph=graph,
                 parent=wdl_doc.parent,
                 id=wdl_doc.workflow_node_id,
                 name=str(str(wdl_doc.expr)),
                 type="workflow_section",
             )
-            self.add_edge(nodes, edges, wdl_doc.expr, wdl_doc.workflow_node_id)
+            self.add_edge(graph, wdl_doc.expr, wdl_doc.workflow_node_id)
             for task in wdl_doc.body:
-                self.parse_workflow(task, nodes, edges)
+                self.parse_workflow(task, graph)
 
         elif isinstance(wdl_doc, WDL.Decl):
             """If Decl, add node, then parse edges to add the type and refree"""
             if wdl_doc.expr:
                 self.add_node(
-                    nodes=nodes,
+                    graph=graph,
                     parent=wdl_doc.parent,
                     id=wdl_doc.workflow_node_id,
                     name=wdl_doc.name,
                     type="decl",
                 )
-                self.add_edge(nodes, edges, wdl_doc.expr, wdl_doc.workflow_node_id)
+                self.add_edge(graph, wdl_doc.expr, wdl_doc.workflow_node_id)
+
+    def input_sources(self, input_item, node_ids):
+        return [
+            {"node_from": ref, "workflow_ref_name": name, "edge_type": type}
+            for name, ref, type in self.iter_input_items(input_item, node_ids)
+        ]
+
+    @staticmethod
+    def rewire_edge(edge, source, **changes):
+        return dict(
+            edge,
+            node_from=source["node_from"],
+            workflow_ref_name=source["workflow_ref_name"],
+            edge_type=source["edge_type"],
+            **changes,
+        )
+
+    def subworkflow_template(self, callee):
+        """Parses a sub-workflow once, so every call site only has to copy its nodes and edges"""
+        key = (id(callee), self.subworkflow_depth - 1)
+        if key not in self.templates:
+            parser = MiniWDLParser(None, subworkflow_depth=self.subworkflow_depth - 1, templates=self.templates)
+            parser.workflow_name = callee.name
+            for node in callee.body:
+                parser.parse_workflow(node, parser.graph)
+            parser.resolve_expanded_edges()
+            outputs = {
+                output.name: parser.resolve_sources(parser.input_sources(output.expr, parser.graph.node_map))
+                for output in callee.outputs or []
+            }
+            # the callee is kept so its id() isn't reused while the template is cached
+            self.templates[key] = (callee, parser.nodes, parser.edges, outputs)
+        return self.templates[key]
+
+    def expand_call(self, call, graph):
+        """Adds a sub-workflow call as a subgraph of the callee's nodes, with the call's inputs
+        wired to the inner nodes consuming them"""
+        callee, nodes, edges, outputs = self.subworkflow_template(call.callee)
+        call_id = call.workflow_node_id
+        prefix = f"{call_id}-"
+        self.add_node(graph=graph, parent=call.parent, id=call_id, name=call.name, type="workflow_section")
+
+        call_inputs = {
+            input_name: self.input_sources(input_item, graph.node_map)
+            for input_name, input_item in call.inputs.items()
+        }
+
+        def instance_sources(source):
+            if source["node_from"] == "WorkflowInput" and source["workflow_ref_name"] in call_inputs:
+                return call_inputs[source["workflow_ref_name"]]
+            if source["node_from"] in VIRTUAL_NODES:
+                return [source]
+            return [dict(source, node_from=prefix + source["node_from"])]
+
+        for node in nodes:
+            section = call_id if node["section"] == callee.name else prefix + node["section"]
+            graph.add_node(dict(node, id=prefix + node["id"], section=section))
+        for edge in edges:
+            for source in instance_sources(edge):
+                graph.add_edge(self.rewire_edge(edge, source, node_to=prefix + edge["node_to"]))
+        self.expanded_outputs[call_id] = (
+            call.name,
+            {
+                output_name: [instance for source in sources for instance in instance_sources(source)]
+                for output_name, sources in outputs.items()
+            },
+        )
+
+    def resolve_sources(self, sources):
+        """Replaces references to an expanded sub-workflow call with the nodes behind its outputs"""
+        resolved = []
+        for source in sources:
+            if source["node_from"] not in self.expanded_outputs:
+                resolved.append(source)
+                continue
+            call_name, outputs = self.expanded_outputs[source["node_from"]]
+            output_name = self.remove_prefix(source["workflow_ref_name"], f"{call_name}.")
+            resolved.extend(outputs.get(output_name, [source]))
+        return resolved
+
+    def resolve_expanded_edges(self):
+        """Re-routes edges leaving expanded sub-workflow calls, which can only be done once all
+        calls are parsed since WDL doesn't require them in dependency order"""
+        if not self.expanded_outputs:
+            return
+        graph = WorkflowGraph(self.graph.nodes)
+        for edge in self.graph.edges:
+            if edge["node_from"] not in self.expanded_outputs:
+                graph.add_edge(edge)
+                continue
+            for source in self.resolve_sources([edge]):
+                # the consumer keeps its own reference name, e.g. subworkflow.output
+                graph.add_edge(edge if source is edge else dict(edge, node_from=source["node_from"], edge_type=source["edge_type"]))
+        self.graph = graph
 
     @staticmethod
     def remove_prefix(string, prefix):
@@ -152,7 +326,9 @@ class MiniWDLParser:
         return string
 
     def parse(self):
-        self.parse_workflow(self.wdl_doc.workflow, self.nodes, self.edges)
+        with stage("parse_workflow"):
+            self.parse_workflow(self.wdl_doc.workflow, self.graph)
+            self.resolve_expanded_edges()
 
     def to_dict(self):
         return {
@@ -172,20 +348,119 @@ class MiniWDLParser:
             "entity_outputs": []
         }
 
-def write_output(filename, out_type, dict):
-    with open(f"{filename}.{out_type}", "w") as f:
-        if out_type == "yaml":
-            yaml.dump(
-                dict, 
-                f,
-                sort_keys=False
-            )
-        elif out_type == "json":
-            json.dump(
-                dict,
-                f,
-                indent=4
-            )
+def parse_wdl(input_file, loader=None, cache=None, subworkflow_depth=0, structural=False):
+    """Parses a WDL file, skipping miniwdl entirely when the cache has an entry for its sources
+
+    With structural, references are resolved from the syntax tree of the workflow alone,
+    without loading imports or typechecking, unless that's ambiguous. Expanding
+    sub-workflows needs their callees, so it always takes the typechecked path."""
+    # expanded and opaque sub-workflow calls parse to different graphs
+    variant = f"-subworkflows-{subworkflow_depth}" if subworkflow_depth else ""
+    structural = structural and not subworkflow_depth
+    if structural:
+        # typechecking rejects documents the structural parse accepts
+        variant += "-structural"
+    if cache:
+        with stage("cache.get"):
+            key = cache.key(input_file, variant=variant)
+            parsed_dict = cache.get(input_file, key=key)
+        if parsed_dict is not None:
+            return MiniWDLParser.from_dict(parsed_dict)
+
+    parser = None
+    if structural:
+        from miniwdl_viz.structural_parser import AmbiguousReference, parse_structural
+
+        try:
+            parser = parse_structural(input_file)
+        except AmbiguousReference:
+            pass
+    if parser is None:
+        with stage("wdl.load", file=input_file):
+            doc = loader.load(input_file) if loader else WDL.load(uri=input_file)
+        parser = MiniWDLParser(doc, subworkflow_depth=subworkflow_depth)
+        parser.parse()
+
+    if cache:
+        with stage("cache.put"):
+            cache.put(input_file, parser.to_dict(), key=key)
+    return parser
+
+def add_parse_arguments(arg_parser):
+    arg_parser.add_argument("--structural", action='store_true', default=False, help="resolve references from the workflow's syntax alone, skipping imports and typechecking; falls back to the full parse when that's ambiguous")
+    arg_parser.add_argument("--expand-subworkflows", type=int, nargs="?", const=MAX_SUBWORKFLOW_DEPTH, default=0, metavar="DEPTH", help=f"draw calls to sub-workflows as subgraphs of their calls, up to DEPTH levels deep (default without DEPTH: {MAX_SUBWORKFLOW_DEPTH})")
+
+def import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack graph files need the msgpack package: pip install 'miniwdl_viz[msgpack]'")
+    return msgpack
+
+def dump_output(out_type, dict, compact=False):
+    """Serializes a to_dict() result, returning str, or bytes for msgpack"""
+    with stage("serialize", format=out_type):
+        return serialize(out_type, dict, compact)
+
+def serialize(out_type, dict, compact):
+    if out_type == "yaml":
+        import yaml
+
+        # libyaml's dumper writes the same output several times faster
+        return yaml.dump(
+            dict,
+            Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+            sort_keys=False
+        )
+    elif out_type == "json":
+        if compact:
+            return json.dumps(dict, separators=(",", ":"))
+        return json.dumps(
+            dict,
+            indent=4
+        )
+    elif out_type == "msgpack":
+        return import_msgpack().packb(dict)
+    elif out_type == "npz":
+        from miniwdl_viz.graph_arrays import GraphArrays
+
+        return GraphArrays.from_dict(dict).dumps()
+
+def write_output(filename, out_type, dict, compact=False):
+    data = dump_output(out_type, dict, compact=compact)
+    with stage("write"), open(f"{filename}.{out_type}", "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+def load_graph_file(path):
+    """Rebuilds a parser from a graph file written by miniwdl_parser, without miniwdl"""
+    out_type = GRAPH_FILE_TYPES.get(Path(path).suffix.lower())
+    if out_type is None:
+        raise ValueError(f"Unsupported input {path}, expected a .wdl file or a {'/'.join(GRAPH_FILE_TYPES)} graph file")
+    with stage("graph_file.load", format=out_type):
+        return MiniWDLParser.from_dict(read_graph_file(path, out_type))
+
+def read_graph_file(path, out_type):
+    if out_type == "npz":
+        from miniwdl_viz.graph_arrays import GraphArrays
+
+        return GraphArrays.load(path).to_dict()
+    with open(path, "rb") as f:
+        data = f.read()
+    if out_type == "json":
+        return json.loads(data)
+    elif out_type == "yaml":
+        import yaml
+
+        return yaml.load(data, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    return import_msgpack().unpackb(data)
+
+def profiled_loader(profiler):
+    """A DocumentLoader when profiling, which splits WDL.load into read, parse, imports and typecheck stages"""
+    if profiler is None:
+        return None
+    from miniwdl_viz.wdl_loader import DocumentLoader
+
+    return DocumentLoader()
 
 def main():
     arg_parser = argparse.ArgumentParser(
@@ -196,17 +471,43 @@ def main():
     arg_parser.add_argument("-d", "--output-dir")
     arg_parser.add_argument("-o", "--output-file")
     arg_parser.add_argument("-j", "--json-output", action='store_true', default=False)
+    arg_parser.add_argument("-m", "--msgpack-output", action='store_true', default=False, help="write a compact binary msgpack graph file (needs msgpack installed)")
+    arg_parser.add_argument("-n", "--npz-output", action='store_true', default=False, help="write the graph as numpy arrays with a CSR adjacency in an .npz file (needs numpy installed)")
+    arg_parser.add_argument("--compact", action='store_true', default=False, help="with -j, write json without indentation")
+    add_parse_arguments(arg_parser)
+    add_cache_arguments(arg_parser)
+    add_profile_arguments(arg_parser)
+    arg_parser.add_argument("-w", "--watch", action='store_true', default=False, help="keep running, and rewrite the output when the WDL file or its imports change")
 
     args = arg_parser.parse_args()
 
-    doc = WDL.load(uri=args.input_wdl)
-    parser = MiniWDLParser(doc)
-    parser.parse()
-
-    out_type = "json" if args.json_output else "yaml"
+    out_type = "npz" if args.npz_output else "msgpack" if args.msgpack_output else "json" if args.json_output else "yaml"
     filename = args.output_file if args.output_file else Path(args.input_wdl).stem 
     filepath = str(Path(args.output_dir)/filename) if args.output_dir else filename
-    write_output(filepath, out_type, parser.to_dict())
+
+    if args.watch:
+        from miniwdl_viz.watch import WorkflowWatcher
+
+        if cache_enabled(args):
+            arg_parser.error("--watch keeps the parsed documents in memory and doesn't use --cache")
+
+        WorkflowWatcher(
+            args.input_wdl,
+            lambda parser: {f"{filepath}.{out_type}": dump_output(out_type, parser.to_dict(), compact=args.compact)},
+            subworkflow_depth=args.expand_subworkflows,
+            structural=args.structural,
+        ).run()
+        return
+
+    with profile_from_args(args) as profiler:
+        parser = parse_wdl(
+            args.input_wdl,
+            loader=profiled_loader(profiler),
+            cache=create_graph_cache(args),
+            subworkflow_depth=args.expand_subworkflows,
+            structural=args.structural,
+        )
+        write_output(filepath, out_type, parser.to_dict(), compact=args.compact)
     
 
 if __name__ == "__main__":
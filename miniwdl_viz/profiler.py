@@ -0,0 +1,140 @@
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# the profiler collecting stages in this thread, if any
+active_profiler = contextvars.ContextVar("active_profiler", default=None)
+NOT_PROFILING = contextlib.nullcontext()
+
+
+def stage(name, **trace_args):
+    """Context manager timing a stage in the active profiler, or doing nothing without one"""
+    profiler = active_profiler.get()
+    if profiler is None:
+        return NOT_PROFILING
+    return profiler.stage(name, **trace_args)
+
+
+class Profiler:
+    """Records wall time, call count and peak traced memory of named stages
+
+    Use as a context manager to profile everything the library does inside it, e.g.
+    with Profiler() as profiler: parse_wdl(...), then read profiler.totals(). callback,
+    if set, is called with (name, seconds, peak_bytes) whenever a stage finishes, so
+    timings can be aggregated over many files. Stages nested in a stage of the same
+    name (imports importing imports) only count towards its calls, not its time."""
+
+    def __init__(self, memory=True, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.events = []
+        self.stack = []
+        self.totals_by_name = {}
+        self.start_ns = time.perf_counter_ns()
+        self.started_tracemalloc = False
+        self.token = None
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.token = active_profiler.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        active_profiler.reset(self.token)
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        return False
+
+    def traced_peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.memory and tracemalloc.is_tracing() else 0
+
+    @contextlib.contextmanager
+    def stage(self, name, **trace_args):
+        if self.stack:
+            # the parent's peak so far would be lost by resetting the peak for this stage
+            self.stack[-1]["peak"] = max(self.stack[-1]["peak"], self.traced_peak())
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        current = {"name": name, "peak": 0}
+        self.stack.append(current)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            self.stack.pop()
+            peak = max(current["peak"], self.traced_peak())
+            if self.stack:
+                self.stack[-1]["peak"] = max(self.stack[-1]["peak"], peak)
+            self.record(name, start, elapsed, peak, trace_args)
+
+    def record(self, name, start, elapsed, peak, trace_args):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self.start_ns) / 1000,
+            "dur": elapsed / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.memory or trace_args:
+            event["args"] = dict(trace_args, peak_kb=peak // 1024) if self.memory else dict(trace_args)
+        self.events.append(event)
+
+        totals = self.totals_by_name.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+        totals["calls"] += 1
+        if not any(parent["name"] == name for parent in self.stack):
+            totals["seconds"] += elapsed / 1e9
+        totals["peak_bytes"] = max(totals["peak_bytes"], peak)
+        if self.callback is not None:
+            self.callback(name, elapsed / 1e9, peak)
+
+    def totals(self):
+        """{stage name: {"calls", "seconds", "peak_bytes"}} in the order stages first finished"""
+        return self.totals_by_name
+
+    def chrome_trace(self):
+        return {"traceEvents": sorted(self.events, key=lambda event: event["ts"]), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Writes a trace-event file for chrome://tracing or https://ui.perfetto.dev"""
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+    def summary(self):
+        rows = [f"{'stage':<20} {'calls':>7} {'seconds':>9}" + (f" {'peak MB':>9}" if self.memory else "")]
+        for name, totals in self.totals_by_name.items():
+            row = f"{name:<20} {totals['calls']:>7} {totals['seconds']:>9.4f}"
+            if self.memory:
+                row += f" {totals['peak_bytes'] / 2**20:>9.2f}"
+            rows.append(row)
+        return "\n".join(rows)
+
+
+def add_profile_arguments(arg_parser):
+    arg_parser.add_argument("--profile", nargs="?", const="profile.json", metavar="TRACE_FILE", help="time each stage, print a summary to stderr and write a chrome trace-event file (default: profile.json)")
+    arg_parser.add_argument("--profile-no-memory", action='store_true', default=False, help="with --profile, skip tracking peak memory, which slows python down")
+
+
+@contextlib.contextmanager
+def profile_from_args(args):
+    """Profiles the block when --profile was given, writing the trace and summary afterwards"""
+    if not args.profile:
+        yield None
+        return
+    profiler = Profiler(memory=not args.profile_no_memory)
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        profiler.write_chrome_trace(args.profile)
+        print(profiler.summary(), file=sys.stderr)
+        print(f"Wrote trace to {args.profile}", file=sys.stderr)
@@ -1,9 +1,6 @@
-from miniwdl_viz.mermaid_node import (
-    MermaidCallNode,
-    MermaidDeclNode,
-    MermaidInputNode,
-    MermaidSubgraphNode,
-)
+import sys
+
+from miniwdl_viz.mermaid_node import MermaidNode, MermaidSubgraphNode, NodeType
 
 
 class PyMermaid:
@@ -13,13 +10,32 @@ class PyMermaid:
         max_length_input_names=200,
         flowchart_dir="TD",
         style_classes="classDef done fill:#f96",
+        sink=None,
     ):
         self.hide_input_names = hide_input_names
         self.max_length_input_names = max_length_input_names
         self.flowchart_dir = flowchart_dir
         self.node_tracking = {}
-        self.mermaid_list = [f"flowchart {self.flowchart_dir}"]
-        self.mermaid_list.append(style_classes)
+        # node id -> rendered node and edge label -> arrow text, since both are repeated
+        # across the edges of large flowcharts
+        self.node_labels = {}
+        self.arrow_texts = {}
+        # When a sink (file, stdout, io.StringIO) is given, rows are written to it as they
+        # are created, already indented, instead of being kept in mermaid_list
+        self.sink = sink
+        self.rows_written = 0
+        self.pending_classes = {}
+        self.mermaid_list = []
+        self.append_row(f"flowchart {self.flowchart_dir}")
+        for style_class in [style_classes] if isinstance(style_classes, str) else style_classes:
+            self.append_row(style_class)
+
+    def append_row(self, row):
+        if self.sink is None:
+            self.mermaid_list.append(row)
+        else:
+            self.sink.write(f"{row}\n" if self.rows_written == 0 else f"    {row}\n")
+            self.rows_written += 1
 
     def create_arrow(self):
         return "-->"
@@ -31,39 +47,67 @@ class PyMermaid:
             text = text[: self.max_length_input_names] + "..."
         return f"|{text}|"
 
+    def arrow_text(self, text):
+        arrow_text = self.arrow_texts.get(text)
+        if arrow_text is None:
+            arrow_text = self.arrow_texts[text] = self.create_arrow_text(text)
+        return arrow_text
+
     def create_mm_node(self, node):
-        if node.get("type") == "input":
-            return MermaidInputNode(node.get("id"), node.get("name"))
-        elif node.get("type") == "decl":
-            return MermaidDeclNode(node.get("id"), node.get("name"))
-        elif node.get("type") == "call":
-            return MermaidCallNode(node.get("id"), node.get("name"))
-        elif node.get("type") == "workflow_section":
+        if node.get("type") == NodeType.WORKFLOW_SECTION.value:
+            # sections are drawn as subgraphs, so they're only referred to by id
             return str(node.get("id"))
+        return MermaidNode.from_dict(node)
+
+    def node_label(self, node):
+        label = self.node_labels.get(node["id"])
+        if label is None:
+            label = self.node_labels[sys.intern(node["id"])] = f"{self.create_mm_node(node)}"
+        return label
 
     def add_mermaid_edge(self, node_from, node_to, edge):
-        self.mermaid_list.append(
-            f"{self.create_mm_node(node_from)} {self.create_arrow()} {self.create_arrow_text(edge['task_ref_name'])} {self.create_mm_node(node_to)}"
+        self.append_row(
+            f"{self.node_label(node_from)} {self.create_arrow()} {self.arrow_text(edge['task_ref_name'])} {self.node_label(node_to)}"
         )
 
     def add_mermaid_edge_id(self, id_from, id_to, edge):
-        self.mermaid_list.append(
-            f"{id_from} {self.create_arrow()} {self.create_arrow_text(edge['task_ref_name'])} {id_to}"
+        self.append_row(
+            f"{id_from} {self.create_arrow()} {self.arrow_text(edge['task_ref_name'])} {id_to}"
         )
 
     def add_subgraph(self, id, name, subgraph_nodes):
-        self.mermaid_list.append(f"subgraph {MermaidSubgraphNode(id, name)}")
+        self.append_row(f"subgraph {MermaidSubgraphNode(id, name)}")
         for subgraph_node in subgraph_nodes:
             self.add_node(subgraph_node)
-        self.mermaid_list.append("end")
+        self.append_row("end")
 
     def set_node_class(self, node_id, node_class="done"):
+        if self.sink is not None:
+            # rows already written can't be edited, so the class is applied when the node
+            # is emitted, or with a class statement in finish()
+            self.pending_classes[node_id] = node_class
+            return
+
         node_ind = self.node_tracking.get(node_id)
-        if not node_ind:
+        if node_ind is None:
             return
 
         self.mermaid_list[node_ind] = f"{self.mermaid_list[node_ind]}:::{node_class}"
 
     def add_node(self, node):
-        self.node_tracking[node["id"]] = len(self.mermaid_list)
-        self.mermaid_list.append(f"{self.create_mm_node(node)}")
+        row = f"{self.create_mm_node(node)}"
+        if self.sink is None:
+            self.node_tracking[node["id"]] = len(self.mermaid_list)
+        else:
+            self.node_tracking[node["id"]] = self.rows_written
+            node_class = self.pending_classes.pop(node["id"], None)
+            if node_class:
+                row = f"{row}:::{node_class}"
+        self.append_row(row)
+
+    def finish(self):
+        """Writes the class assignments deferred for nodes that were already streamed"""
+        for node_id, node_class in self.pending_classes.items():
+            if node_id in self.node_tracking:
+                self.append_row(f"class {node_id} {node_class}")
+        self.pending_classes = {}
@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from miniwdl_viz.disk_cache import DiskCache, default_cache_dir
+
+DEFAULT_RENDERER_URL = "https://mermaid.ink"
+
+
+def create_render_cache(cache_dir=None, max_size=512 * 1024 * 1024):
+    return DiskCache(os.path.join(cache_dir or default_cache_dir(), "images"), max_size=max_size)
+
+
+class RemoteRenderer:
+    """Renders mermaid text to png through a mermaid.ink compatible server. Connections are
+    pooled in one session with retry/backoff, and images are cached by content hash."""
+
+    def __init__(
+        self,
+        base_url=DEFAULT_RENDERER_URL,
+        cache=None,
+        retries=3,
+        backoff_factor=0.5,
+        timeout=60,
+        pool_size=8,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"],
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def cache_key(self, mermaid_str):
+        return hashlib.sha256(f"{self.base_url}\0{mermaid_str}".encode()).hexdigest()
+
+    def image_url(self, mermaid_str):
+        base64_str = base64.b64encode(mermaid_str.encode()).decode("ascii")
+        return f"{self.base_url}/img/{base64_str}"
+
+    def render(self, mermaid_str):
+        """Returns the png bytes for the diagram, from the cache when the text was rendered before"""
+        key = self.cache_key(mermaid_str)
+        if self.cache:
+            image = self.cache.get(key)
+            if image is not None:
+                return image
+
+        response = self.session.get(self.image_url(mermaid_str), timeout=self.timeout)
+        response.raise_for_status()
+        image = response.content
+
+        if self.cache:
+            self.cache.put(key, image)
+        return image
+
+    def render_many(self, mermaid_strs, max_workers=4):
+        """Renders diagrams concurrently, at most max_workers requests at a time. Identical
+        diagrams are only rendered once. Returns png bytes in input order."""
+        unique = list(dict.fromkeys(mermaid_strs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            images = dict(zip(unique, executor.map(self.render, unique)))
+        return [images[mermaid_str] for mermaid_str in mermaid_strs]
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import time
+
+from miniwdl_viz.disk_cache import atomic_write
+
+# miniwdl names call directories after the call's workflow_node_id, followed by the scatter
+# index (and optional readable tag) of each enclosing scatter, e.g. call-ImportGVCFs-03-chr1
+CALL_DIR_RE = re.compile(r"^(call-[A-Za-z0-9_]+)(?:-(.*))?$")
+READY_RE = re.compile(r'\bready :: job: "([^"]+)"')
+
+STATES = ["queued", "running", "done", "failed"]
+STATUS_STYLE_CLASSES = [
+    "classDef done fill:#9e9",
+    "classDef running fill:#fe8",
+    "classDef failed fill:#f77",
+    "classDef queued fill:#ddd",
+]
+
+
+class RunDirectoryTracker:
+    """Follows a miniwdl run directory and tracks the state of every call and scatter shard.
+
+    Each poll only reads what changed since the previous one: the run directory is only
+    re-listed when its mtime changes, finished calls are never looked at again, running
+    calls are only checked when their own directory's mtime changes, and workflow.log is
+    read from where the last poll stopped."""
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.run_dir_mtime = None
+        self.log_offset = 0
+        self.log_remainder = ""
+        # job id (call directory name) -> state
+        self.job_states = {}
+        # job id -> directory mtime when last checked, for jobs that aren't finished
+        self.open_jobs = {}
+
+    @staticmethod
+    def node_id(job_id):
+        match = CALL_DIR_RE.match(job_id)
+        return match.group(1) if match else None
+
+    def read_log(self):
+        """Reads newly appended workflow.log lines, returning job ids that became ready"""
+        try:
+            with open(os.path.join(self.run_dir, "workflow.log"), "rb") as f:
+                f.seek(self.log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        self.log_offset += len(data)
+        lines = (self.log_remainder + data.decode("utf-8", errors="replace")).split("\n")
+        self.log_remainder = lines.pop()
+        return [match.group(1) for line in lines if (match := READY_RE.search(line))]
+
+    def job_state(self, job_dir):
+        if os.path.exists(os.path.join(job_dir, "outputs.json")):
+            return "done"
+        if os.path.exists(os.path.join(job_dir, "error.json")):
+            return "failed"
+        return "running"
+
+    def set_state(self, job_id, state, changed):
+        if self.node_id(job_id) is None or self.job_states.get(job_id) == state:
+            return
+        self.job_states[job_id] = state
+        changed.add(self.node_id(job_id))
+
+    def poll(self):
+        """Updates job states, returning the workflow node ids whose state changed"""
+        changed = set()
+        for job_id in self.read_log():
+            if job_id not in self.job_states:
+                self.set_state(job_id, "queued", changed)
+
+        try:
+            run_dir_mtime = os.stat(self.run_dir).st_mtime_ns
+        except FileNotFoundError:
+            return changed
+        if run_dir_mtime != self.run_dir_mtime:
+            self.run_dir_mtime = run_dir_mtime
+            with os.scandir(self.run_dir) as entries:
+                for entry in entries:
+                    if (
+                        entry.is_dir()
+                        and self.node_id(entry.name)
+                        and self.job_states.get(entry.name) in (None, "queued")
+                    ):
+                        self.open_jobs[entry.name] = None
+
+        for job_id, last_mtime in list(self.open_jobs.items()):
+            job_dir = os.path.join(self.run_dir, job_id)
+            try:
+                mtime = os.stat(job_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime == last_mtime:
+                continue
+            self.open_jobs[job_id] = mtime
+            state = self.job_state(job_dir)
+            self.set_state(job_id, state, changed)
+            if state in ("done", "failed"):
+                del self.open_jobs[job_id]
+        return changed
+
+    def node_counts(self):
+        """Returns {workflow_node_id: {state: number of jobs}}"""
+        counts = {}
+        for job_id, state in self.job_states.items():
+            node_counts = counts.setdefault(self.node_id(job_id), dict.fromkeys(STATES, 0))
+            node_counts[state] += 1
+        return counts
+
+
+def node_class(counts):
+    if counts["failed"]:
+        return "failed"
+    if counts["running"]:
+        return "running"
+    if counts["queued"]:
+        return "queued" if not counts["done"] else "running"
+    return "done"
+
+
+def format_counts(counts):
+    total = sum(counts.values())
+    parts = [f"{counts['done']}/{total} done"]
+    parts.extend(f"{counts[state]} {state}" for state in ["running", "queued", "failed"] if counts[state])
+    return ", ".join(parts)
+
+
+def status_nodes(graph, node_counts):
+    """Copies the parsed nodes, adding aggregated shard counts to each section's label"""
+    section_counts = {}
+    for node_id, counts in node_counts.items():
+        if node_id not in graph:
+            continue
+        section = graph.get_node(node_id)["section"]
+        while section in graph:
+            totals = section_counts.setdefault(section, dict.fromkeys(STATES, 0))
+            for state, count in counts.items():
+                totals[state] += count
+            section = graph.get_node(section)["section"]
+
+    nodes = []
+    for node in graph.nodes:
+        if node["id"] in section_counts:
+            node = dict(node, name=f"{node['name']} [{format_counts(section_counts[node['id']])}]")
+        nodes.append(node)
+    return nodes
+
+
+def status_flowchart(miniwdl_parser, tracker, pwm):
+    """Creates the flowchart of a parsed workflow, colored by the tracked run state. pwm
+    should be created with style_classes=STATUS_STYLE_CLASSES."""
+    node_counts = tracker.node_counts()
+    nodes = status_nodes(miniwdl_parser.graph, node_counts)
+    mermaid_list = pwm.create_mermaid_flowchart(miniwdl_parser.workflow_name, nodes, miniwdl_parser.edges)
+    for node_id, counts in node_counts.items():
+        pwm.py_mermaid.set_node_class(node_id, node_class(counts))
+    return mermaid_list
+
+
+def follow_run(miniwdl_parser, tracker, create_pwm, output_file, interval=2.0, once=False):
+    """Rewrites output_file whenever the run state changes, until the workflow finishes"""
+    last_text = None
+    while True:
+        changed = tracker.poll()
+        if changed or last_text is None:
+            pwm = create_pwm()
+            text = "".join(pwm.indented_rows(status_flowchart(miniwdl_parser, tracker, pwm)))
+            if text != last_text:
+                atomic_write(output_file, text.encode())
+                last_text = text
+                print(f"Updated {output_file}: {len(changed)} calls changed", file=sys.stderr)
+        finished = any(
+            os.path.exists(os.path.join(tracker.run_dir, name)) for name in ("outputs.json", "error.json")
+        )
+        if once or finished:
+            return
+        time.sleep(interval)
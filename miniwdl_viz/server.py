@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import traceback
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from miniwdl_viz.graph_diff import graph_hash
+from miniwdl_viz.graph_slice import SliceError, create_graph_slice
+from miniwdl_viz.mermaid_wdl import create_arg_parser, create_parsed_wdl_to_mermaid, parsed_wdl_to_mermaid
+from miniwdl_viz.miniwdl_parser import GRAPH_FILE_TYPES, load_graph_file, parse_wdl
+from miniwdl_viz.watch import document_paths
+from miniwdl_viz.wdl_loader import DocumentLoader
+
+# sliced workflows kept for repeated --focus requests, the oldest are dropped first
+MAX_SLICES = 256
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def describe(exn):
+    return f"{type(exn).__name__}: {exn}" if str(exn) else type(exn).__name__
+
+
+class RequestArgumentParser(argparse.ArgumentParser):
+    """Raises RequestError for invalid arguments instead of printing to stderr and exiting,
+    which would affect every request running at the same time"""
+
+    def error(self, message):
+        raise RequestError(400, f"{self.prog}: error: {message}")
+
+    def exit(self, status=0, message=None):
+        raise RequestError(400, (message or "invalid arguments").strip())
+
+    def print_help(self, file=None):
+        raise RequestError(400, self.format_help())
+
+
+def file_stamps(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class DiagramService:
+    """Parses WDL files into graphs and mermaid text for many requests in one process.
+
+    Parsed workflows are kept keyed by path and reused while the mtime and size of the
+    workflow and all of its imports are unchanged. When something changed, the
+    DocumentLoader only re-parses the documents whose content hash differs, and reuses
+    imported documents shared between workflows."""
+
+    def __init__(self, root=None, import_path=None):
+        self.root = os.path.realpath(root or os.getcwd())
+        self.loader = DocumentLoader(path=import_path)
+        # the loader runs miniwdl on an event loop, so one parse at a time
+        self.parse_lock = threading.Lock()
+        # (path, subworkflow depth, structural) -> (parser, {document path: (mtime, size)})
+        self.parsed = {}
+        # GraphSlice.key -> sliced parser, and parser -> its graph_hash for those keys
+        self.slices = {}
+        self.graph_hashes = weakref.WeakKeyDictionary()
+        self.slice_lock = threading.Lock()
+        self.arg_parser = create_arg_parser(RequestArgumentParser)
+
+    def resolve(self, path):
+        if not path:
+            raise RequestError(400, "missing path")
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, resolved]) != self.root:
+            raise RequestError(403, f"{path} is outside of {self.root}")
+        if not os.path.isfile(resolved):
+            raise RequestError(404, f"{path} not found")
+        return resolved
+
+    def parse_args(self, path, cli_args):
+        return self.arg_parser.parse_args([path] + list(cli_args))
+
+    def parse(self, path, subworkflow_depth=0, structural=False):
+        """Returns the parsed workflow, from memory while none of its files changed"""
+        if not path.endswith(".wdl"):
+            if os.path.splitext(path)[1].lower() not in GRAPH_FILE_TYPES:
+                raise RequestError(400, f"{os.path.basename(path)} is neither a .wdl file nor a {'/'.join(GRAPH_FILE_TYPES)} graph file")
+            try:
+                return load_graph_file(path)
+            except Exception as exn:
+                raise RequestError(422, f"invalid graph file: {describe(exn)}")
+        key = (path, subworkflow_depth, structural)
+        entry = self.parsed.get(key)
+        if entry and file_stamps(entry[1]) == entry[1]:
+            return entry[0]
+        with self.parse_lock:
+            entry = self.parsed.get(key)
+            if entry and file_stamps(entry[1]) == entry[1]:
+                return entry[0]
+            # stamp the previously seen documents before parsing, so a save during the
+            # parse makes the next request parse again instead of serving stale results
+            stamps = file_stamps(entry[1]) if entry else None
+            try:
+                parser = parse_wdl(path, loader=self.loader, subworkflow_depth=subworkflow_depth, structural=structural)
+            except Exception as exn:
+                raise RequestError(422, describe(exn))
+            paths = document_paths(parser.wdl_doc)
+            if stamps is None or set(stamps) != paths:
+                stamps = file_stamps(paths)
+            if stamps is not None:
+                self.parsed[key] = (parser, stamps)
+            return parser
+
+    def slice(self, parser, args):
+        """The slice of parser chosen with --focus, cached by workflow hash, focus and depth"""
+        graph_slice = create_graph_slice(args)
+        if graph_slice is None:
+            return parser
+        with self.slice_lock:
+            workflow_hash = self.graph_hashes.get(parser)
+            if workflow_hash is None:
+                workflow_hash = self.graph_hashes[parser] = graph_hash(parser)
+            key = graph_slice.key(workflow_hash)
+            sliced = self.slices.get(key)
+            if sliced is None:
+                try:
+                    sliced = graph_slice.apply_to(parser)
+                except SliceError as exn:
+                    raise RequestError(400, str(exn))
+                if len(self.slices) >= MAX_SLICES:
+                    del self.slices[next(iter(self.slices))]
+                self.slices[key] = sliced
+            return sliced
+
+    def graph(self, path, cli_args=()):
+        resolved = self.resolve(path)
+        args = self.parse_args(resolved, cli_args)
+        return self.slice(self.parse(resolved, args.expand_subworkflows, args.structural), args).to_dict()
+
+    def mermaid(self, path, cli_args=()):
+        resolved = self.resolve(path)
+        args = self.parse_args(resolved, cli_args)
+        parser = self.slice(self.parse(resolved, args.expand_subworkflows, args.structural), args)
+        pwm = create_parsed_wdl_to_mermaid(args, args.output_file)
+        try:
+            return "".join(pwm.indented_rows(parsed_wdl_to_mermaid(parser, pwm)))
+        except Exception as exn:
+            if resolved.endswith(".wdl"):
+                raise
+            # a graph file can link nodes it doesn't have
+            raise RequestError(422, f"invalid graph file: {describe(exn)}")
+
+
+class DiagramRequestHandler(BaseHTTPRequestHandler):
+    """GET /graph or /mermaid with ?path=...&arg=--flowchart-dir&arg=TD, or POST a
+    {"path": ..., "args": [...]} json body. args are the wdl_to_mermaid options."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.respond(url.path, query.get("path", [None])[0], query.get("arg", []))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self.send_body(400, "text/plain", b"invalid json body")
+            return
+        self.respond(url.path, body.get("path"), body.get("args", []))
+
+    def respond(self, route, path, cli_args):
+        service = self.server.service
+        try:
+            if route == "/health":
+                self.send_body(200, "text/plain", b"ok")
+            elif route == "/graph":
+                self.send_body(200, "application/json", json.dumps(service.graph(path, cli_args)).encode())
+            elif route == "/mermaid":
+                self.send_body(200, "text/plain; charset=utf-8", service.mermaid(path, cli_args).encode())
+            else:
+                self.send_body(404, "text/plain", f"unknown endpoint {route}".encode())
+        except RequestError as exn:
+            self.send_body(exn.status, "text/plain", str(exn).encode())
+        except Exception as exn:
+            traceback.print_exc()
+            self.send_body(500, "text/plain", describe(exn).encode())
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(service, host="127.0.0.1", port=8765, verbose=False):
+    server = ThreadingHTTPServer((host, port), DiagramRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve_main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog="wdl_to_mermaid serve",
+        description=DiagramService.__doc__,
+    )
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--root", default=None, help="directory the requested paths are relative to, and confined to (default: current directory)")
+    arg_parser.add_argument("-I", "--import-path", action="append", default=[], help="directory to search for imports")
+    arg_parser.add_argument("-v", "--verbose", action='store_true', default=False, help="log every request")
+    args = arg_parser.parse_args(argv)
+
+    server = create_server(
+        DiagramService(root=args.root, import_path=args.import_path),
+        host=args.host,
+        port=args.port,
+        verbose=args.verbose,
+    )
+    print(f"Serving diagrams of {server.service.root} on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,157 @@
+import os
+
+import WDL
+
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, expr_kind
+from miniwdl_viz.profiler import stage
+
+
+class AmbiguousReference(Exception):
+    """Raised when a document can't be resolved from its syntax alone the way typechecking would"""
+
+
+def left_name(expr):
+    """The leftmost name of a dotted identifier inside Get nodes, which is the only kind of
+    expression besides Get that has a name, or None for any other expression"""
+    if isinstance(expr, WDL.Expr.Get):
+        return None
+    name = getattr(expr, "name", None)
+    return name if isinstance(name, str) else None
+
+
+def dotted_name(get):
+    """a.b.c for a chain of Get nodes around the leftmost name a, or None"""
+    members = []
+    while isinstance(get, WDL.Expr.Get):
+        if get.member:
+            members.append(get.member)
+        get = get.expr
+    name = left_name(get)
+    if name is None:
+        return None
+    return ".".join([name] + members[::-1])
+
+
+class StructuralParser(MiniWDLParser):
+    """Parses a workflow from miniwdl's syntax tree, without loading imports or typechecking
+
+    Before typechecking, a dotted name like a.b.c is a chain of Get nodes around the
+    leftmost name, which typechecking folds into an Ident of the longest prefix that names a
+    value. This resolves them the same way against the workflow's own declarations,
+    scatter variables and call outputs, so the nodes and edges match MiniWDLParser.parse
+    on a typechecked document."""
+
+    def __init__(self, wdl_doc):
+        super().__init__(wdl_doc)
+        workflow = wdl_doc.workflow
+        if workflow is None:
+            raise AmbiguousReference(f"{wdl_doc.pos.uri} has no workflow")
+        if workflow.effective_wdl_version == "draft-2" and workflow.outputs is not None:
+            # the syntax tree doesn't show which outputs are bare call outputs or wildcards
+            raise AmbiguousReference("draft-2 call outputs are only expanded by typechecking")
+        # decl name -> node id and call name -> node id, which are visible throughout the workflow
+        self.values = {}
+        self.calls = {}
+        # scatter variable -> scatter node id, of the scatters around the node being parsed
+        self.scatter_variables = {}
+        self.all_scatter_variables = set()
+        for decl in workflow.inputs or []:
+            self.bind(self.values, decl.name, decl.workflow_node_id)
+        self.bind_body(workflow.body)
+        if not self.all_scatter_variables.isdisjoint(self.values.keys() | self.calls.keys()):
+            raise AmbiguousReference("a scatter variable shadows a declaration")
+
+    def bind(self, names, name, node_id):
+        if name in self.values or name in self.calls:
+            raise AmbiguousReference(f"{name} is declared more than once")
+        names[name] = node_id
+
+    def bind_body(self, body):
+        for node in body:
+            if isinstance(node, WDL.Call):
+                self.bind(self.calls, node.name, node.workflow_node_id)
+            elif isinstance(node, WDL.Decl):
+                self.bind(self.values, node.name, node.workflow_node_id)
+            elif isinstance(node, WDL.WorkflowSection):
+                if isinstance(node, WDL.Scatter):
+                    # sibling scatters may reuse a variable name, so these are scoped
+                    self.all_scatter_variables.add(node.variable)
+                self.bind_body(node.body)
+
+    def parse_workflow(self, wdl_doc, graph):
+        if not isinstance(wdl_doc, WDL.Scatter):
+            super().parse_workflow(wdl_doc, graph)
+            return
+        self.scatter_variables[wdl_doc.variable] = wdl_doc.workflow_node_id
+        try:
+            super().parse_workflow(wdl_doc, graph)
+        finally:
+            del self.scatter_variables[wdl_doc.variable]
+
+    def is_bound(self, name):
+        if name in self.values or name in self.scatter_variables:
+            return True
+        # call outputs are only known to the callee, so any call.output is taken to exist
+        call_name, _, output = name.partition(".")
+        return call_name in self.calls and output != "" and "." not in output
+
+    def node_id(self, name):
+        node_id = self.scatter_variables.get(name) or self.values.get(name)
+        return node_id if node_id is not None else self.calls[name.partition(".")[0]]
+
+    def resolve_get(self, get):
+        """Returns the identifier a Get node folds into when typechecked, or None when it
+        accesses a member of some other expression"""
+        expr = get.expr
+        name = left_name(expr)
+        if name is not None:
+            if self.is_bound(name):
+                return name
+            if get.member and self.is_bound(f"{name}.{get.member}"):
+                return f"{name}.{get.member}"
+            raise AmbiguousReference(f"unknown identifier {get}")
+        if isinstance(expr, WDL.Expr.Get):
+            try:
+                return self.resolve_get(expr)
+            except AmbiguousReference:
+                # the rest of a namespaced identifier, e.g. call.output
+                prefix = dotted_name(expr)
+                if prefix and get.member and self.is_bound(f"{prefix}.{get.member}"):
+                    return f"{prefix}.{get.member}"
+                raise
+        return None
+
+    def iter_input_items(self, input_item, node_ids):
+        stack = [input_item]
+        while stack:
+            input_item = stack.pop()
+            if type(input_item) is WDL.Expr.Get:
+                name = self.resolve_get(input_item)
+                if name is None:
+                    stack.append(input_item.expr)
+                    continue
+                ref_name = self.node_id(name)
+                yield name, ref_name if ref_name in node_ids else "WorkflowInput", "input"
+                continue
+            kind = expr_kind(type(input_item))
+            if kind == "literal":
+                yield str(input_item), "HardcodedVariable", "input"
+            elif kind == "expr":
+                children = input_item.children
+                if not isinstance(children, list):
+                    children = list(children)
+                stack.extend(reversed(children))
+
+
+def parse_structural(input_file):
+    """Parses a local WDL file with StructuralParser, raising AmbiguousReference when it can't"""
+    with stage("wdl.read", file=input_file):
+        with open(input_file) as wdl_file:
+            source_text = wdl_file.read()
+    with stage("wdl.parse", file=input_file):
+        doc = WDL.parse_document(source_text, uri=input_file)
+    # parse_document only records the uri, and --watch watches the document's abspath
+    doc.pos = doc.pos._replace(abspath=os.path.abspath(input_file))
+    parser = StructuralParser(doc)
+    parser.parse()
+    return parser
@@ -0,0 +1,162 @@
+import os
+
+STEP_TASK = """
+task step {
+  input {
+    Array[String] ins
+  }
+
+  command <<<
+    echo ~{sep=" " ins}
+  >>>
+
+  output {
+    String out = read_string(stdout())
+  }
+}
+"""
+
+SECTION_KINDS = ("scatter", "if")
+
+
+class SyntheticWorkflow:
+    """Generates a valid WDL workflow with a tunable number of calls, fan-in/fan-out,
+    scatter/if nesting, decl density and number of imported task files
+
+    fan_in is the number of earlier outputs each call reads, and with fan_out > 1 the
+    same output is read by fan_out consecutive calls. Every decl_every-th call is
+    followed by a decl passing its output on. With n_imports the step task is defined
+    in that many imported files, called round-robin."""
+
+    def __init__(
+        self,
+        n_calls,
+        fan_in=2,
+        section_size=20,
+        depth=1,
+        fan_out=1,
+        section_kinds=("scatter",),
+        decl_every=0,
+        n_imports=0,
+    ):
+        self.n_calls = n_calls
+        self.fan_in = fan_in
+        self.section_size = section_size
+        self.depth = depth
+        self.fan_out = fan_out
+        self.section_kinds = section_kinds
+        self.decl_every = decl_every
+        self.n_imports = n_imports
+        self.remaining = n_calls
+        self.counter = 0
+        self.sections = 0
+        self.decls = 0
+        self.lines = []
+
+    def task(self):
+        if not self.n_imports:
+            return "step"
+        return f"tasks{self.counter % self.n_imports}.step"
+
+    def add_call(self, indent, sources, anchor=None):
+        name = f"c{self.counter}"
+        task = self.task()
+        self.counter += 1
+        self.remaining -= 1
+        ins = sources[-self.fan_in :]
+        if anchor is not None and anchor not in ins:
+            ins = [anchor] + (sources[-(self.fan_in - 1) :] if self.fan_in > 1 else [])
+        self.lines.append(f"{indent}call {task} as {name} {{ input: ins = [{', '.join(ins) or 'seed'}] }}")
+        if self.decl_every and self.counter % self.decl_every == 0:
+            self.decls += 1
+            self.lines.append(f'{indent}String d{self.decls} = {name}.out + ""')
+            return f"d{self.decls}"
+        return f"{name}.out"
+
+    def add_gather(self, indent, ins):
+        name = f"c{self.counter}"
+        task = self.task()
+        self.counter += 1
+        self.lines.append(f"{indent}call {task} as {name} {{ input: ins = {ins} }}")
+        return f"{name}.out"
+
+    def add_section(self, level, indent, visible):
+        kind = self.section_kinds[self.sections % len(self.section_kinds)]
+        self.sections += 1
+        if kind == "scatter":
+            self.lines.append(f"{indent}scatter (i{self.sections} in range(2)) {{")
+        else:
+            condition = visible[-1] if visible else "seed"
+            self.lines.append(f'{indent}if ({condition} != "") {{')
+        last = self.add_body(level + 1, indent + "  ", list(visible))
+        self.lines.append(f"{indent}}}")
+        if last is None:
+            return None
+        # gather the section's output back into a single string at this level
+        if kind == "scatter":
+            return self.add_gather(indent, last)
+        return self.add_gather(indent, f"select_all([{last}])")
+
+    def add_body(self, level, indent, visible):
+        last = None
+        items = 0
+        anchor = None
+        anchor_uses = 0
+        while self.remaining > 0 and (level == 0 or items < self.section_size):
+            if level < self.depth and items % 2 == 1:
+                out = self.add_section(level, indent, visible)
+            else:
+                if self.fan_out > 1 and visible and (anchor is None or anchor_uses >= self.fan_out):
+                    anchor = visible[-1]
+                    anchor_uses = 0
+                anchor_uses += 1
+                out = self.add_call(indent, visible, anchor)
+            if out is not None:
+                visible.append(out)
+                last = out
+            items += 1
+        return last
+
+    def generate(self):
+        imports = [f'import "tasks_{ind}.wdl" as tasks{ind}' for ind in range(self.n_imports)]
+        self.lines = ["version 1.0", ""] + imports + ["workflow synthetic {", "  input {", "    String seed", "  }"]
+        self.add_body(0, "  ", [])
+        self.lines.append("}")
+        return "\n".join(self.lines) + "\n" + ("" if self.n_imports else STEP_TASK)
+
+    def files(self, name="synthetic.wdl"):
+        """{file name: WDL source} of the workflow and the task files it imports"""
+        files = {name: self.generate()}
+        for ind in range(self.n_imports):
+            files[f"tasks_{ind}.wdl"] = "version 1.0\n" + STEP_TASK
+        return files
+
+
+def generate_wdl(n_calls, **kwargs):
+    return SyntheticWorkflow(n_calls, **kwargs).generate()
+
+
+def write_wdl(directory, n_calls, name="synthetic.wdl", **kwargs):
+    """Writes a synthetic workflow and its imports into directory, returns the workflow path"""
+    for file_name, source in SyntheticWorkflow(n_calls, **kwargs).files(name).items():
+        with open(os.path.join(directory, file_name), "w") as wdl_file:
+            wdl_file.write(source)
+    return os.path.join(directory, name)
+
+
+def expressions_wdl(n_elements, nesting, n_calls=5):
+    """A workflow with an n_elements array literal input, and an if-then-else chain nesting deep"""
+    lines = ["version 1.0", "", "workflow expressions {", "  input {", "    String seed", "    Boolean flag = true", "  }"]
+    for ind in range(n_calls):
+        lines.append(f"  call step as c{ind} {{ input: ins = [seed] }}")
+    elements = []
+    for ind in range(n_elements):
+        kind = ind % 3
+        elements.append("seed" if kind == 0 else f"c{ind % n_calls}.out" if kind == 1 else f'"lit{ind}"')
+    lines.append(f"  call step as wide {{ input: ins = [{', '.join(elements)}] }}")
+    chain = "seed"
+    for ind in range(nesting):
+        chain = f"if flag then c{ind % n_calls}.out else ({chain})"
+    lines.append(f"  call step as deep {{ input: ins = [{chain}] }}")
+    lines.append("}")
+    return "\n".join(lines) + "\n" + STEP_TASK
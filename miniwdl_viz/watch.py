@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+
+from miniwdl_viz.disk_cache import atomic_write
+from miniwdl_viz.miniwdl_parser import parse_wdl
+from miniwdl_viz.wdl_loader import DocumentLoader
+
+
+class PollingWatcher:
+    """Detects file changes by polling stat results, so it needs no OS specific notification
+    backend. A change is only reported once the file has been quiet for debounce seconds,
+    so editors writing a file in several steps trigger a single update."""
+
+    def __init__(self, paths=(), debounce=0.1):
+        self.debounce = debounce
+        self.stats = {}
+        self.last_change = {}
+        self.set_paths(paths)
+
+    @staticmethod
+    def stat(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def set_paths(self, paths):
+        paths = set(paths)
+        for path in list(self.stats):
+            if path not in paths:
+                del self.stats[path]
+                self.last_change.pop(path, None)
+        for path in paths:
+            if path not in self.stats:
+                self.stats[path] = self.stat(path)
+
+    def poll(self, now=None):
+        """Returns the set of watched paths that changed and have since settled"""
+        now = time.monotonic() if now is None else now
+        for path, previous in self.stats.items():
+            current = self.stat(path)
+            if current != previous:
+                self.stats[path] = current
+                self.last_change[path] = now
+        settled = {path for path, changed in self.last_change.items() if now - changed >= self.debounce}
+        for path in settled:
+            del self.last_change[path]
+        return settled
+
+
+def document_paths(doc):
+    """Absolute paths of a document and everything it transitively imports"""
+    paths = set()
+    pending = [doc]
+    while pending:
+        doc = pending.pop()
+        if doc.pos.abspath in paths:
+            continue
+        paths.add(doc.pos.abspath)
+        pending.extend(imp.doc for imp in doc.imports if imp.doc)
+    return paths
+
+
+class WorkflowWatcher:
+    """Keeps a workflow's documents in memory and regenerates outputs when the workflow or
+    its imports change. Only changed documents (and the documents importing them) are
+    re-parsed, and output files are only rewritten when their content differs. The documents
+    are kept in memory, so the graph cache isn't used.
+
+    render is called with the MiniWDLParser and returns {output path: text or bytes}."""
+
+    def __init__(self, wdl_file, render, loader=None, debounce=0.1, subworkflow_depth=0, structural=False):
+        self.wdl_file = wdl_file
+        self.subworkflow_depth = subworkflow_depth
+        self.structural = structural
+        self.render = render
+        self.loader = loader or DocumentLoader()
+        self.watcher = PollingWatcher([os.path.abspath(wdl_file)], debounce=debounce)
+        self.written = {}
+
+    def update(self):
+        """Re-parses and rewrites changed outputs, returning the paths written"""
+        parser = parse_wdl(self.wdl_file, loader=self.loader, subworkflow_depth=self.subworkflow_depth, structural=self.structural)
+        self.watcher.set_paths(document_paths(parser.wdl_doc))
+
+        written = []
+        for path, text in self.render(parser).items():
+            if self.written.get(path) == text:
+                continue
+            data = text if isinstance(text, bytes) else text.encode()
+            if path not in self.written and os.path.exists(path):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        self.written[path] = text
+                        continue
+            atomic_write(path, data)
+            self.written[path] = text
+            written.append(path)
+        return written
+
+    def poll_once(self, now=None):
+        """Updates if any watched file changed, returning the paths written"""
+        if not self.watcher.poll(now):
+            return []
+        return self.update()
+
+    def run(self, interval=0.05):
+        self.report(self.safe_update)
+        while True:
+            time.sleep(interval)
+            if self.watcher.poll():
+                self.report(self.safe_update)
+
+    def safe_update(self):
+        try:
+            return self.update()
+        except Exception as exn:
+            # keep watching, the next save will probably fix it
+            print(f"Failed to parse {self.wdl_file}: {exn}", file=sys.stderr)
+            return []
+
+    def report(self, update):
+        start = time.perf_counter()
+        written = update()
+        for path in written:
+            print(f"Wrote {path} in {(time.perf_counter() - start) * 1000:.0f}ms", file=sys.stderr)
@@ -0,0 +1,402 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+import WDL
+
+from miniwdl_viz.batch import find_wdl_files
+from miniwdl_viz.graph_cache import import_candidates
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+from miniwdl_viz.profiler import stage
+from miniwdl_viz.structural_parser import left_name
+
+# Bump whenever the schema or what's recorded for a document changes, older indexes are rebuilt
+INDEX_VERSION = "2"
+DEFAULT_INDEX = "wdl_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS imports (document_id INTEGER NOT NULL, namespace TEXT NOT NULL, uri TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS callables (id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, name TEXT NOT NULL, kind TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS signatures (callable_id INTEGER NOT NULL, direction TEXT NOT NULL, name TEXT NOT NULL, type TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS calls (document_id INTEGER NOT NULL, workflow TEXT NOT NULL, call TEXT NOT NULL, namespace TEXT NOT NULL, callee TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS call_outputs (document_id INTEGER NOT NULL, call TEXT NOT NULL, output TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS imports_document ON imports (document_id, namespace);
+CREATE INDEX IF NOT EXISTS callables_name ON callables (name);
+CREATE INDEX IF NOT EXISTS callables_document ON callables (document_id);
+CREATE INDEX IF NOT EXISTS signatures_callable ON signatures (callable_id);
+CREATE INDEX IF NOT EXISTS calls_callee ON calls (callee);
+CREATE INDEX IF NOT EXISTS calls_document ON calls (document_id);
+CREATE INDEX IF NOT EXISTS call_outputs_call ON call_outputs (document_id, call);
+"""
+DOCUMENT_TABLES = ("imports", "calls", "call_outputs")
+TABLES = ("meta", "documents", "callables", "signatures") + DOCUMENT_TABLES
+
+
+def file_digest(path):
+    with open(path, "rb") as wdl_file:
+        return hashlib.sha256(wdl_file.read()).hexdigest()
+
+
+def iter_tree(node):
+    """Every node of a syntax tree below node, depth first in source order"""
+    stack = list(node.children)[::-1]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(list(node.children)[::-1])
+
+
+def declared_inputs(callable):
+    """Input decls of a task or workflow, which draft-2 documents leave unmarked"""
+    if callable.inputs is not None:
+        return callable.inputs
+    decls = callable.postinputs if isinstance(callable, WDL.Task) else callable.body
+    return [decl for decl in decls if isinstance(decl, WDL.Decl) and decl.expr is None]
+
+
+def signature(callable):
+    """(inputs, outputs) of a task or workflow, as recorded for a workflow by MiniWDLParser"""
+    parser = MiniWDLParser(None)
+    parser.parse_inputs(declared_inputs(callable))
+    parser.parse_outputs(callable.outputs)
+    return parser.inputs, parser.outputs
+
+
+def used_outputs(workflow, call_names):
+    """(call name, output name) of every call output the workflow's expressions refer to.
+    Before typechecking call.output is a Get of the member around a Get of the call's name."""
+    used = set()
+    for node in iter_tree(workflow):
+        if not (isinstance(node, WDL.Expr.Get) and node.member and isinstance(node.expr, WDL.Expr.Get)):
+            continue
+        name = node.expr.expr
+        if node.expr.member is None and left_name(name) in call_names:
+            used.add((name.name, node.member))
+    return sorted(used)
+
+
+def read_document(path):
+    """What the index records of one WDL file, from its syntax alone, so a document is read
+    without loading or typechecking its imports. Imports are recorded as written."""
+    with open(path) as wdl_file:
+        source_text = wdl_file.read()
+    doc = WDL.parse_document(source_text, uri=path)
+    record = {
+        "imports": [(imp.namespace, imp.uri) for imp in doc.imports],
+        "callables": [],
+        "calls": [],
+        "call_outputs": [],
+    }
+    for task in doc.tasks:
+        record["callables"].append((task.name, "task") + signature(task))
+    workflow = doc.workflow
+    if workflow is not None:
+        record["callables"].append((workflow.name, "workflow") + signature(workflow))
+        calls = [node for node in iter_tree(workflow) if isinstance(node, WDL.Call)]
+        for call in calls:
+            record["calls"].append((workflow.name, call.name, ".".join(call.callee_id[:-1]), call.callee_id[-1]))
+        record["call_outputs"] = used_outputs(workflow, {call.name for call in calls})
+    return record
+
+
+class WdlIndex:
+    """SQLite index of the tasks and workflows in a tree of WDL files, the calls between
+    them and the call outputs each workflow uses.
+
+    Each document is recorded from its own syntax tree, so documents are indexed
+    independently and a rebuild only re-reads files whose size or mtime changed, and only
+    re-parses those whose content hash did. Imports are only resolved when queried, against
+    the documents indexed then and the import path of the last build, so calls follow
+    imported files that were added, moved or removed, and changes to the import path."""
+
+    def __init__(self, path=DEFAULT_INDEX, import_path=None):
+        self.path = path
+        # None when only querying, which uses the import path stored by the last build
+        self.import_path = None if import_path is None else [os.path.abspath(directory) for directory in import_path]
+        self.connection = sqlite3.connect(path)
+        self.stats = {}
+        self.create_schema()
+
+    def close(self):
+        self.connection.close()
+
+    def create_schema(self):
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is not None and row[0] == INDEX_VERSION:
+                return
+            # the tables of older versions can have other columns
+            for table in TABLES:
+                self.connection.execute(f"DROP TABLE {table}")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute("INSERT INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+
+    def forget(self, document_id):
+        for table in DOCUMENT_TABLES:
+            self.connection.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+        self.connection.execute(
+            "DELETE FROM signatures WHERE callable_id IN (SELECT id FROM callables WHERE document_id = ?)", (document_id,)
+        )
+        self.connection.execute("DELETE FROM callables WHERE document_id = ?", (document_id,))
+
+    def record(self, document_id, record):
+        execute = self.connection.execute
+        executemany = self.connection.executemany
+        executemany("INSERT INTO imports VALUES (?, ?, ?)", [(document_id,) + imp for imp in record["imports"]])
+        for name, kind, inputs, outputs in record["callables"]:
+            callable_id = execute("INSERT INTO callables (document_id, name, kind) VALUES (?, ?, ?)", (document_id, name, kind)).lastrowid
+            executemany(
+                "INSERT INTO signatures VALUES (?, ?, ?, ?)",
+                [(callable_id, "input", io["name"], io["workflow_data_type"]) for io in inputs]
+                + [(callable_id, "output", io["name"], io["workflow_data_type"]) for io in outputs],
+            )
+        executemany("INSERT INTO calls VALUES (?, ?, ?, ?, ?)", [(document_id,) + call for call in record["calls"]])
+        executemany("INSERT INTO call_outputs VALUES (?, ?, ?)", [(document_id,) + use for use in record["call_outputs"]])
+
+    def update(self, path, known):
+        """Re-indexes path if it changed since known (id, size, mtime_ns, digest), returning
+        whether it was parsed"""
+        file_stat = os.stat(path)
+        if known is not None and known[1:3] == (file_stat.st_size, file_stat.st_mtime_ns):
+            return False
+        digest = file_digest(path)
+        if known is not None and known[3] == digest:
+            # touched but unchanged, only the stat is refreshed
+            self.connection.execute(
+                "UPDATE documents SET size = ?, mtime_ns = ? WHERE id = ?", (file_stat.st_size, file_stat.st_mtime_ns, known[0])
+            )
+            return False
+
+        record, error = None, None
+        try:
+            with stage("index.parse", file=path):
+                record = read_document(path)
+        except Exception as exn:
+            error = f"{type(exn).__name__}: {exn}"
+        row = (file_stat.st_size, file_stat.st_mtime_ns, digest, error)
+        if known is None:
+            document_id = self.connection.execute(
+                "INSERT INTO documents (size, mtime_ns, digest, error, path) VALUES (?, ?, ?, ?, ?)", row + (path,)
+            ).lastrowid
+        else:
+            document_id = known[0]
+            self.forget(document_id)
+            self.connection.execute("UPDATE documents SET size = ?, mtime_ns = ?, digest = ?, error = ? WHERE id = ?", row + (document_id,))
+        if record is not None:
+            self.record(document_id, record)
+        return True
+
+    def build(self, inputs):
+        """Indexes the WDL files under inputs (files, directories or glob patterns), and
+        drops documents under them that no longer exist"""
+        wdl_files = find_wdl_files(inputs)
+        roots = [os.path.join(os.path.abspath(input), "") for input in inputs if os.path.isdir(input)]
+        listed = {os.path.abspath(input) for input in inputs}
+        known = {row[0]: row[1:] for row in self.connection.execute("SELECT path, id, size, mtime_ns, digest FROM documents")}
+        self.stats = {"files": len(wdl_files), "parsed": 0, "unchanged": 0, "removed": 0}
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('import_path', ?)", (json.dumps(self.import_path or []),))
+            for path in wdl_files:
+                if self.update(path, known.pop(path, None)):
+                    self.stats["parsed"] += 1
+                else:
+                    self.stats["unchanged"] += 1
+            for path, row in known.items():
+                if path in listed or any(path.startswith(root) for root in roots):
+                    self.forget(row[0])
+                    self.connection.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                    self.stats["removed"] += 1
+        self.stats["failed"] = self.connection.execute("SELECT count(*) FROM documents WHERE error IS NOT NULL").fetchone()[0]
+        return self.stats
+
+    def report(self):
+        stats = self.stats
+        return (
+            f"{stats['files']} files, {stats['parsed']} parsed, {stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed, {stats['failed']} failed"
+        )
+
+    def errors(self):
+        return self.connection.execute("SELECT path, error FROM documents WHERE error IS NOT NULL ORDER BY path").fetchall()
+
+    def query_import_path(self):
+        if self.import_path is not None:
+            return self.import_path
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'import_path'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    def resolve_imports(self, path):
+        """namespace -> path of the indexed document each import of path resolves to, the
+        first of the paths miniwdl would try that is indexed"""
+        import_path = self.query_import_path()
+        resolved = {}
+        rows = self.connection.execute(
+            "SELECT namespace, uri FROM imports JOIN documents ON documents.id = document_id WHERE documents.path = ?", (path,)
+        ).fetchall()
+        for namespace, uri in rows:
+            for candidate in import_candidates(uri, path, import_path):
+                if self.connection.execute("SELECT 1 FROM documents WHERE path = ?", (candidate,)).fetchone():
+                    resolved[namespace] = candidate
+                    break
+        return resolved
+
+    def resolve(self, path, namespace, imports):
+        """Path of the document a call in path to namespace.callee is to, memoizing the
+        resolved imports of each document in imports"""
+        for name in namespace.split(".") if namespace else []:
+            if path not in imports:
+                imports[path] = self.resolve_imports(path)
+            path = imports[path].get(name)
+            if path is None:
+                return None
+        return path
+
+    def callables(self, name, path=None):
+        """The tasks and workflows named name, in path if given, with their signatures"""
+        query = "SELECT callables.id, documents.path, callables.kind FROM callables JOIN documents ON documents.id = document_id WHERE name = ?"
+        params = (name,)
+        if path is not None:
+            query += " AND documents.path = ?"
+            params += (os.path.abspath(path),)
+        found = []
+        for callable_id, callable_path, kind in self.connection.execute(query + " ORDER BY documents.path", params).fetchall():
+            callable = {"path": callable_path, "name": name, "kind": kind, "inputs": [], "outputs": []}
+            for direction, io_name, io_type in self.connection.execute(
+                "SELECT direction, name, type FROM signatures WHERE callable_id = ? ORDER BY rowid", (callable_id,)
+            ):
+                callable[f"{direction}s"].append({"name": io_name, "type": io_type})
+            found.append(callable)
+        return found
+
+    def callers(self, name, path=None, imports=None):
+        """The calls to the task or workflow name, defined in path if given, as dicts of the
+        calling document, workflow and call, and the called document"""
+        imports = {} if imports is None else imports
+        path = None if path is None else os.path.abspath(path)
+        found = []
+        rows = self.connection.execute(
+            "SELECT documents.id, documents.path, workflow, call, namespace FROM calls JOIN documents ON documents.id = document_id "
+            "WHERE callee = ? ORDER BY documents.path, calls.rowid",
+            (name,),
+        ).fetchall()
+        for document_id, caller_path, workflow, call, namespace in rows:
+            callee_path = self.resolve(caller_path, namespace, imports)
+            if path is not None and callee_path != path:
+                continue
+            outputs = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT output FROM call_outputs WHERE document_id = ? AND call = ? ORDER BY output", (document_id, call)
+                )
+            ]
+            found.append({
+                "path": caller_path,
+                "workflow": workflow,
+                "call": call,
+                "callee_path": callee_path,
+                "outputs_used": outputs,
+            })
+        return found
+
+    def impact(self, name, path=None, outputs=None):
+        """Calls affected by changing the task or workflow name: its callers (only those
+        using one of outputs, if given), then the callers of the affected workflows, and so
+        on. Each caller has the number of calls between it and the change as depth."""
+        imports = {}
+        affected = []
+        pending = [(name, path, outputs, 1)]
+        seen = set()
+        while pending:
+            name, path, outputs, depth = pending.pop(0)
+            for caller in self.callers(name, path, imports):
+                if outputs and not set(outputs) & set(caller["outputs_used"]):
+                    continue
+                affected.append(dict(caller, depth=depth))
+                key = (caller["path"], caller["workflow"])
+                if key not in seen:
+                    seen.add(key)
+                    pending.append((caller["workflow"], caller["path"], None, depth + 1))
+        return affected
+
+
+def add_index_arguments(arg_parser):
+    arg_parser.add_argument("--index", default=DEFAULT_INDEX, help=f"SQLite index file (default: {DEFAULT_INDEX})")
+
+
+def add_query_arguments(arg_parser):
+    add_index_arguments(arg_parser)
+    arg_parser.add_argument("name", help="task or workflow name")
+    arg_parser.add_argument("--file", default=None, help="only the task or workflow defined in this WDL file")
+    arg_parser.add_argument("-j", "--json-output", action='store_true', default=False, help="print json instead of one line per call")
+
+
+def format_caller(caller):
+    line = f"{caller['path']}: {caller['workflow']}.{caller['call']}"
+    if caller["outputs_used"]:
+        line += f" (uses {', '.join(caller['outputs_used'])})"
+    return line
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog="wdl_index",
+        description="Indexes the tasks, workflows and calls of a tree of WDL files, and answers which workflows a change affects",
+    )
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="index WDL files, only re-parsing those that changed since the last build")
+    build_parser.add_argument("inputs", nargs="+", help="WDL files, directories or glob patterns")
+    build_parser.add_argument("-I", "--import-path", action="append", default=[], help="directory to search for imports")
+    add_index_arguments(build_parser)
+
+    callers_parser = subparsers.add_parser("callers", help="list the calls to a task or workflow")
+    add_query_arguments(callers_parser)
+
+    impact_parser = subparsers.add_parser("impact", help="list the calls and workflows affected by changing a task or workflow")
+    add_query_arguments(impact_parser)
+    impact_parser.add_argument("--output", action="append", default=[], help="only count callers using this output of it, can be repeated")
+
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "build":
+        index = WdlIndex(args.index, import_path=args.import_path)
+        index.build(args.inputs)
+        for path, error in index.errors():
+            print(f"FAILED {path}: {error}", file=sys.stderr)
+        print(f"Indexed {index.report()}", file=sys.stderr)
+        index.close()
+        return
+
+    if not os.path.exists(args.index):
+        arg_parser.error(f"no index {args.index}, run 'wdl_index build' first")
+    index = WdlIndex(args.index)
+    if not index.callables(args.name, args.file):
+        arg_parser.error(f"no task or workflow {args.name} in the index")
+    if args.command == "callers":
+        found = index.callers(args.name, args.file)
+    else:
+        found = index.impact(args.name, args.file, outputs=args.output)
+    index.close()
+
+    if args.json_output:
+        print(json.dumps(found, indent=4))
+        return
+    for caller in found:
+        print(format_caller(caller) if args.command == "callers" else f"{caller['depth']} {format_caller(caller)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+import WDL
+
+from miniwdl_viz.profiler import stage
+
+# typechecked documents kept per loader, imported ones included, the least recently used
+# are dropped first
+DEFAULT_MAX_DOCUMENTS = 64
+
+
+def source_digest(source_text):
+    return hashlib.sha256(source_text.encode()).hexdigest()
+
+
+class DocumentLoader:
+    """Loads WDL documents like WDL.load, keeping each typechecked document (imported ones
+    included) by the absolute path it was read from. A kept document is returned again while
+    its source and the documents it imports are unchanged, so a task library imported by
+    many workflows is parsed and typechecked once, and after an edit only the changed
+    documents and the documents importing them are loaded again."""
+
+    def __init__(self, path=None, check_quant=True, import_max_depth=10, max_documents=DEFAULT_MAX_DOCUMENTS):
+        self.path = list(path) if path else []
+        self.check_quant = check_quant
+        self.import_max_depth = import_max_depth
+        self.max_documents = max_documents
+        # abspath -> (source digest, typechecked document), least recently used first
+        self.documents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, uri):
+        # private event loop, so this works on any thread and leaves the caller's loop alone
+        loop = asyncio.new_event_loop()
+        try:
+            doc = loop.run_until_complete(self.load_async(uri))
+        finally:
+            loop.close()
+        WDL.Walker.SetParents()(doc)
+        return doc
+
+    async def load_async(self, uri, importer=None, import_max_depth=None):
+        if import_max_depth is None:
+            import_max_depth = self.import_max_depth
+        uri = uri if uri != "-" else "/dev/stdin"
+        with stage("wdl.read", file=uri):
+            read_rslt = await WDL.read_source_default(uri, self.path, importer)
+        digest = source_digest(read_rslt.source_text)
+
+        kept = self.kept(read_rslt.abspath, digest)
+        if kept is not None:
+            subdocs = await self.load_imports(kept, import_max_depth)
+            if all(subdoc is imp.doc for subdoc, imp in zip(subdocs, kept.imports)):
+                return kept
+
+        try:
+            with stage("wdl.parse", file=uri):
+                doc = WDL.parse_document(read_rslt.source_text, uri=uri)
+        except Exception as exn:
+            setattr(exn, "source_text", read_rslt.source_text)
+            raise
+        # parse_document only records the uri, and imports are resolved relative to abspath
+        doc.pos = doc.pos._replace(abspath=read_rslt.abspath)
+
+        with stage("wdl.imports", file=uri):
+            subdocs = await self.load_imports(doc, import_max_depth)
+        for i, subdoc in enumerate(subdocs):
+            imp = doc.imports[i]
+            doc.imports[i] = WDL.Tree.DocImport(
+                pos=imp.pos,
+                uri=imp.uri,
+                namespace=imp.namespace,
+                aliases=imp.aliases,
+                doc=subdoc,
+            )
+        with stage("wdl.typecheck", file=uri):
+            self.typecheck(doc, read_rslt.source_text)
+
+        if read_rslt.abspath != "/dev/stdin":
+            self.keep(read_rslt.abspath, digest, doc)
+        return doc
+
+    async def load_imports(self, doc, import_max_depth):
+        subdocs = []
+        for imp in doc.imports:
+            if import_max_depth <= 1:
+                raise WDL.Error.ImportError(
+                    imp.pos, imp.uri, "exceeded import_max_depth; circular imports?"
+                )
+            try:
+                subdocs.append(
+                    await self.load_async(
+                        imp.uri, importer=doc, import_max_depth=import_max_depth - 1
+                    )
+                )
+            except Exception as exn:
+                raise WDL.Error.ImportError(imp.pos, imp.uri) from exn
+        return subdocs
+
+    def kept(self, abspath, digest):
+        with self.lock:
+            cached = self.documents.get(abspath)
+            if cached is None or cached[0] != digest:
+                return None
+            self.documents.move_to_end(abspath)
+            return cached[1]
+
+    def keep(self, abspath, digest, doc):
+        with self.lock:
+            self.documents[abspath] = (digest, doc)
+            self.documents.move_to_end(abspath)
+            while len(self.documents) > self.max_documents:
+                self.documents.popitem(last=False)
+
+    def typecheck(self, doc, source_text):
+        try:
+            doc.typecheck(check_quant=self.check_quant)
+        except WDL.Error.ValidationError as exn:
+            exn.source_text = source_text
+            exn.declared_wdl_version = doc.wdl_version
+            raise
+        except WDL.Error.MultipleValidationErrors as multi:
+            for exn in multi.exceptions:
+                if not exn.source_text:
+                    exn.source_text = source_text
+                    exn.declared_wdl_version = doc.wdl_version
+            multi.source_text = source_text
+            multi.declared_wdl_version = doc.wdl_version
+            raise multi
@@ -0,0 +1,79 @@
+class WorkflowGraph:
+    """Indexed store of the nodes and edges parsed from a workflow"""
+
+    def __init__(self, nodes=None, edges=None):
+        self.nodes = []
+        self.edges = []
+        self.node_map = {}
+        self.section_children = {}
+        self.out_edges = {}
+        self.in_edges = {}
+        # node name -> node ids and node id -> position in nodes, built on first use since
+        # only slicing needs them
+        self.name_index = None
+        self.position_index = None
+
+        for node in nodes or []:
+            self.add_node(node)
+        for edge in edges or []:
+            self.add_edge(edge)
+
+    def __contains__(self, node_id):
+        return node_id in self.node_map
+
+    def add_node(self, node):
+        self.nodes.append(node)
+        self.node_map[node["id"]] = node
+        self.section_children.setdefault(node["section"], []).append(node)
+        self.name_index = self.position_index = None
+
+    def add_edge(self, edge):
+        self.edges.append(edge)
+        self.out_edges.setdefault(edge["node_from"], []).append(edge)
+        self.in_edges.setdefault(edge["node_to"], []).append(edge)
+
+    def get_node(self, node_id):
+        return self.node_map[node_id]
+
+    def children(self, section):
+        return self.section_children.get(section, [])
+
+    def edges_from(self, node_id):
+        return self.out_edges.get(node_id, [])
+
+    def edges_to(self, node_id):
+        return self.in_edges.get(node_id, [])
+
+    def nodes_named(self, name):
+        if self.name_index is None:
+            self.name_index = {}
+            for node in self.nodes:
+                # tuples rather than lists, as nearly every name has one node
+                self.name_index[node["name"]] = self.name_index.get(node["name"], ()) + (node["id"],)
+        return self.name_index.get(name, ())
+
+    def position(self, node_id):
+        if self.position_index is None:
+            self.position_index = {node["id"]: ind for ind, node in enumerate(self.nodes)}
+        return self.position_index[node_id]
+
+    def reachable(self, node_id, upstream=False, depth=None):
+        """Nodes reachable from node_id along edges, or against them when upstream, mapped to
+        the number of edges on the shortest path. Virtual nodes like WorkflowInput end a path,
+        since everything would be downstream of them."""
+        adjacency, end = (self.in_edges, "node_from") if upstream else (self.out_edges, "node_to")
+        distances = {node_id: 0}
+        frontier = [node_id]
+        distance = 0
+        while frontier and (depth is None or distance < depth):
+            distance += 1
+            next_frontier = []
+            for current in frontier:
+                for edge in adjacency.get(current, []):
+                    neighbor = edge[end]
+                    if neighbor not in distances:
+                        distances[neighbor] = distance
+                        if neighbor in self.node_map:
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+        return distances
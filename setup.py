@@ -23,9 +23,15 @@ setup(
         "matplotlib",
         "miniwdl",
     ],
+    extras_require={
+        "msgpack": ["msgpack"],
+        "numpy": ["numpy"],
+    },
     entry_points={
         "console_scripts": ["miniwdl_parser = miniwdl_viz.miniwdl_parser:main", 
-                            "wdl_to_mermaid = miniwdl_viz.mermaid_wdl:main"
+                            "wdl_to_mermaid = miniwdl_viz.mermaid_wdl:main",
+                            "wdl_batch = miniwdl_viz.batch:main",
+                            "wdl_index = miniwdl_viz.wdl_index:main",
                             ],
     },
     packages=["miniwdl_viz"],
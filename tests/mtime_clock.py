@@ -0,0 +1,22 @@
+import os
+import pytest
+
+
+class MtimeClock:
+    """Moves the mtime of each touched path a further second ahead, so changes are visible
+    regardless of the filesystem's timestamp resolution"""
+
+    def __init__(self):
+        self.ticks = 0
+
+    def touch(self, path, content=None):
+        if content is not None:
+            path.write_text(content)
+        self.ticks += 1
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + self.ticks * 1_000_000_000))
+
+
+@pytest.fixture
+def mtime_clock():
+    return MtimeClock()
@@ -0,0 +1,29 @@
+from miniwdl_viz.batch import create_arg_parser, find_wdl_files, run_batch
+from os.path import dirname, realpath, join
+import shutil
+
+
+TEST_WDLS = join(dirname(realpath(__file__)), "test_wdls")
+
+
+class TestBatch:
+    def test_batch_mirrors_tree(self, tmp_path):
+        input_dir = tmp_path / "wdl"
+        (input_dir / "nested").mkdir(parents=True)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), input_dir)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), input_dir / "nested")
+        shutil.copy(join(TEST_WDLS, "imports.wdl"), input_dir / "nested")
+        (input_dir / "broken.wdl").write_text("version 1.0\nworkflow {")
+        (input_dir / "library.wdl").write_text('version 1.0\ntask hello {\n  command <<<\n    echo hello\n  >>>\n}\n')
+
+        args = create_arg_parser().parse_args([str(input_dir), "-d", str(tmp_path / "out"), "-p", "2"])
+        wdl_files = find_wdl_files([str(input_dir)])
+        failures = run_batch(wdl_files, str(input_dir), args)
+
+        assert len(wdl_files) == 5
+        assert list(failures) == [str(input_dir / "broken.wdl")]
+        # a task library has no workflow to draw
+        assert not list((tmp_path / "out").glob("library.*"))
+        for output in ["simple", "nested/simple", "nested/imports"]:
+            assert (tmp_path / "out" / f"{output}.yaml").exists()
+            assert (tmp_path / "out" / f"{output}.mmd").exists()
@@ -0,0 +1,115 @@
+from tests.test_miniwdl_parser import complex_wdl
+from miniwdl_viz.capacity import (
+    CapacityPlan,
+    call_resources,
+    capacity_main,
+    match_durations,
+    parse_disks,
+    parse_memory,
+    run_dir_durations,
+)
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+import json
+import os
+import pytest
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+def node(id, section="wf", type="call"):
+    return {"id": id, "name": id[len("call-"):] if id.startswith("call-") else id, "section": section, "type": type}
+
+
+def edge(node_from, node_to):
+    return {"node_from": node_from, "node_to": node_to, "workflow_ref_name": "x", "task_ref_name": "in", "edge_type": "input"}
+
+
+def branching_parser():
+    """a and b from the workflow inputs, both into c, and d scattered over c's output"""
+    nodes = [node("call-a"), node("call-b"), node("call-c"), node("scatter-L9C3-i", type="workflow_section"), node("call-d", section="scatter-L9C3-i")]
+    edges = [edge("WorkflowInput", "call-a"), edge("WorkflowInput", "call-b"), edge("call-a", "call-c"), edge("call-b", "call-c"), edge("call-c", "scatter-L9C3-i")]
+    return MiniWDLParser.from_dict({"name": "wf", "workflow_inputs": [], "workflow_outputs": [], "nodes": nodes, "edges": edges})
+
+
+class TestCapacity:
+    def test_parse_sizes(self):
+        assert parse_memory("3.5 GB") == 3_500_000_000
+        assert parse_memory("2 GiB") == 2 * 2**30
+        assert parse_memory(1024) == 1024
+        assert parse_memory("4G") == parse_memory("4 GB") == 4_000_000_000
+        assert parse_memory("1.5 TiB") == 3 * 2**39
+        assert parse_memory("2000") == 2000
+        for invalid in ["lots", "4 GiBs", "-1 GB", "G"]:
+            with pytest.raises(ValueError):
+                parse_memory(invalid)
+        assert parse_disks("local-disk 100 HDD") == 100
+        assert parse_disks("local-disk 10 SSD, /mnt/data 50.5 HDD") == 60.5
+        with pytest.raises(ValueError):
+            parse_disks("local-disk lots")
+
+    def test_call_resources(self, complex_wdl):
+        resources = call_resources(complex_wdl, default_cpu=4)
+        assert resources["call-ImportGVCFs"] == {
+            "cpu": 2.0, "memory_bytes": 7_000_000_000, "disk_gb": 0.0, "task": "ImportGVCFs", "from_runtime": True,
+        }
+        # sets a constant memory, but no cpu
+        assert resources["call-DynamicallyCombineIntervals"]["cpu"] == 4.0
+        assert call_resources(branching_parser())["call-a"]["from_runtime"] is False
+
+    def test_unit_steps(self, complex_wdl):
+        plan = CapacityPlan(complex_wdl, call_resources(complex_wdl), scatter_sizes={"scatter-L120C3-idx": 24})
+        assert plan.unit == "calls"
+        calls = [node_id for node_id in plan.critical_path if node_id in plan.resources]
+        assert calls[:3] == ["call-DynamicallyCombineIntervals", "call-ImportGVCFs", "call-GenotypeGVCFs"]
+        assert plan.finish[plan.critical_path[-1]] == len(calls) == 11
+        assert plan.stages[1] == {
+            "stage": 2, "calls": ["call-ImportGVCFs"], "width": 24, "cpu": 48.0, "memory_bytes": 24 * 7_000_000_000, "disk_gb": 0.0,
+        }
+        assert plan.peak["width"] == max(stage["width"] for stage in plan.stages)
+        with pytest.raises(ValueError, match="no section scatter-nope"):
+            CapacityPlan(complex_wdl, call_resources(complex_wdl), scatter_sizes={"scatter-nope": 2})
+        with pytest.raises(ValueError, match="only scatter sections have a size, not if-L195C3"):
+            CapacityPlan(complex_wdl, call_resources(complex_wdl), scatter_sizes={"if-L195C3": 2})
+
+    def test_durations(self):
+        parser = branching_parser()
+        resources = call_resources(parser)
+        durations = match_durations({"a": 10, "call-b": 30, "unknown": 5}, resources)
+        assert durations == {"call-a": 10.0, "call-b": 30.0}
+        plan = CapacityPlan(parser, resources, durations=durations, default_scatter_size=3)
+        assert plan.critical_path == ["call-b", "call-c", "scatter-L9C3-i", "call-d"]
+        # c and d take the average of the known durations
+        assert plan.finish["call-d"] == 30 + 20 + 20
+        assert plan.peak == {"width": 3, "cpu": 3.0, "memory_bytes": 3 * 2 * 2**30, "disk_gb": 0.0}
+        assert plan.to_dict()["calls"]["call-d"]["multiplicity"] == 3
+
+    def test_run_dir_durations(self, tmp_path):
+        for job, seconds in [("call-a", 100), ("call-d-0", 10), ("call-d-1", 30), ("call-c", None)]:
+            job_dir = tmp_path / job
+            job_dir.mkdir()
+            (job_dir / "inputs.json").write_text("{}")
+            os.utime(job_dir / "inputs.json", (1000, 1000))
+            if seconds is not None:
+                (job_dir / "outputs.json").write_text("{}")
+                os.utime(job_dir / "outputs.json", (1000 + seconds, 1000 + seconds))
+        (tmp_path / "workflow.log").write_text("")
+        assert run_dir_durations([str(tmp_path)]) == {"call-a": 100.0, "call-d": 20.0}
+
+    def test_cli(self, tmp_path):
+        durations = tmp_path / "durations.json"
+        durations.write_text(json.dumps({"ImportGVCFs": 3600, "SNPsVariantRecalibratorCreateModel": 7200}))
+        capacity_main([
+            os.path.join(TEST_WDLS, "joint-discovery-gatk4-version.wdl"),
+            "--durations", str(durations),
+            "--scatter-size", "scatter-L120C3-idx=24",
+            "-o", str(tmp_path / "capacity.mmd"),
+            "--json-output", str(tmp_path / "capacity.json"),
+        ])
+        report = json.loads((tmp_path / "capacity.json").read_text())
+        assert report["unit"] == "seconds"
+        assert report["scatter_sizes"]["scatter-L120C3-idx"] == 24
+        assert "call-SNPsVariantRecalibratorCreateModel" in report["critical_path"]["nodes"]
+        text = (tmp_path / "capacity.mmd").read_text()
+        assert "classDef critical" in text
+        assert 'call-ImportGVCFs{{"ImportGVCFs"}}:::critical' in text
+        assert "linkStyle" in text
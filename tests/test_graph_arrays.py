@@ -0,0 +1,97 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from miniwdl_viz.graph_arrays import GraphArrays, NODE_TYPES  # noqa: E402
+
+
+def node(id, section="wf"):
+    return {"id": id, "name": id, "section": section, "type": "call"}
+
+
+def edge(node_from, node_to, ref="out"):
+    return {"node_from": node_from, "node_to": node_to, "workflow_ref_name": f"{node_from}.{ref}", "task_ref_name": "ins", "edge_type": "input"}
+
+
+def diamond():
+    """a -> b, a -> c, b -> d, c -> d, d -> e, with a from the workflow inputs"""
+    nodes = [node(name) for name in "abcde"]
+    edges = [edge("WorkflowInput", "a"), edge("a", "b"), edge("a", "c"), edge("c", "d"), edge("b", "d"), edge("d", "e")]
+    return GraphArrays.from_dict({"name": "wf", "workflow_inputs": [], "workflow_outputs": [], "nodes": nodes, "edges": edges})
+
+
+class TestGraphArrays:
+    def test_arrays(self, complex_wdl):
+        graph_arrays = GraphArrays.from_parser(complex_wdl)
+        assert graph_arrays.n_nodes == len(complex_wdl.nodes) + 2
+        strings = graph_arrays.strings
+        ind = graph_arrays.node_index("call-ImportGVCFs")
+        assert strings[graph_arrays.node_ids[ind]] == "call-ImportGVCFs"
+        assert NODE_TYPES[graph_arrays.node_types[ind]] == "call"
+        assert graph_arrays.node_sections[ind] == graph_arrays.node_index("scatter-L120C3-idx")
+        assert graph_arrays.node_sections[graph_arrays.node_index("scatter-L120C3-idx")] == -1
+
+        # each node's outgoing edges are one CSR row
+        row = slice(*graph_arrays.indptr[ind : ind + 2])
+        assert [strings[graph_arrays.node_ids[target]] for target in graph_arrays.indices[row]] == [
+            edge["node_to"] for edge in complex_wdl.graph.edges_from("call-ImportGVCFs")
+        ]
+        assert graph_arrays.to_dict() == complex_wdl.to_dict()
+
+    def test_degree(self, complex_wdl):
+        graph_arrays = GraphArrays.from_parser(complex_wdl)
+        ids = [graph_arrays.strings[ind] for ind in graph_arrays.node_ids]
+        assert graph_arrays.out_degree().tolist() == [len(complex_wdl.graph.edges_from(node_id)) for node_id in ids]
+        assert graph_arrays.in_degree().tolist() == [len(complex_wdl.graph.edges_to(node_id)) for node_id in ids]
+
+    def test_levels(self):
+        graph_arrays = diamond()
+        # a b c d e WorkflowInput HardcodedVariable
+        assert graph_arrays.topological_levels().tolist() == [1, 2, 2, 3, 4, 0, 0]
+
+        cyclic = graph_arrays.to_dict()
+        cyclic["edges"].append(edge("e", "b"))
+        assert GraphArrays.from_dict(cyclic).topological_levels().tolist() == [1, -1, 2, -1, -1, 0, 0]
+
+    def test_reachable(self, complex_wdl):
+        graph_arrays = diamond()
+        assert graph_arrays.reachable([graph_arrays.node_index("b")]).tolist() == [-1, 0, -1, 1, 2, -1, -1]
+        assert graph_arrays.reachable([3], upstream=True, depth=2).tolist() == [2, 1, 1, 0, -1, -1, -1]
+
+        graph_arrays = GraphArrays.from_parser(complex_wdl)
+        ids = [graph_arrays.strings[ind] for ind in graph_arrays.node_ids]
+        for upstream in [False, True]:
+            distances = graph_arrays.reachable([graph_arrays.node_index("call-GenotypeGVCFs")], upstream=upstream)
+            assert {ids[ind]: distances[ind] for ind in np.flatnonzero(distances >= 0)} == complex_wdl.graph.reachable(
+                "call-GenotypeGVCFs", upstream=upstream
+            )
+
+    def test_save_load(self, complex_wdl, tmp_path):
+        path = str(tmp_path / "complex.npz")
+        GraphArrays.from_parser(complex_wdl).save(path)
+        mapped = GraphArrays.load(path)
+        assert isinstance(mapped.indices.base, np.memmap)
+        assert not mapped.indices.flags.writeable
+        assert mapped.to_dict() == GraphArrays.load(path, mmap=False).to_dict() == complex_wdl.to_dict()
+
+    def test_concatenate(self, simple_wdl, complex_wdl):
+        graphs = [GraphArrays.from_parser(simple_wdl), diamond(), GraphArrays.from_parser(complex_wdl)]
+        combined, node_offsets = GraphArrays.concatenate(graphs)
+        assert node_offsets.tolist() == [0, graphs[0].n_nodes, graphs[0].n_nodes + 7, combined.n_nodes]
+        levels = combined.topological_levels()
+        for graph, start, end in zip(graphs, node_offsets, node_offsets[1:]):
+            assert levels[start:end].tolist() == graph.topological_levels().tolist()
+            assert combined.out_degree()[start:end].tolist() == graph.out_degree().tolist()
+            assert [combined.strings[ind] for ind in combined.node_ids[start:end]] == [graph.strings[ind] for ind in graph.node_ids]
+        assert combined.reachable([node_offsets[1]]).tolist()[node_offsets[1] : node_offsets[2]] == diamond().reachable([0]).tolist()
+
+    def test_render(self, complex_wdl, tmp_path):
+        from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parsed_wdl_to_mermaid
+
+        path = str(tmp_path / "complex.npz")
+        GraphArrays.from_parser(complex_wdl).save(path)
+        loaded = GraphArrays.load(path).to_parser()
+        assert isinstance(loaded, MiniWDLParser)
+        assert parsed_wdl_to_mermaid(loaded, ParsedWDLToMermaid()) == parsed_wdl_to_mermaid(complex_wdl, ParsedWDLToMermaid())
@@ -0,0 +1,71 @@
+from miniwdl_viz.disk_cache import DiskCache
+from miniwdl_viz.graph_cache import GraphCache, add_cache_arguments, create_graph_cache
+from miniwdl_viz.miniwdl_parser import parse_wdl
+from os.path import dirname, realpath, join
+import argparse
+import os
+import shutil
+
+
+TEST_WDLS = join(dirname(realpath(__file__)), "test_wdls")
+
+
+class TestGraphCache:
+    def test_cache_hit_matches_parse(self, tmp_path):
+        cache = GraphCache(cache_dir=str(tmp_path))
+        wdl_file = join(TEST_WDLS, "joint-discovery-gatk4-version.wdl")
+        parsed = parse_wdl(wdl_file, cache=cache)
+        cached = parse_wdl(wdl_file, cache=cache)
+
+        assert parsed.wdl_doc is not None
+        assert cached.wdl_doc is None
+        assert cached.to_dict() == parsed.to_dict()
+        assert len(cached.graph.children("scatter-L120C3-idx")) == 3
+
+    def test_key_covers_imports(self, tmp_path):
+        shutil.copy(join(TEST_WDLS, "imports.wdl"), tmp_path)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), tmp_path)
+        cache = GraphCache(cache_dir=str(tmp_path / "cache"))
+        key = cache.key(str(tmp_path / "imports.wdl"))
+
+        simple = tmp_path / "simple.wdl"
+        simple.write_text(simple.read_text().replace("echo world", "echo earth"))
+
+        assert cache.key(str(tmp_path / "imports.wdl")) != key
+        assert cache.key(str(tmp_path / "missing.wdl")) is None
+
+    def test_size_eviction(self, tmp_path):
+        disk_cache = DiskCache(str(tmp_path), max_size=250)
+        for ind, key in enumerate(["aa01", "bb02", "cc03"]):
+            disk_cache.put(key, b"x" * 100)
+            os.utime(disk_cache.entry_path(key), (ind, ind))
+            disk_cache.evict()
+
+        assert disk_cache.get("aa01") is None
+        assert disk_cache.get("bb02") == b"x" * 100
+        assert disk_cache.get("cc03") == b"x" * 100
+
+    def test_size_tracked_between_puts(self, tmp_path, monkeypatch):
+        disk_cache = DiskCache(str(tmp_path), max_size=250)
+        disk_cache.put("aa01", b"x" * 100)
+        scans = []
+        entries = disk_cache.entries
+        monkeypatch.setattr(disk_cache, "entries", lambda: scans.append(1) or entries())
+
+        disk_cache.put("aa01", b"x" * 120)
+        disk_cache.put("bb02", b"x" * 100)
+        assert scans == []
+        assert disk_cache.size == 220
+        # only going over max_size scans the directory, to evict
+        disk_cache.put("cc03", b"x" * 100)
+        assert scans == [1]
+        assert disk_cache.size == sum(size for _, size, _ in entries()) <= 250
+
+    def test_opt_in(self, tmp_path, monkeypatch):
+        arg_parser = argparse.ArgumentParser()
+        add_cache_arguments(arg_parser)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+
+        assert create_graph_cache(arg_parser.parse_args([])) is None
+        assert create_graph_cache(arg_parser.parse_args(["--cache"])).disk_cache.cache_dir == tmp_path / "xdg" / "miniwdl_viz" / "graphs"
+        assert create_graph_cache(arg_parser.parse_args(["--cache-dir", str(tmp_path)])).disk_cache.cache_dir == tmp_path / "graphs"
@@ -0,0 +1,103 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.graph_diff import DIFF_STYLE_CLASSES, GraphDiff, diff_main, graph_hash, node_hash
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, parse_wdl, write_output
+import copy
+import os
+import random
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+def new_revision(tmp_path):
+    """simple.wdl with a changed input, an added decl and a re-wired call"""
+    with open(os.path.join(TEST_WDLS, "simple.wdl")) as simple:
+        source = simple.read()
+    source = source.replace("input_file = hello,", "input_file = docker_image_id,")
+    source = source.replace("  call add_goodbye {", '  String tag = docker_image_id + ":latest"\n\n  call add_goodbye {')
+    source = source.replace(
+        "input_file = add_goodbye.out_goodbye,\n      docker_image_id = docker_image_id",
+        "input_file = add_world.out_world,\n      docker_image_id = tag",
+    )
+    path = tmp_path / "new.wdl"
+    path.write_text(source)
+    return parse_wdl(str(path))
+
+
+class TestGraphDiff:
+    def test_graph_hash(self, complex_wdl):
+        shuffled = complex_wdl.to_dict()
+        shuffled["nodes"] = random.sample(shuffled["nodes"], len(shuffled["nodes"]))
+        shuffled["edges"] = random.sample(shuffled["edges"], len(shuffled["edges"]))
+        shuffled["nodes"][0] = {key: shuffled["nodes"][0][key] for key in reversed(list(shuffled["nodes"][0]))}
+        assert graph_hash(MiniWDLParser.from_dict(shuffled)) == graph_hash(complex_wdl)
+
+        renamed = complex_wdl.to_dict()
+        renamed["nodes"] = [dict(node, name="renamed") if ind == 3 else node for ind, node in enumerate(renamed["nodes"])]
+        assert graph_hash(MiniWDLParser.from_dict(renamed)) != graph_hash(complex_wdl)
+        assert node_hash(renamed["nodes"][3]) != node_hash(complex_wdl.nodes[3])
+
+    def test_unchanged(self, complex_wdl):
+        graph_diff = GraphDiff(complex_wdl, MiniWDLParser.from_dict(complex_wdl.to_dict()))
+        assert not graph_diff.changed
+        assert graph_diff.report() == "nodes +0 -0 ~0, edges +0 -0 ~0"
+
+    def test_diff(self, simple_wdl, tmp_path):
+        graph_diff = GraphDiff(simple_wdl, new_revision(tmp_path))
+        assert graph_diff.added_nodes == ["decl-tag"]
+        assert graph_diff.removed_nodes == graph_diff.changed_nodes == []
+        assert {(edge["node_from"], edge["node_to"]) for edge in graph_diff.removed_edges} == {
+            ("call-add_goodbye", "call-add_farewell"),
+            ("WorkflowInput", "call-add_farewell"),
+        }
+        assert [edge["workflow_ref_name"] for edge in graph_diff.changed_edges] == ["docker_image_id"]
+
+        pwm = ParsedWDLToMermaid(style_classes=DIFF_STYLE_CLASSES, suppress_workflow_input=False, hide_input_names=True)
+        mermaid_list = graph_diff.flowchart(pwm)
+        assert "class decl-tag added" in mermaid_list
+        links = [row for row in mermaid_list if "-->" in row]
+        styles = {row.split()[2]: row.split()[1].split(",") for row in mermaid_list if row.startswith("linkStyle")}
+        assert [links[int(ind)] for ind in styles["stroke:#c33,stroke-width:2px,stroke-dasharray:5"]] == [
+            "call-add_goodbye -->  call-add_farewell",
+            "WorkflowInput -->  call-add_farewell",
+        ]
+        assert links[int(styles["stroke:#b90,stroke-width:2px"][0])] == "WorkflowInput -->  call-add_world"
+
+    def test_edges_sharing_a_key(self, simple_wdl):
+        # one input expression reading two outputs of the same call gives two edges with the
+        # same source, target and input name
+        old = copy.deepcopy(simple_wdl.to_dict())
+        wired = next(edge for edge in old["edges"] if edge["node_from"] == "call-add_world")
+        old["edges"].append(dict(wired, workflow_ref_name="add_world.out_log"))
+        old_parser = MiniWDLParser.from_dict(old)
+
+        shuffled = dict(old, edges=random.sample(old["edges"], len(old["edges"])))
+        assert not GraphDiff(old_parser, MiniWDLParser.from_dict(shuffled)).changed
+
+        graph_diff = GraphDiff(old_parser, simple_wdl)
+        assert graph_diff.report() == "nodes +0 -0 ~0, edges +0 -1 ~0"
+        assert graph_diff.removed_edges[0]["workflow_ref_name"] == "add_world.out_log"
+
+        renamed = dict(old, edges=[dict(edge, edge_type="renamed") if edge is wired else edge for edge in old["edges"]])
+        graph_diff = GraphDiff(old_parser, MiniWDLParser.from_dict(renamed))
+        assert graph_diff.report() == "nodes +0 -0 ~0, edges +0 -0 ~1"
+
+        pwm = ParsedWDLToMermaid(style_classes=DIFF_STYLE_CLASSES, group_edges=False)
+        mermaid_list = GraphDiff(old_parser, simple_wdl).flowchart(pwm)
+        # only the removed one of the two edges is styled
+        assert [row.split()[1] for row in mermaid_list if row.startswith("linkStyle")] == [str(len(simple_wdl.edges))]
+
+    def test_removed_nodes(self, simple_wdl, tmp_path):
+        graph_diff = GraphDiff(new_revision(tmp_path), simple_wdl)
+        assert graph_diff.removed_nodes == ["decl-tag"]
+        nodes, _ = graph_diff.union_graph()
+        assert [node["section"] for node in nodes if node["id"] == "decl-tag"] == ["swipe_test"]
+
+    def test_cli_graph_files(self, simple_wdl, tmp_path):
+        write_output(str(tmp_path / "old"), "json", simple_wdl.to_dict())
+        new_revision(tmp_path)
+        output_file = tmp_path / "diff.mmd"
+        diff_main([str(tmp_path / "old.json"), str(tmp_path / "new.wdl"), "-o", str(output_file)])
+        text = output_file.read_text()
+        assert text.startswith("flowchart LR\n    classDef added")
+        assert "    class decl-tag added\n" in text
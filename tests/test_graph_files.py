@@ -0,0 +1,38 @@
+from tests.test_miniwdl_parser import complex_wdl
+from miniwdl_viz.miniwdl_parser import dump_output, load_graph_file, write_output
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parsed_wdl_to_mermaid
+import json
+import pytest
+import yaml
+
+
+def flowchart(miniwdl_parser):
+    return parsed_wdl_to_mermaid(miniwdl_parser, ParsedWDLToMermaid())
+
+
+class TestGraphFiles:
+    @pytest.mark.parametrize("out_type", ["json", "yaml", "msgpack", "npz"])
+    def test_round_trip(self, complex_wdl, tmp_path, out_type):
+        if out_type == "msgpack":
+            pytest.importorskip("msgpack")
+        if out_type == "npz":
+            pytest.importorskip("numpy")
+        write_output(str(tmp_path / "complex"), out_type, complex_wdl.to_dict())
+        loaded = load_graph_file(str(tmp_path / f"complex.{out_type}"))
+        assert loaded.to_dict() == complex_wdl.to_dict()
+        assert flowchart(loaded) == flowchart(complex_wdl)
+
+    def test_compact_json(self, complex_wdl):
+        compact = dump_output("json", complex_wdl.to_dict(), compact=True)
+        assert "\n" not in compact
+        assert json.loads(compact) == json.loads(dump_output("json", complex_wdl.to_dict()))
+
+    def test_yaml_unchanged(self, complex_wdl):
+        # the C dumper writes the same text as the pure python one
+        assert dump_output("yaml", complex_wdl.to_dict()) == yaml.dump(complex_wdl.to_dict(), sort_keys=False)
+
+    def test_unsupported_input(self, tmp_path):
+        path = tmp_path / "graph.txt"
+        path.write_text("{}")
+        with pytest.raises(ValueError):
+            load_graph_file(str(path))
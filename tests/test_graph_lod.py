@@ -0,0 +1,88 @@
+from tests.test_miniwdl_parser import complex_wdl
+from miniwdl_viz.graph_lod import LevelOfDetail, edge_count
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+import copy
+
+VIRTUAL_NODES = {"WorkflowInput", "HardcodedVariable"}
+
+
+def assert_consistent(nodes, edges):
+    node_ids = {node["id"] for node in nodes} | VIRTUAL_NODES
+    for edge in edges:
+        assert edge["node_from"] in node_ids
+        assert edge["node_to"] in node_ids
+    for node in nodes:
+        assert node["section"] == "JointGenotyping" or node["section"] in node_ids
+
+
+class TestLevelOfDetail:
+    def test_collapse_all_sections(self, complex_wdl):
+        lod = LevelOfDetail(max_depth=0)
+        nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert_consistent(nodes, edges)
+        assert all(node["section"] == "JointGenotyping" for node in nodes)
+        assert lod.stats["collapsed_sections"] == 6
+        assert lod.stats["nodes_after"] == len(nodes) == 11
+        assert "(3 nodes collapsed)" in next(node for node in nodes if node["id"] == "scatter-L120C3-idx")["name"]
+
+    def test_collapse_section(self, complex_wdl):
+        original = copy.deepcopy(complex_wdl.edges)
+        lod = LevelOfDetail(collapse_sections=["if-L195C3"])
+        nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert_consistent(nodes, edges)
+        node_ids = {node["id"] for node in nodes}
+        assert "if-L195C3" in node_ids
+        assert "scatter-L219C3-idx" not in node_ids
+        assert "call-SNPGatherTranches" not in node_ids
+        # edges out of the collapsed section are re-routed, and merged per pair of nodes
+        rerouted = [edge for edge in edges if edge["node_from"] == "if-L195C3"]
+        assert rerouted
+        assert len(rerouted) == len({edge["node_to"] for edge in rerouted})
+        assert complex_wdl.edges == original
+
+    def test_drop_decls(self, complex_wdl):
+        lod = LevelOfDetail(drop_decls=True)
+        nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert_consistent(nodes, edges)
+        assert not any(node["type"] == "decl" for node in nodes)
+        assert lod.stats["dropped_decls"] == 2
+        # is_small_callset's inputs now feed the sections that depended on it
+        assert any(
+            edge["node_to"] == "if-L317C3" and edge["node_from"] != "decl-is_small_callset" for edge in edges
+        )
+
+    def test_node_budget(self, complex_wdl):
+        lod = LevelOfDetail(max_nodes=15)
+        nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert_consistent(nodes, edges)
+        assert len(nodes) <= 15
+        assert LevelOfDetail(max_nodes=10_000).apply(
+            complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges
+        )[0] == complex_wdl.nodes
+
+    def test_edge_budget(self, complex_wdl):
+        lod = LevelOfDetail(max_edges=40)
+        nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert edge_count(edges) <= 40
+        assert lod.stats["edges_after"] < lod.stats["edges_before"]
+
+    def test_budget_matches_collapsing_the_same_sections(self, complex_wdl):
+        # the budget keeps counts up to date as it collapses, which must agree with
+        # collapsing the sections it chose up front
+        for budget in [dict(max_nodes=12), dict(max_edges=30), dict(max_nodes=20, max_edges=25, drop_decls=True)]:
+            lod = LevelOfDetail(**budget)
+            nodes, edges = lod.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+            chosen = [node["id"] for node in nodes if "nodes collapsed)" in node["name"]]
+            assert chosen
+            drop_decls = budget.get("drop_decls", False)
+            explicit = LevelOfDetail(collapse_sections=chosen, drop_decls=drop_decls)
+            assert explicit.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges) == (nodes, edges)
+            assert lod.stats == explicit.stats
+
+    def test_flowchart(self, complex_wdl):
+        pwm = ParsedWDLToMermaid(level_of_detail=LevelOfDetail(max_depth=0))
+        mermaid_list = pwm.create_mermaid_flowchart(
+            complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges
+        )
+        assert 'subgraph scatter-L120C3-idx["range(length(unpadded_intervals)) (3 nodes collapsed)"]' in mermaid_list
+        assert not any("call-ImportGVCFs" in row for row in mermaid_list)
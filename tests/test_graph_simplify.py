@@ -0,0 +1,68 @@
+from tests.test_miniwdl_parser import complex_wdl
+from miniwdl_viz.graph_simplify import GraphSimplifier
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+
+
+def node(id, section="wf", type="call"):
+    return {"id": id, "name": id, "section": section, "type": type}
+
+
+def edge(node_from, node_to, name="in"):
+    return {"node_from": node_from, "node_to": node_to, "workflow_ref_name": name, "task_ref_name": name, "edge_type": "input"}
+
+
+def pairs(edges):
+    return {(edge["node_from"], edge["node_to"]) for edge in edges}
+
+
+class TestGraphSimplifier:
+    def test_transitive_reduction(self):
+        nodes = [node("a"), node("b"), node("c"), node("d")]
+        edges = [edge("a", "b"), edge("b", "c"), edge("a", "c"), edge("a", "c", "other"), edge("c", "d"), edge("a", "d")]
+        simplifier = GraphSimplifier(transitive_reduction=True)
+        _, simplified = simplifier.apply("wf", nodes, edges)
+        assert pairs(simplified) == {("a", "b"), ("b", "c"), ("c", "d")}
+        assert simplifier.stats == {"edges_before": 5, "edges_after": 3, "implied": 0, "transitive": 2}
+
+    def test_implied_edges(self):
+        nodes = [node("x"), node("scatter", type="workflow_section"), node("inner", section="scatter")]
+        edges = [edge("x", "scatter"), edge("x", "inner"), edge("scatter", "inner", "idx")]
+        _, simplified = GraphSimplifier(drop_implied=True).apply("wf", nodes, edges)
+        assert pairs(simplified) == {("x", "scatter")}
+
+    def test_bundle_edges(self):
+        nodes = [node("a"), node("b")]
+        edges = [edge("a", "b", f"in{ind}") for ind in range(5)] + [edge("a", "b", "in0")]
+        _, simplified = GraphSimplifier(bundle_edges=True, max_labels=2).apply("wf", nodes, edges)
+        assert [edge["task_ref_name"] for edge in simplified] == ["in0, in1, +3 more"]
+        assert edges[0]["task_ref_name"] == "in0"
+
+    def test_complex_wdl(self, complex_wdl):
+        simplifier = GraphSimplifier(transitive_reduction=True, drop_implied=True, bundle_edges=True)
+        _, simplified = simplifier.apply(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        assert ("scatter-L120C3-idx", "call-ImportGVCFs") not in pairs(simplified)
+        assert simplifier.stats["edges_after"] < simplifier.stats["edges_before"] / 2
+        # transitive reduction keeps every node reachable that was reachable before
+        def reachable(edges, start):
+            seen, pending = set(), [start]
+            while pending:
+                current = pending.pop()
+                for edge in edges:
+                    if edge["node_from"] == current and edge["node_to"] not in seen:
+                        seen.add(edge["node_to"])
+                        pending.append(edge["node_to"])
+            return seen
+        _, reduced = GraphSimplifier(transitive_reduction=True).apply(
+            complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges
+        )
+        for start in ["WorkflowInput", "call-DynamicallyCombineIntervals", "scatter-L120C3-idx"]:
+            assert reachable(reduced, start) == reachable(complex_wdl.edges, start)
+
+    def test_flowchart(self, complex_wdl):
+        default = ParsedWDLToMermaid().create_mermaid_flowchart(
+            complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges
+        )
+        simplified = ParsedWDLToMermaid(simplifier=GraphSimplifier(transitive_reduction=True)).create_mermaid_flowchart(
+            complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges
+        )
+        assert len(simplified) < len(default)
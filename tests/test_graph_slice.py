@@ -0,0 +1,83 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.graph_diff import graph_hash
+from miniwdl_viz.graph_slice import GraphSlice, SliceError
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parsed_wdl_to_mermaid
+from miniwdl_viz.server import DiagramService
+from miniwdl_viz.workflow_graph import WorkflowGraph
+import os
+import pytest
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+def node(id, section="wf", type="call"):
+    return {"id": id, "name": id, "section": section, "type": type}
+
+
+def edge(node_from, node_to):
+    return {"node_from": node_from, "node_to": node_to, "workflow_ref_name": "x", "task_ref_name": "in", "edge_type": "input"}
+
+
+def chain_graph():
+    """WorkflowInput -> a -> b -> c -> d, with c and d in a scatter, and a -> e on the side"""
+    nodes = [node("a"), node("b"), node("scatter", type="workflow_section"), node("c", section="scatter"), node("d", section="scatter"), node("e")]
+    edges = [edge("WorkflowInput", "a"), edge("a", "b"), edge("b", "c"), edge("c", "d"), edge("a", "e"), edge("WorkflowInput", "e")]
+    return WorkflowGraph(nodes, edges)
+
+
+class TestGraphSlice:
+    def test_reachable(self):
+        graph = chain_graph()
+        assert graph.reachable("b") == {"b": 0, "c": 1, "d": 2}
+        assert graph.reachable("b", depth=1) == {"b": 0, "c": 1}
+        assert graph.reachable("c", upstream=True) == {"c": 0, "b": 1, "a": 2, "WorkflowInput": 3}
+        # nothing is walked past a virtual node
+        assert graph.reachable("e", upstream=True) == {"e": 0, "a": 1, "WorkflowInput": 1}
+
+    def test_select(self):
+        nodes, edges = GraphSlice("c", depth=1).select(chain_graph())
+        assert [node["id"] for node in nodes] == ["b", "scatter", "c", "d"]
+        assert [(edge["node_from"], edge["node_to"]) for edge in edges] == [("b", "c"), ("c", "d")]
+
+        nodes, edges = GraphSlice("b", downstream=False).select(chain_graph())
+        assert [node["id"] for node in nodes] == ["a", "b"]
+        assert [(edge["node_from"], edge["node_to"]) for edge in edges] == [("WorkflowInput", "a"), ("a", "b")]
+
+        graph_slice = GraphSlice("a", upstream=False)
+        nodes, _ = graph_slice.select(chain_graph())
+        assert [node["id"] for node in nodes] == ["a", "b", "scatter", "c", "d", "e"]
+        assert graph_slice.report() == "nodes 6 -> 6, edges 6 -> 4"
+
+    def test_resolve(self, complex_wdl):
+        graph = complex_wdl.graph
+        assert GraphSlice("ImportGVCFs").resolve(graph) == "call-ImportGVCFs"
+        assert GraphSlice("call-ImportGVCFs").resolve(graph) == "call-ImportGVCFs"
+        with pytest.raises(SliceError, match="no node missing"):
+            GraphSlice("missing").resolve(graph)
+        twice = WorkflowGraph([node("call-a"), dict(node("sub-call-a"), name="call-a"), dict(node("x"), name="b"), dict(node("y"), name="b")])
+        with pytest.raises(SliceError, match="x, y"):
+            GraphSlice("b").resolve(twice)
+
+    def test_parser_slice(self, complex_wdl):
+        sliced = complex_wdl.slice("GenotypeGVCFs", downstream=False, depth=2)
+        assert {node["id"] for node in sliced.nodes} == {
+            "call-DynamicallyCombineIntervals", "decl-unpadded_intervals", "scatter-L120C3-idx", "call-ImportGVCFs", "call-GenotypeGVCFs",
+        }
+        assert sliced.inputs == complex_wdl.inputs
+        assert len(complex_wdl.nodes) == 25
+        mermaid_list = parsed_wdl_to_mermaid(sliced, ParsedWDLToMermaid())
+        assert 'call-GenotypeGVCFs{{"GenotypeGVCFs"}}' in mermaid_list
+        assert "call-GatherMetrics" not in "\n".join(mermaid_list)
+
+    def test_key(self, simple_wdl):
+        workflow_hash = graph_hash(simple_wdl)
+        assert GraphSlice("add_world").key(workflow_hash) == GraphSlice("add_world").key(workflow_hash)
+        assert GraphSlice("add_world").key(workflow_hash) != GraphSlice("add_world", depth=1).key(workflow_hash)
+        assert GraphSlice("add_world").key(workflow_hash) != GraphSlice("add_world").key("other")
+
+    def test_server_cache(self):
+        service = DiagramService(root=TEST_WDLS)
+        first = service.slice(service.parse(service.resolve("simple.wdl")), service.parse_args("simple.wdl", ["--focus", "add_world", "--upstream"]))
+        again = service.slice(service.parse(service.resolve("simple.wdl")), service.parse_args("simple.wdl", ["--focus", "add_world", "--upstream"]))
+        assert again is first
+        assert "call-add_farewell" not in service.mermaid("simple.wdl", ["--focus", "add_world", "--upstream"])
@@ -0,0 +1,171 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.html_viewer import HtmlViewer, mermaid_script
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, create_arg_parser, run
+import json
+import os
+import pytest
+import re
+import shutil
+import subprocess
+
+
+def create_pwm(style_classes):
+    return ParsedWDLToMermaid(style_classes=style_classes, hide_input_names=True)
+
+
+def page_sections(page):
+    return json.loads(re.search(r'id="miniwdl-viz-data">(.*?)</script>', page, re.S).group(1))
+
+
+# just enough of a DOM for the page's script, and the rendered html of every diagram once
+# the top level and then one section were drawn
+DOM_HARNESS = """
+var elements = {};
+function element(id) {
+  return {
+    id: id, innerHTML: "", textContent: "", className: "", children: [], opened: false,
+    appendChild: function (child) { this.children.push(child); },
+    addEventListener: function (name, listener) { this["on" + name] = listener; },
+    scrollIntoView: function () {},
+    // opening a details element fires toggle
+    get open() { return this.opened; },
+    set open(value) { this.opened = value; if (this.ontoggle) this.ontoggle(); },
+  };
+}
+var document = {
+  getElementById: function (id) { return elements[id] || (elements[id] = element(id)); },
+  createElement: function (tag) { return element(tag); },
+};
+var window = {};
+document.getElementById("miniwdl-viz-data").textContent = DATA;
+MERMAID
+PAGE_SCRIPT
+setTimeout(function () {
+  window.miniwdlVizExpand(SECTION);
+  setTimeout(function () {
+    var diagrams = [];
+    (function walk(node) {
+      node.children.forEach(function (child) {
+        if (child.className.indexOf("diagram") >= 0) diagrams.push(child.innerHTML || child.textContent);
+        walk(child);
+      });
+    })(document.getElementById("miniwdl-viz-sections"));
+    console.log(JSON.stringify({top: document.getElementById("miniwdl-viz-top").innerHTML, sections: diagrams}));
+  }, 10);
+}, 10);
+"""
+
+# mermaid.render as of mermaid 10: a promise, and the optional third argument is the
+# element the diagram is drawn in
+MERMAID_10 = """
+var mermaid = {
+  initialize: function () {},
+  render: function (id, text, container) {
+    if (container !== undefined && typeof container.appendChild !== "function") {
+      throw new TypeError("container.append is not a function");
+    }
+    return Promise.resolve({svg: "<svg id=" + id + ">" + text.split("\\n").length + "</svg>", bindFunctions: undefined});
+  },
+};
+"""
+
+# mermaid 9 returns the svg, and also calls back with it when given a callback
+MERMAID_9 = """
+var mermaid = {
+  initialize: function () {},
+  render: function (id, text, callback) {
+    var svg = "<svg id=" + id + ">" + text.split("\\n").length + "</svg>";
+    if (callback) callback(svg, function () {});
+    return svg;
+  },
+};
+"""
+
+
+def run_page(page, mermaid_stub, section):
+    scripts = re.findall(r"<script>(.*?)</script>", page, re.S)
+    data = re.search(r'id="miniwdl-viz-data">(.*?)</script>', page, re.S).group(1)
+    harness = (
+        DOM_HARNESS.replace("PAGE_SCRIPT", scripts[-1])
+        .replace("MERMAID", mermaid_stub)
+        .replace("DATA", json.dumps(data))
+        .replace("SECTION", json.dumps(section))
+    )
+    result = subprocess.run(["node", "-e", harness], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+class TestHtmlViewer:
+    def test_sections(self, complex_wdl):
+        html_viewer = HtmlViewer(create_pwm)
+        sections = html_viewer.sections(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+        section_ids = [node["id"] for node in complex_wdl.nodes if node["type"] == "workflow_section"]
+        assert sorted(section["id"] for section in sections[1:]) == sorted(section_ids)
+        assert sections[0]["parent"] is None
+        # every section comes after the section containing it
+        seen = set()
+        for section in sections:
+            assert section["parent"] is None or section["parent"] in seen
+            seen.add(section["id"])
+        assert {section["id"]: section["parent"] for section in sections}["scatter-L219C3-idx"] == "if-L195C3"
+
+        top = sections[0]["mermaid"].splitlines()
+        assert '    scatter-L120C3-idx["range(length(unpadded_intervals)) (3 nodes)"]:::collapsed' in top
+        assert "    click scatter-L120C3-idx call miniwdlVizExpand()" in top
+        assert "    scatter-L120C3-idx -->  call-SitesOnlyGatherVcf" in top
+        assert not any("ImportGVCFs" in row for row in top)
+
+        # every call and decl is drawn on exactly one level
+        drawn = [
+            row.strip().split("{{")[0].split(">")[0]
+            for section in sections
+            for row in section["mermaid"].splitlines()
+            if row.startswith("    call-") or row.startswith("    decl-")
+            if "-->" not in row
+        ]
+        assert sorted(drawn) == sorted(node["id"] for node in complex_wdl.nodes if node["type"] in ("call", "decl"))
+        assert html_viewer.report() == "8 sections, at most 11 nodes per flowchart"
+
+    def test_nested_level(self, complex_wdl):
+        sections = {section["id"]: section for section in HtmlViewer(create_pwm).sections(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)}
+        rows = sections["if-L195C3"]["mermaid"].splitlines()
+        assert "    call-SNPsVariantRecalibratorCreateModel -->  scatter-L219C3-idx" in rows
+        assert "    scatter-L219C3-idx -->  call-SNPGatherTranches" in rows
+        # edges from outside the section are drawn a level up
+        assert not any("SitesOnlyGatherVcf" in row for row in rows)
+
+    def test_page(self, simple_wdl, tmp_path):
+        mermaid_js = tmp_path / "mermaid.min.js"
+        mermaid_js.write_text("var mermaid = {}; // </script> in a comment")
+        output_file = tmp_path / "simple.html"
+        HtmlViewer(create_pwm, mermaid_js=str(mermaid_js)).write(simple_wdl, str(output_file))
+        page = output_file.read_text()
+        assert "<script>var mermaid = {}; // <\\/script> in a comment</script>" in page
+        assert "cdn" not in page
+        sections = page_sections(page)
+        assert [section["id"] for section in sections] == [simple_wdl.workflow_name]
+        assert 'call-add_world{{"add_world"}}' in sections[0]["mermaid"]
+
+    def test_needs_mermaid_js(self, simple_wdl, tmp_path):
+        with pytest.raises(ValueError, match="needs mermaid_js"):
+            HtmlViewer(create_pwm).render(simple_wdl)
+        arg_parser = create_arg_parser()
+        wdl_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls", "simple.wdl")
+        with pytest.raises(SystemExit):
+            run(arg_parser.parse_args([wdl_file, "--html-output", str(tmp_path / "simple.html")]), arg_parser)
+        assert not (tmp_path / "simple.html").exists()
+
+    def test_mermaid_url(self):
+        assert mermaid_script("https://example.com/mermaid.js?a=1&b=2") == '<script src="https://example.com/mermaid.js?a=1&amp;b=2"></script>'
+
+    @pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the page's script")
+    @pytest.mark.parametrize("mermaid_stub", [MERMAID_10, MERMAID_9], ids=["mermaid10", "mermaid9"])
+    def test_page_script_draws(self, complex_wdl, tmp_path, mermaid_stub):
+        output_file = tmp_path / "complex.html"
+        HtmlViewer(create_pwm, mermaid_js="https://example.com/mermaid.js").write(complex_wdl, str(output_file))
+        drawn = run_page(output_file.read_text(), mermaid_stub, "scatter-L219C3-idx")
+
+        assert drawn["top"].startswith("<svg id=miniwdl-viz-svg-0>")
+        # the nested section and the section containing it were opened and drawn, the rest not
+        assert sorted(diagram[:9] for diagram in drawn["sections"] if diagram) == ["<svg id=m", "<svg id=m"]
+        assert "Error" not in "".join(drawn["sections"])
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import pytest
+
+# Modules only the plotting / yaml output paths need
+HEAVY_MODULES = ["matplotlib", "PIL", "requests", "yaml"]
+# Allowed import time for an entry point on top of importing miniwdl itself
+BUDGET_US = 150_000
+
+
+def import_times(module):
+    """Returns {module: cumulative import time in us} from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "entry_point",
+    ["miniwdl_viz.mermaid_wdl", "miniwdl_viz.miniwdl_parser", "miniwdl_viz.batch"],
+)
+class TestImportTime:
+    def test_no_heavy_imports(self, entry_point):
+        imported = import_times(entry_point)
+        assert [module for module in HEAVY_MODULES if module in imported] == []
+
+    def test_import_budget(self, entry_point):
+        imported = import_times(entry_point)
+        assert imported[entry_point] - imported["WDL"] < BUDGET_US
@@ -0,0 +1,44 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.local_renderer import LocalRenderer
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+def layout(parser, flowchart_dir="TD"):
+    pwm = ParsedWDLToMermaid(suppress_workflow_input=False)
+    graph = WorkflowGraph(parser.nodes)
+    edges = pwm.flowchart_edges(graph, parser.edges)
+    return LocalRenderer(flowchart_dir=flowchart_dir).layout(parser.workflow_name, graph, edges), edges
+
+
+def boxes(flowchart_layout, kind):
+    return [operation[1] for operation in flowchart_layout.operations if operation[0] == kind]
+
+
+class TestLocalRenderer:
+    def test_simple_layers(self, simple_wdl):
+        flowchart_layout, edges = layout(simple_wdl)
+        calls = boxes(flowchart_layout, "polygon")
+        tops = sorted(min(y for _, y in points) for points in calls)
+
+        assert len(calls) == 3
+        assert tops[0] < tops[1] < tops[2]
+        assert len(boxes(flowchart_layout, "ellipse")) == 1
+        assert len(boxes(flowchart_layout, "arrow")) == len(edges)
+
+    def test_complex_clusters(self, complex_wdl, tmp_path):
+        flowchart_layout, _ = layout(complex_wdl, flowchart_dir="LR")
+        sections = [node for node in complex_wdl.nodes if node["type"] == "workflow_section"]
+        clusters = [box for box in boxes(flowchart_layout, "rect")]
+        assert len(clusters) == len(sections)
+
+        for x, y, w, h in clusters:
+            assert 0 <= x and x + w <= flowchart_layout.width
+            assert 0 <= y and y + h <= flowchart_layout.height
+
+        svg_file = tmp_path / "complex.svg"
+        png_file = tmp_path / "complex.png"
+        pwm = ParsedWDLToMermaid(output_name=str(tmp_path / "complex.mmd"))
+        pwm.render_local_flowchart(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges, file_output=True)
+        assert svg_file.read_text().startswith("<svg")
+        assert png_file.exists()
@@ -1,7 +1,10 @@
 from tests.test_miniwdl_parser import simple_wdl, complex_wdl
-from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, create_arg_parser, run
+from miniwdl_viz.mermaid_node import MermaidNode, NodeType
+from miniwdl_viz.py_mermaid import PyMermaid
 from os.path import join, dirname, realpath
 import hashlib
+import io
 import os
 
 
@@ -55,3 +58,73 @@ class TestMermaidWDL:
         hash = hashlib.md5(file.encode())
         assert hash.hexdigest() == "9c7ee82d6bb52a761ed881683dea444a"
         os.remove(output_filename)
+
+    def test_streaming_matches_list(self, complex_wdl):
+        mw = ParsedWDLToMermaid(flowchart_dir="LR", suppress_workflow_input=False)
+        mermaid_list = mw.create_mermaid_flowchart(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges)
+
+        sink = io.StringIO()
+        stream_mw = ParsedWDLToMermaid(flowchart_dir="LR", suppress_workflow_input=False, sink=sink)
+        assert stream_mw.create_mermaid_flowchart(complex_wdl.workflow_name, complex_wdl.nodes, complex_wdl.edges) == []
+        assert sink.getvalue() == "".join(mw.indented_rows(mermaid_list))
+
+    def test_streaming_reports_stats(self, capsys):
+        wdl_file = join(dirname(realpath(__file__)), "test_wdls", "joint-discovery-gatk4-version.wdl")
+        arg_parser = create_arg_parser()
+        run(arg_parser.parse_args([wdl_file, "--print-flowchart", "--stream", "--max-depth", "0", "--simplify"]), arg_parser)
+
+        captured = capsys.readouterr()
+        assert captured.out.startswith("flowchart")
+        assert "Level of detail: " in captured.err
+        assert "Simplified: " in captured.err
+
+    def test_streaming_deferred_classes(self):
+        sink = io.StringIO()
+        py_mermaid = PyMermaid(sink=sink)
+        py_mermaid.set_node_class("call-b", "done")
+        py_mermaid.add_node({"id": "call-a", "name": "a", "type": "call"})
+        py_mermaid.add_node({"id": "call-b", "name": "b", "type": "call"})
+        py_mermaid.set_node_class("call-a", "done")
+        py_mermaid.set_node_class("call-missing", "done")
+        py_mermaid.finish()
+
+        assert sink.getvalue().splitlines()[2:] == [
+            '    call-a{{"a"}}',
+            '    call-b{{"b"}}:::done',
+            "    class call-a done",
+        ]
+
+    def test_node_shapes(self):
+        py_mermaid = PyMermaid()
+        nodes = [
+            {"id": "WorkflowInput", "name": "WorkflowInput", "type": "input"},
+            {"id": "decl-x", "name": 'x = "a"', "type": "decl"},
+            {"id": "call-a", "name": "a", "type": "call"},
+        ]
+        assert [str(py_mermaid.create_mm_node(node)) for node in nodes] == [
+            'WorkflowInput(("WorkflowInput"))',
+            "decl-x>\"x = 'a'\"]",
+            'call-a{{"a"}}',
+        ]
+        assert py_mermaid.create_mm_node({"id": "scatter-L1C1-i", "name": "i", "type": "workflow_section"}) == "scatter-L1C1-i"
+        assert MermaidNode.from_dict(nodes[2]).to_dict() == nodes[2]
+        assert MermaidNode.from_dict(nodes[1]).node_type == NodeType.DECL
+        collapsed = {"id": "scatter-L1C1-i", "name": "i (3 nodes)", "type": NodeType.COLLAPSED.value}
+        assert str(py_mermaid.create_mm_node(collapsed)) == 'scatter-L1C1-i["i (3 nodes)"]'
+        assert MermaidNode.from_dict(collapsed).to_dict() == collapsed
+
+        py_mermaid.add_mermaid_edge(nodes[1], nodes[2], {"task_ref_name": "x"})
+        py_mermaid.add_mermaid_edge(nodes[0], nodes[2], {"task_ref_name": "y"})
+        assert py_mermaid.mermaid_list[-2:] == [
+            "decl-x>\"x = 'a'\"] --> |x| call-a{{\"a\"}}",
+            'WorkflowInput(("WorkflowInput")) --> |y| call-a{{"a"}}',
+        ]
+        assert list(py_mermaid.node_labels) == ["decl-x", "call-a", "WorkflowInput"]
+
+    def test_group_edge(self):
+        edge = {"node_from": "call-a", "node_to": "call-b", "workflow_ref_name": "a.out", "task_ref_name": "x", "edge_type": "input"}
+        edges = [edge, dict(edge, task_ref_name="y"), dict(edge), dict(edge, task_ref_name="z"), dict(edge, node_to="call-c")]
+        grouped = ParsedWDLToMermaid().group_edge(edges)
+        assert [(edge["node_to"], edge["task_ref_name"]) for edge in grouped] == [("call-b", "x, y, z"), ("call-c", "x")]
+        assert grouped[1] is edges[-1]
+        assert edge["task_ref_name"] == "x"
@@ -41,3 +41,31 @@ class TestMiniWDLParser:
         assert len(call_nodes) == 15
         assert len(subsection_nodes) == 8
         assert len(decl_nodes) == 2
+
+    def test_deep_expression(self, tmp_path):
+        from miniwdl_viz.synthetic import expressions_wdl
+        import sys
+
+        wdl_path = tmp_path / "expressions.wdl"
+        wdl_path.write_text(expressions_wdl(300, 1500))
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(30000)
+        try:
+            doc = WDL.load(str(wdl_path))
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+        parser = MiniWDLParser(doc)
+        parser.parse()
+
+        deep_edges = [edge for edge in parser.edges if edge["node_to"] == "call-deep"]
+        # seed, flag and the five calls, each only once however often they're referenced
+        assert {edge["node_from"] for edge in deep_edges} == {"WorkflowInput"} | {f"call-c{ind}" for ind in range(5)}
+        assert len(deep_edges) == 7
+        wide_edges = [edge for edge in parser.edges if edge["node_to"] == "call-wide"]
+        assert len(wide_edges) == 1 + 5 + 100
+
+    def test_plain_types(self, complex_wdl):
+        import yaml
+
+        # miniwdl names are lark Tokens, which would be dumped as python objects
+        yaml.safe_dump(complex_wdl.to_dict())
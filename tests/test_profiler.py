@@ -0,0 +1,70 @@
+from miniwdl_viz.profiler import Profiler, active_profiler, stage
+from miniwdl_viz.miniwdl_parser import parse_wdl
+from miniwdl_viz.wdl_loader import DocumentLoader
+import json
+import pytest
+import os
+import subprocess
+import sys
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+class TestProfiler:
+    def test_no_profiler(self):
+        assert active_profiler.get() is None
+        with stage("anything"):
+            pass
+
+    def test_nested_stages(self):
+        finished = []
+        with Profiler(callback=lambda name, seconds, peak: finished.append(name)) as profiler:
+            with stage("outer"):
+                with stage("outer"):
+                    with stage("inner"):
+                        data = [0] * 100_000
+                del data
+        assert active_profiler.get() is None
+        assert finished == ["inner", "outer", "outer"]
+        totals = profiler.totals()
+        assert totals["outer"]["calls"] == 2
+        # the nested outer stage isn't counted twice
+        outer_events = [event for event in profiler.events if event["name"] == "outer"]
+        assert totals["outer"]["seconds"] * 1e6 == pytest.approx(max(event["dur"] for event in outer_events))
+        # the inner stage's allocations show up in the peak of its parents
+        assert totals["outer"]["peak_bytes"] >= totals["inner"]["peak_bytes"] >= 800_000
+
+    def test_parse_stages(self):
+        with Profiler(memory=False) as profiler:
+            parse_wdl(os.path.join(TEST_WDLS, "nested.wdl"), loader=DocumentLoader())
+        totals = profiler.totals()
+        for name in ["wdl.read", "wdl.parse", "wdl.imports", "wdl.typecheck", "wdl.load", "parse_workflow"]:
+            assert totals[name]["calls"] >= 1
+        # simple.wdl is read as an import of both nested.wdl and imports.wdl, but parsed and
+        # typechecked once
+        assert totals["wdl.read"]["calls"] == 4
+        assert totals["wdl.parse"]["calls"] == totals["wdl.typecheck"]["calls"] == 3
+        # loading an import, typecheck included, is part of the importing document's imports stage
+        def span(name, file):
+            event = next(event for event in profiler.events if event["name"] == name and event["args"]["file"].endswith(file))
+            return event["ts"], event["ts"] + event["dur"]
+
+        imports_start, imports_end = span("wdl.imports", "nested.wdl")
+        typecheck_start, typecheck_end = span("wdl.typecheck", "imports.wdl")
+        assert imports_start <= typecheck_start <= typecheck_end <= imports_end
+        assert span("wdl.typecheck", "nested.wdl")[0] >= imports_end
+        assert "peak MB" not in profiler.summary()
+
+    def test_cli_trace(self, tmp_path):
+        trace_file = tmp_path / "trace.json"
+        result = subprocess.run(
+            [sys.executable, "-m", "miniwdl_viz.mermaid_wdl", os.path.join(TEST_WDLS, "simple.wdl"), "--print-flowchart", "--profile", str(trace_file)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.startswith("flowchart")
+        assert "group_edge" in result.stderr
+        events = json.loads(trace_file.read_text())["traceEvents"]
+        assert {"wdl.load", "wdl.typecheck", "parse_workflow", "group_edge", "subgraphs", "edges", "output"} <= {event["name"] for event in events}
+        assert all(event["ph"] == "X" and "peak_kb" in event["args"] for event in events)
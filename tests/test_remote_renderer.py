@@ -0,0 +1,59 @@
+from miniwdl_viz.disk_cache import DiskCache
+from miniwdl_viz.remote_renderer import RemoteRenderer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import pytest
+
+
+@pytest.fixture
+def stub_server():
+    """Local stand-in for mermaid.ink, failing the first request with a 503"""
+    requests_seen = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            if len(requests_seen) == 1:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.requests_seen = requests_seen
+    yield server
+    server.shutdown()
+
+
+class TestRemoteRenderer:
+    def test_retry_and_cache(self, stub_server, tmp_path):
+        renderer = RemoteRenderer(
+            base_url=f"http://127.0.0.1:{stub_server.server_port}",
+            cache=DiskCache(str(tmp_path)),
+            backoff_factor=0,
+        )
+        image = renderer.render("flowchart LR\n    a --> b")
+
+        assert image.startswith(b"/img/")
+        assert len(stub_server.requests_seen) == 2
+        assert renderer.render("flowchart LR\n    a --> b") == image
+        assert len(stub_server.requests_seen) == 2
+
+    def test_render_many(self, stub_server):
+        renderer = RemoteRenderer(
+            base_url=f"http://127.0.0.1:{stub_server.server_port}", backoff_factor=0
+        )
+        diagrams = [f"flowchart LR\n    a --> b{ind % 5}" for ind in range(20)]
+        images = renderer.render_many(diagrams, max_workers=4)
+
+        assert images == [renderer.render(diagram) for diagram in diagrams[:5]] * 4
+        # one failed attempt, five distinct diagrams, five more from the check above
+        assert len(stub_server.requests_seen) == 11
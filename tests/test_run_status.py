@@ -0,0 +1,100 @@
+from tests.mtime_clock import mtime_clock
+from tests.test_miniwdl_parser import complex_wdl, simple_wdl
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid
+from miniwdl_viz.run_status import (
+    STATUS_STYLE_CLASSES,
+    RunDirectoryTracker,
+    follow_run,
+    status_flowchart,
+)
+
+
+def add_job(mtime_clock, run_dir, job_id, result=None):
+    job_dir = run_dir / job_id
+    job_dir.mkdir(exist_ok=True)
+    if result:
+        (job_dir / result).write_text("{}")
+        mtime_clock.touch(job_dir)
+    mtime_clock.touch(run_dir)
+
+
+def log_ready(run_dir, *job_ids):
+    with open(run_dir / "workflow.log", "a") as f:
+        for job_id in job_ids:
+            f.write(f'2024-01-01 00:00:00.000 wdl.w:swipe_test ready :: job: "{job_id}", callee: "task"\n')
+
+
+class TestRunStatus:
+    def test_simple_run(self, simple_wdl, tmp_path, mtime_clock):
+        log_ready(tmp_path, "call-add_world", "call-add_goodbye", "call-add_farewell")
+        add_job(mtime_clock, tmp_path, "call-add_world", "outputs.json")
+        add_job(mtime_clock, tmp_path, "call-add_goodbye")
+
+        tracker = RunDirectoryTracker(str(tmp_path))
+        assert tracker.poll() == {"call-add_world", "call-add_goodbye", "call-add_farewell"}
+        counts = tracker.node_counts()
+        assert counts["call-add_world"]["done"] == 1
+        assert counts["call-add_goodbye"]["running"] == 1
+        assert counts["call-add_farewell"]["queued"] == 1
+
+        pwm = ParsedWDLToMermaid(style_classes=STATUS_STYLE_CLASSES)
+        mermaid_list = status_flowchart(simple_wdl, tracker, pwm)
+        assert mermaid_list[1:5] == STATUS_STYLE_CLASSES
+        assert 'call-add_world{{"add_world"}}:::done' in mermaid_list
+        assert 'call-add_goodbye{{"add_goodbye"}}:::running' in mermaid_list
+        assert 'call-add_farewell{{"add_farewell"}}:::queued' in mermaid_list
+
+    def test_incremental_poll(self, simple_wdl, tmp_path, mtime_clock):
+        log_ready(tmp_path, "call-add_world")
+        tracker = RunDirectoryTracker(str(tmp_path))
+        assert tracker.poll() == {"call-add_world"}
+        assert tracker.poll() == set()
+
+        add_job(mtime_clock, tmp_path, "call-add_world")
+        assert tracker.poll() == {"call-add_world"}
+        assert tracker.poll() == set()
+
+        add_job(mtime_clock, tmp_path, "call-add_world", "outputs.json")
+        log_ready(tmp_path, "call-add_goodbye")
+        assert tracker.poll() == {"call-add_world", "call-add_goodbye"}
+        assert "call-add_world" not in tracker.open_jobs
+        assert tracker.node_counts()["call-add_world"]["done"] == 1
+
+    def test_partial_log_line(self, tmp_path):
+        with open(tmp_path / "workflow.log", "w") as f:
+            f.write('ready :: job: "call-add_wor')
+        tracker = RunDirectoryTracker(str(tmp_path))
+        assert tracker.poll() == set()
+        with open(tmp_path / "workflow.log", "a") as f:
+            f.write('ld", callee: "add_world"\n')
+        assert tracker.poll() == {"call-add_world"}
+
+    def test_scatter_shards(self, complex_wdl, tmp_path, mtime_clock):
+        add_job(mtime_clock, tmp_path, "call-DynamicallyCombineIntervals", "outputs.json")
+        add_job(mtime_clock, tmp_path, "call-ImportGVCFs-0", "outputs.json")
+        add_job(mtime_clock, tmp_path, "call-ImportGVCFs-1", "error.json")
+        add_job(mtime_clock, tmp_path, "call-ImportGVCFs-2")
+
+        tracker = RunDirectoryTracker(str(tmp_path))
+        tracker.poll()
+        assert tracker.node_counts()["call-ImportGVCFs"] == {"queued": 0, "running": 1, "done": 1, "failed": 1}
+
+        pwm = ParsedWDLToMermaid(style_classes=STATUS_STYLE_CLASSES)
+        rows = "\n".join(status_flowchart(complex_wdl, tracker, pwm))
+        assert "1/3 done, 1 running, 1 failed" in rows
+
+    def test_follow_run_once(self, simple_wdl, tmp_path, mtime_clock):
+        run_dir = tmp_path / "run"
+        run_dir.mkdir()
+        add_job(mtime_clock, run_dir, "call-add_world", "outputs.json")
+        output = str(tmp_path / "status.mmd")
+
+        follow_run(
+            simple_wdl,
+            RunDirectoryTracker(str(run_dir)),
+            lambda: ParsedWDLToMermaid(style_classes=STATUS_STYLE_CLASSES),
+            output,
+            once=True,
+        )
+        with open(output) as f:
+            assert "classDef failed" in f.read()
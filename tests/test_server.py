@@ -0,0 +1,137 @@
+from miniwdl_viz.server import DiagramService, create_server
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+@pytest.fixture
+def server(tmp_path):
+    for name in ["simple.wdl", "imports.wdl", "nested.wdl"]:
+        shutil.copy(os.path.join(TEST_WDLS, name), tmp_path / name)
+    server = create_server(DiagramService(root=str(tmp_path)), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(server, route, data=None):
+    url = f"http://127.0.0.1:{server.server_address[1]}{route}"
+    body = None if data is None else json.dumps(data).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body)) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as exn:
+        return exn.code, exn.read().decode()
+
+
+class TestDiagramServer:
+    def test_mermaid_matches_cli(self, server, tmp_path):
+        cli = subprocess.run(
+            [sys.executable, "-m", "miniwdl_viz.mermaid_wdl", str(tmp_path / "simple.wdl"), "--print-flowchart", "--flowchart-dir", "TD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert fetch(server, "/mermaid?path=simple.wdl&arg=--flowchart-dir&arg=TD") == (200, cli.stdout)
+        assert fetch(server, "/mermaid", {"path": "simple.wdl", "args": ["--flowchart-dir", "TD"]}) == (200, cli.stdout)
+
+    def test_graph(self, server):
+        status, body = fetch(server, "/graph?path=nested.wdl&arg=--expand-subworkflows")
+        assert status == 200
+        assert any(node["id"].startswith("call-first-") for node in json.loads(body)["nodes"])
+
+    def test_cached_until_changed(self, server, tmp_path):
+        service = server.service
+        path = str(tmp_path / "simple.wdl")
+        first = service.parse(path)
+        assert service.parse(path) is first
+        with open(path, "a") as wdl_file:
+            wdl_file.write("\n")
+        assert service.parse(path) is not first
+
+    def test_reuses_unchanged_imports(self, server, tmp_path):
+        service = server.service
+        nested = service.parse(str(tmp_path / "nested.wdl"))
+        simple_doc = service.loader.documents[str(tmp_path / "simple.wdl")][1]
+        # imports.wdl and simple.wdl were typechecked for nested.wdl already
+        imports = service.parse(str(tmp_path / "imports.wdl"))
+        assert imports.wdl_doc is service.loader.documents[str(tmp_path / "imports.wdl")][1]
+
+        with open(tmp_path / "nested.wdl", "a") as wdl_file:
+            wdl_file.write("\n")
+        reparsed = service.parse(str(tmp_path / "nested.wdl"))
+        assert reparsed is not nested
+        assert reparsed.wdl_doc.imports[0].doc is imports.wdl_doc
+        assert service.loader.documents[str(tmp_path / "simple.wdl")][1] is simple_doc
+
+    def test_concurrent_requests(self, server):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fetch(server, "/mermaid?path=nested.wdl")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({result for result in results}) == 1
+        assert results[0][0] == 200
+
+    def test_errors(self, server):
+        assert fetch(server, "/mermaid?path=missing.wdl")[0] == 404
+        assert fetch(server, "/mermaid?path=../outside.wdl")[0] == 403
+        assert fetch(server, "/mermaid?path=simple.wdl&arg=--flowchart-dir&arg=XY")[0] == 400
+        assert fetch(server, "/mermaid")[0] == 400
+        assert fetch(server, "/unknown?path=simple.wdl")[0] == 404
+        assert fetch(server, "/health") == (200, "ok")
+
+    def test_invalid_graph_files(self, server, tmp_path):
+        (tmp_path / "broken.json").write_text("{not json")
+        (tmp_path / "dangling.json").write_text(json.dumps({
+            "name": "dangling",
+            "workflow_inputs": [],
+            "workflow_outputs": [],
+            "nodes": [{"id": "call-a", "name": "a", "section": "dangling", "type": "call"}],
+            "edges": [{"node_from": "call-missing", "node_to": "call-a", "workflow_ref_name": "x", "task_ref_name": "x", "edge_type": "input"}],
+        }))
+        (tmp_path / "notes.txt").write_text("hello")
+
+        status, body = fetch(server, "/mermaid", {"path": "broken.json"})
+        assert status == 422 and "invalid graph file" in body
+        assert fetch(server, "/mermaid", {"path": "dangling.json"})[0] == 422
+        assert fetch(server, "/graph", {"path": "notes.txt"})[0] == 400
+        # the server keeps answering afterwards
+        assert fetch(server, "/health") == (200, "ok")
+
+    def test_bad_arguments_leave_stderr_alone(self, server):
+        stderr = sys.stderr
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fetch(server, "/mermaid?path=simple.wdl&arg=--flowchart-dir&arg=XY")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sys.stderr is stderr
+        assert all(status == 400 and "invalid choice" in body for status, body in results)
+        status, body = fetch(server, "/mermaid?path=simple.wdl&arg=-h")
+        assert status == 400 and body.startswith("usage:")
+
+    def test_unexpected_errors(self, server, monkeypatch):
+        def fail(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(server.service, "mermaid", fail)
+        assert fetch(server, "/mermaid?path=simple.wdl") == (500, "RuntimeError: boom")
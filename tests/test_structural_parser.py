@@ -0,0 +1,53 @@
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, parse_wdl
+from miniwdl_viz.structural_parser import AmbiguousReference, parse_structural
+from miniwdl_viz.synthetic import SECTION_KINDS, write_wdl
+import os
+import pytest
+import WDL
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+def typechecked(wdl_file):
+    parser = MiniWDLParser(WDL.load(wdl_file))
+    parser.parse()
+    return parser
+
+
+class TestStructuralParser:
+    @pytest.mark.parametrize("wdl_name", sorted(os.listdir(TEST_WDLS)))
+    def test_parity(self, wdl_name):
+        wdl_file = os.path.join(TEST_WDLS, wdl_name)
+        assert parse_structural(wdl_file).to_dict() == typechecked(wdl_file).to_dict()
+
+    def test_synthetic_parity(self, tmp_path):
+        wdl_file = write_wdl(
+            str(tmp_path), 80, depth=2, fan_in=3, fan_out=3, section_kinds=SECTION_KINDS, decl_every=3, n_imports=2
+        )
+        assert parse_structural(wdl_file).to_dict() == typechecked(wdl_file).to_dict()
+
+    def test_type_errors_elsewhere(self, tmp_path):
+        wdl_file = tmp_path / "broken_task.wdl"
+        with open(os.path.join(TEST_WDLS, "simple.wdl")) as simple:
+            wdl_file.write_text(simple.read() + '\ntask broken {\n  command <<< >>>\n  output {\n    Int count = length(1)\n  }\n}\n')
+        with pytest.raises(WDL.Error.ValidationError):
+            WDL.load(str(wdl_file))
+        parsed = parse_wdl(str(wdl_file), structural=True)
+        assert parsed.to_dict() == typechecked(os.path.join(TEST_WDLS, "simple.wdl")).to_dict()
+
+    def test_fallback(self, tmp_path):
+        wdl_file = tmp_path / "wildcard.wdl"
+        wdl_file.write_text('workflow w {\n  call t\n  output { t.* }\n}\ntask t {\n  command {}\n  output { String out = "a" }\n}\n')
+        with pytest.raises(AmbiguousReference):
+            parse_structural(str(wdl_file))
+        assert [output["name"] for output in parse_wdl(str(wdl_file), structural=True).outputs] == ["t.out"]
+
+        unknown = tmp_path / "unknown.wdl"
+        unknown.write_text("version 1.0\nworkflow w {\n  Int x = missing + 1\n}\n")
+        with pytest.raises(WDL.Error.UnknownIdentifier):
+            parse_wdl(str(unknown), structural=True)
+
+    def test_expanded_subworkflows(self):
+        wdl_file = os.path.join(TEST_WDLS, "nested.wdl")
+        expanded = parse_wdl(wdl_file, subworkflow_depth=1, structural=True)
+        assert expanded.to_dict() == parse_wdl(wdl_file, subworkflow_depth=1).to_dict()
@@ -0,0 +1,72 @@
+from miniwdl_viz.miniwdl_parser import MiniWDLParser, parse_wdl
+from miniwdl_viz.graph_cache import GraphCache
+from os.path import dirname, realpath, join
+import WDL
+import pytest
+
+
+NESTED_WDL = join(dirname(realpath(__file__)), "test_wdls", "nested.wdl")
+
+
+@pytest.fixture
+def nested_doc():
+    return WDL.load(NESTED_WDL)
+
+
+def parse_nested(doc, depth):
+    parser = MiniWDLParser(doc, subworkflow_depth=depth)
+    parser.parse()
+    return parser
+
+
+def edge_pairs(parser):
+    return {(edge["node_from"], edge["node_to"]) for edge in parser.edges}
+
+
+class TestSubworkflows:
+    def test_opaque_by_default(self, nested_doc):
+        parser = parse_nested(nested_doc, 0)
+        assert [node["id"] for node in parser.nodes] == ["call-first", "call-second", "call-add_goodbye"]
+        assert all(node["type"] == "call" for node in parser.nodes)
+
+    def test_expand_one_level(self, nested_doc):
+        parser = parse_nested(nested_doc, 1)
+        node_map = parser.graph.node_map
+        assert node_map["call-first"]["type"] == "workflow_section"
+        assert node_map["call-first-call-add_world"]["section"] == "call-first"
+        # the nested sub-workflow stays opaque past the depth limit
+        assert node_map["call-first-call-swipe_test"]["type"] == "call"
+        pairs = edge_pairs(parser)
+        # outputs are wired from the inner nodes behind them, inputs to the inner consumers
+        assert ("call-first-call-swipe_test", "call-second-call-add_world") in pairs
+        assert ("call-second-call-swipe_test", "call-add_goodbye") in pairs
+        assert not any("call-first" in pair or "call-second" in pair for pair in pairs)
+
+    def test_expand_all_levels(self, nested_doc):
+        parser = parse_nested(nested_doc, 10)
+        node_map = parser.graph.node_map
+        assert node_map["call-second-call-swipe_test"]["type"] == "workflow_section"
+        assert node_map["call-second-call-swipe_test-call-add_farewell"]["section"] == "call-second-call-swipe_test"
+        pairs = edge_pairs(parser)
+        assert ("call-first-call-swipe_test-call-add_farewell", "call-second-call-add_world") in pairs
+        assert ("call-second-call-swipe_test-call-add_farewell", "call-add_goodbye") in pairs
+        # the consumer keeps its own reference name
+        edge = next(edge for edge in parser.edges if edge["node_to"] == "call-add_goodbye" and edge["node_from"].startswith("call-"))
+        assert edge["workflow_ref_name"] == "second.out_farewell"
+        # each callee is only parsed once, however many times it's called
+        assert len(parser.templates) == 2
+
+    def test_graph_is_consistent(self, nested_doc):
+        parser = parse_nested(nested_doc, 10)
+        node_ids = set(parser.graph.node_map) | {"WorkflowInput", "HardcodedVariable"}
+        assert len(node_ids) == len(parser.nodes) + 2
+        for edge in parser.edges:
+            assert edge["node_from"] in node_ids
+            assert edge["node_to"] in node_ids
+
+    def test_cache_variant(self, tmp_path):
+        cache = GraphCache(cache_dir=str(tmp_path))
+        opaque = parse_wdl(NESTED_WDL, cache=cache)
+        expanded = parse_wdl(NESTED_WDL, cache=cache, subworkflow_depth=10)
+        assert len(expanded.nodes) > len(opaque.nodes)
+        assert parse_wdl(NESTED_WDL, cache=cache, subworkflow_depth=10).to_dict() == expanded.to_dict()
@@ -0,0 +1,36 @@
+from miniwdl_viz.miniwdl_parser import MiniWDLParser
+from miniwdl_viz.synthetic import SECTION_KINDS, generate_wdl, write_wdl
+import collections
+import pytest
+import WDL
+
+
+class TestSyntheticWorkflow:
+    def test_valid_wdl(self, tmp_path):
+        wdl_path = write_wdl(
+            str(tmp_path), 60, depth=2, fan_in=3, fan_out=4, section_kinds=SECTION_KINDS, decl_every=3, n_imports=2
+        )
+        doc = WDL.load(wdl_path)
+        parser = MiniWDLParser(doc)
+        parser.parse()
+        types = collections.Counter(node["type"] for node in parser.nodes)
+        with open(wdl_path) as wdl_file:
+            assert types["decl"] == wdl_file.read().count("String d") > 0
+        assert {node["name"].split()[0] for node in parser.nodes if node["type"] == "workflow_section"} >= {"range(2)"}
+        assert any(node["name"].endswith('!= ""') for node in parser.nodes if node["type"] == "workflow_section")
+        assert len(doc.imports) == 2
+        # an output is read by fan_out consecutive calls
+        readers = collections.Counter(edge["node_from"] for edge in parser.edges if edge["node_from"].startswith("call-"))
+        assert max(readers.values()) >= 4
+
+    def test_defaults_unchanged(self):
+        assert "scatter" in generate_wdl(10) and "if (" not in generate_wdl(10)
+
+    def test_regressions(self):
+        # the suite itself lives in the repository's benchmarks, which aren't installed
+        regressions = pytest.importorskip("benchmarks.bench_suite").regressions
+        baselines = {"parse/50": {"seconds": 0.1, "relative": 1.0, "peak_kb": 100}}
+        assert regressions({"parse/50": {"seconds": 0.15, "relative": 1.5, "peak_kb": 110}}, baselines, 2.0, 1.25, 0.1) == []
+        assert len(regressions({"parse/50": {"seconds": 0.3, "relative": 3.0, "peak_kb": 400}}, baselines, 2.0, 1.25, 0.1)) == 2
+        # three times the seconds on a machine three times slower is no regression
+        assert regressions({"parse/50": {"seconds": 0.3, "relative": 1.0, "peak_kb": 100}}, baselines, 2.0, 1.25, 0.3) == []
@@ -0,0 +1,82 @@
+from miniwdl_viz.mermaid_wdl import ParsedWDLToMermaid, parsed_wdl_to_mermaid
+from miniwdl_viz.structural_parser import StructuralParser
+from miniwdl_viz.watch import PollingWatcher, WorkflowWatcher
+from tests.mtime_clock import mtime_clock
+from os.path import dirname, realpath, join
+import shutil
+import pytest
+
+
+TEST_WDLS = join(dirname(realpath(__file__)), "test_wdls")
+
+
+@pytest.fixture
+def watched(tmp_path):
+    shutil.copy(join(TEST_WDLS, "imports.wdl"), tmp_path)
+    shutil.copy(join(TEST_WDLS, "simple.wdl"), tmp_path)
+    output = str(tmp_path / "imports.mmd")
+
+    def render(miniwdl_parser):
+        pwm = ParsedWDLToMermaid()
+        return {output: "".join(pwm.indented_rows(parsed_wdl_to_mermaid(miniwdl_parser, pwm)))}
+
+    watcher = WorkflowWatcher(str(tmp_path / "imports.wdl"), render, debounce=0.1)
+    assert watcher.update() == [output]
+    return watcher, tmp_path, output
+
+
+class TestWatch:
+    def test_debounce(self, tmp_path, mtime_clock):
+        path = tmp_path / "a.wdl"
+        path.write_text("a")
+        watcher = PollingWatcher([str(path)], debounce=0.1)
+
+        mtime_clock.touch(path, "ab")
+        assert watcher.poll(now=10.0) == set()
+        mtime_clock.touch(path, "abc")
+        assert watcher.poll(now=10.05) == set()
+        assert watcher.poll(now=10.2) == {str(path)}
+        assert watcher.poll(now=10.5) == set()
+
+    def test_rewrites_only_on_change(self, watched, mtime_clock):
+        watcher, tmp_path, output = watched
+        simple = tmp_path / "simple.wdl"
+        loaded_simple = watcher.loader.documents[str(simple)][1]
+
+        # touched without changing the diagram
+        mtime_clock.touch(tmp_path / "imports.wdl")
+        watcher.poll_once(now=1.0)
+        assert watcher.poll_once(now=2.0) == []
+        assert watcher.loader.documents[str(simple)][1] is loaded_simple
+
+        mtime_clock.touch(tmp_path / "imports.wdl", (tmp_path / "imports.wdl").read_text().replace("call simple.add_world", "call simple.add_world as first_world").replace("add_world.out_world", "first_world.out_world"))
+        watcher.poll_once(now=3.0)
+        assert watcher.poll_once(now=4.0) == [output]
+        assert "call-first_world" in open(output).read()
+        # the unchanged import was not re-parsed
+        assert watcher.loader.documents[str(simple)][1] is loaded_simple
+
+    def test_watches_imports(self, watched, mtime_clock):
+        watcher, tmp_path, output = watched
+        simple = tmp_path / "simple.wdl"
+        assert str(simple) in watcher.watcher.stats
+        loaded_imports = watcher.loader.documents[str(tmp_path / "imports.wdl")][1]
+
+        mtime_clock.touch(simple, simple.read_text().replace("echo world", "echo earth"))
+        watcher.poll_once(now=1.0)
+        # the diagram is unchanged, so nothing is rewritten, but both documents were reloaded
+        assert watcher.poll_once(now=2.0) == []
+        assert watcher.loader.documents[str(tmp_path / "imports.wdl")][1] is not loaded_imports
+        assert "earth" in str(watcher.loader.documents[str(simple)][1].tasks[0].command)
+
+    def test_structural(self, tmp_path):
+        shutil.copy(join(TEST_WDLS, "imports.wdl"), tmp_path)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), tmp_path)
+        parsers = []
+        watcher = WorkflowWatcher(str(tmp_path / "imports.wdl"), lambda parser: parsers.append(parser) or {}, structural=True)
+        watcher.update()
+
+        assert isinstance(parsers[0], StructuralParser)
+        # imports are never loaded, so only the workflow itself is watched
+        assert not watcher.loader.documents
+        assert list(watcher.watcher.stats) == [str(tmp_path / "imports.wdl")]
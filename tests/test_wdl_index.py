@@ -0,0 +1,137 @@
+from miniwdl_viz.wdl_index import WdlIndex, main
+import json
+import os
+import shutil
+import sqlite3
+import pytest
+
+TEST_WDLS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_wdls")
+
+
+@pytest.fixture
+def wdl_tree(tmp_path):
+    tree = tmp_path / "wdls"
+    shutil.copytree(TEST_WDLS, tree)
+    return tree
+
+
+def calls(found):
+    return [(os.path.basename(caller["path"]), caller["workflow"], caller["call"]) for caller in found]
+
+
+class TestWdlIndex:
+    def test_build(self, wdl_tree, tmp_path):
+        index = WdlIndex(str(tmp_path / "index.sqlite"))
+        assert index.build([str(wdl_tree)]) == {"files": 5, "parsed": 5, "unchanged": 0, "removed": 0, "failed": 0}
+        [add_world] = index.callables("add_world")
+        assert add_world["path"] == str(wdl_tree / "simple.wdl")
+        assert add_world["kind"] == "task"
+        assert add_world["inputs"] == [{"name": "input_file", "type": "File"}, {"name": "docker_image_id", "type": "String"}]
+        assert add_world["outputs"] == [{"name": "out_world", "type": "File"}]
+        # draft-2 inputs are the task's unbound declarations
+        [genotype] = index.callables("GenotypeGVCFs")
+        assert {"name": "workspace_tar", "type": "File"} in genotype["inputs"]
+
+        assert calls(index.callers("add_goodbye")) == [
+            ("nested.wdl", "nested_test", "add_goodbye"),
+            ("references.wdl", "references", "greet"),
+            ("simple.wdl", "swipe_test", "add_goodbye"),
+        ]
+        greet = index.callers("add_goodbye", str(wdl_tree / "simple.wdl"))[1]
+        assert greet["call"] == "greet"
+        assert greet["callee_path"] == str(wdl_tree / "simple.wdl")
+        assert greet["outputs_used"] == ["out_goodbye"]
+        assert index.callers("add_goodbye", str(wdl_tree / "nested.wdl")) == []
+
+    def test_impact(self, wdl_tree, tmp_path):
+        index = WdlIndex(str(tmp_path / "index.sqlite"))
+        index.build([str(wdl_tree)])
+        affected = index.impact("add_world", str(wdl_tree / "simple.wdl"))
+        assert [(caller["depth"],) + call for caller, call in zip(affected, calls(affected))] == [
+            (1, "imports.wdl", "imports_test", "add_world"),
+            (1, "simple.wdl", "swipe_test", "add_world"),
+            (2, "nested.wdl", "nested_test", "first"),
+            (2, "nested.wdl", "nested_test", "second"),
+            (2, "imports.wdl", "imports_test", "swipe_test"),
+        ]
+        # add_farewell's output is only passed on by swipe_test's own outputs
+        assert calls(index.impact("add_farewell", outputs=["out_farewell"])) == [
+            ("simple.wdl", "swipe_test", "add_farewell"),
+            ("imports.wdl", "imports_test", "swipe_test"),
+            ("nested.wdl", "nested_test", "first"),
+            ("nested.wdl", "nested_test", "second"),
+        ]
+        assert index.impact("add_farewell", outputs=["unused"]) == []
+
+    def test_incremental(self, wdl_tree, tmp_path):
+        index = WdlIndex(str(tmp_path / "index.sqlite"))
+        index.build([str(wdl_tree)])
+        assert index.build([str(wdl_tree)])["parsed"] == 0
+
+        # touched without changes, only the content hash is checked
+        os.utime(wdl_tree / "simple.wdl", ns=(1, 1))
+        assert index.build([str(wdl_tree)])["parsed"] == 0
+
+        imports = (wdl_tree / "imports.wdl").read_text()
+        (wdl_tree / "imports.wdl").write_text(imports.replace("call simple.add_world {", "call simple.add_world as world {").replace("add_world.out_world", "world.out_world"))
+        (wdl_tree / "references.wdl").unlink()
+        (wdl_tree / "broken.wdl").write_text("version 1.0\nworkflow {")
+        stats = index.build([str(wdl_tree)])
+        assert (stats["parsed"], stats["unchanged"], stats["removed"], stats["failed"]) == (2, 3, 1, 1)
+        assert calls(index.callers("add_world", str(wdl_tree / "simple.wdl"))) == [
+            ("imports.wdl", "imports_test", "world"),
+            ("simple.wdl", "swipe_test", "add_world"),
+        ]
+        assert [path for path, _ in index.errors()] == [str(wdl_tree / "broken.wdl")]
+        count = index.connection.execute("SELECT count(*) FROM calls WHERE call = 'greet'").fetchone()[0]
+        assert count == 0
+
+    def test_version(self, wdl_tree, tmp_path):
+        index_file = str(tmp_path / "index.sqlite")
+        WdlIndex(index_file).build([str(wdl_tree)])
+        with sqlite3.connect(index_file) as connection:
+            connection.execute("UPDATE meta SET value = 'old' WHERE key = 'version'")
+            # version 1 stored resolved import paths
+            connection.execute("DROP TABLE imports")
+            connection.execute("CREATE TABLE imports (document_id INTEGER NOT NULL, namespace TEXT NOT NULL, uri TEXT NOT NULL, path TEXT)")
+        # an index written by another version is dropped and rebuilt
+        index = WdlIndex(index_file)
+        assert index.build([str(wdl_tree)])["parsed"] == 5
+        assert len(index.callers("add_world", str(wdl_tree / "simple.wdl"))) == 2
+
+    def test_imports_resolved_when_queried(self, tmp_path):
+        tree = tmp_path / "wdls"
+        (tree / "workflows").mkdir(parents=True)
+        shutil.copy(os.path.join(TEST_WDLS, "imports.wdl"), tree / "workflows")
+        index = WdlIndex(str(tmp_path / "index.sqlite"))
+        index.build([str(tree)])
+        # simple.wdl isn't there yet
+        assert [caller["callee_path"] for caller in index.callers("add_world")] == [None]
+
+        # found through the import path, without re-reading the importing document
+        (tree / "libs").mkdir()
+        shutil.copy(os.path.join(TEST_WDLS, "simple.wdl"), tree / "libs")
+        index = WdlIndex(str(tmp_path / "index.sqlite"), import_path=[str(tree / "libs")])
+        assert index.build([str(tree)])["parsed"] == 1
+        simple = str(tree / "libs" / "simple.wdl")
+        assert calls(index.callers("add_world", simple)) == [("simple.wdl", "swipe_test", "add_world"), ("imports.wdl", "imports_test", "add_world")]
+        # queries use the import path of the last build
+        assert len(WdlIndex(str(tmp_path / "index.sqlite")).callers("add_world", simple)) == 2
+
+        # moved next to the importer, which miniwdl tries before the import path
+        shutil.move(simple, tree / "workflows")
+        index.build([str(tree)])
+        moved = str(tree / "workflows" / "simple.wdl")
+        assert [caller["callee_path"] for caller in index.callers("add_world", moved)] == [moved, moved]
+
+    def test_cli(self, wdl_tree, tmp_path, capsys):
+        index_file = str(tmp_path / "index.sqlite")
+        main(["build", str(wdl_tree), "--index", index_file])
+        assert "Indexed 5 files, 5 parsed" in capsys.readouterr().err
+        main(["impact", "add_goodbye", "--file", str(wdl_tree / "simple.wdl"), "--output", "out_goodbye", "--index", index_file])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == f"1 {wdl_tree / 'nested.wdl'}: nested_test.add_goodbye (uses out_goodbye)"
+        main(["callers", "imports_test", "-j", "--index", index_file])
+        assert [caller["call"] for caller in json.loads(capsys.readouterr().out)] == ["first", "second"]
+        with pytest.raises(SystemExit):
+            main(["callers", "nope", "--index", index_file])
@@ -0,0 +1,78 @@
+from miniwdl_viz.wdl_loader import DocumentLoader
+import WDL
+from os.path import dirname, realpath, join
+import shutil
+import threading
+
+
+TEST_WDLS = join(dirname(realpath(__file__)), "test_wdls")
+
+
+class TestDocumentLoader:
+    def test_reuses_unchanged(self):
+        loader = DocumentLoader()
+        doc = loader.load(join(TEST_WDLS, "imports.wdl"))
+
+        assert doc.workflow.name == "imports_test"
+        assert doc.imports[0].doc.workflow is not None
+        assert loader.load(join(TEST_WDLS, "imports.wdl")) is doc
+
+    def test_reloads_changed_import(self, tmp_path):
+        shutil.copy(join(TEST_WDLS, "imports.wdl"), tmp_path)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), tmp_path)
+        loader = DocumentLoader()
+        doc = loader.load(str(tmp_path / "imports.wdl"))
+
+        simple = tmp_path / "simple.wdl"
+        simple.write_text(simple.read_text().replace("echo world", "echo earth"))
+        reloaded = loader.load(str(tmp_path / "imports.wdl"))
+
+        assert reloaded is not doc
+        assert "echo earth" in str(reloaded.imports[0].doc.tasks[0].command)
+
+    def test_shares_imports_between_workflows(self, tmp_path, monkeypatch):
+        shutil.copy(join(TEST_WDLS, "imports.wdl"), tmp_path)
+        shutil.copy(join(TEST_WDLS, "simple.wdl"), tmp_path)
+        (tmp_path / "other.wdl").write_text(
+            'version 1.0\nimport "simple.wdl" as lib\nworkflow other {\n  call lib.add_world\n}\n'
+        )
+        parsed = []
+        parse_document = WDL.parse_document
+        monkeypatch.setattr(WDL, "parse_document", lambda source_text, uri: parsed.append(uri) or parse_document(source_text, uri=uri))
+
+        # one loader per batch worker
+        loader = DocumentLoader()
+        imports = loader.load(str(tmp_path / "imports.wdl"))
+        other = loader.load(str(tmp_path / "other.wdl"))
+
+        assert other.imports[0].doc is imports.imports[0].doc
+        assert parsed == [str(tmp_path / "imports.wdl"), "simple.wdl", str(tmp_path / "other.wdl")]
+
+        # only the changed document and the documents importing it are parsed again
+        other_wdl = tmp_path / "other.wdl"
+        other_wdl.write_text(other_wdl.read_text().replace("workflow other", "workflow renamed"))
+        assert loader.load(str(tmp_path / "other.wdl")).workflow.name == "renamed"
+        assert loader.load(str(tmp_path / "imports.wdl")) is imports
+        simple = tmp_path / "simple.wdl"
+        simple.write_text(simple.read_text().replace("echo world", "echo earth"))
+        loader.load(str(tmp_path / "imports.wdl"))
+        assert parsed[3:] == [str(tmp_path / "other.wdl"), "simple.wdl", str(tmp_path / "imports.wdl")]
+
+    def test_bounded(self):
+        loader = DocumentLoader(max_documents=2)
+        simple = loader.load(join(TEST_WDLS, "simple.wdl"))
+        loader.load(join(TEST_WDLS, "imports.wdl"))
+        # simple.wdl, imported by imports.wdl, is now the most recently used
+        assert loader.load(join(TEST_WDLS, "simple.wdl")) is simple
+        loader.load(join(TEST_WDLS, "references.wdl"))
+
+        assert list(loader.documents) == [join(TEST_WDLS, "simple.wdl"), join(TEST_WDLS, "references.wdl")]
+
+    def test_loads_off_the_main_thread(self):
+        loader = DocumentLoader()
+        docs = []
+        thread = threading.Thread(target=lambda: docs.append(loader.load(join(TEST_WDLS, "simple.wdl"))))
+        thread.start()
+        thread.join()
+
+        assert docs[0].workflow.name == "swipe_test"
@@ -0,0 +1,25 @@
+from tests.test_miniwdl_parser import simple_wdl, complex_wdl
+from miniwdl_viz.workflow_graph import WorkflowGraph
+
+
+class TestWorkflowGraph:
+    def test_indexes(self, simple_wdl):
+        graph = WorkflowGraph(simple_wdl.nodes, simple_wdl.edges)
+        assert "call-add_world" in graph
+        assert graph.get_node("call-add_goodbye")["name"] == "add_goodbye"
+        assert len(graph.children("swipe_test")) == 3
+        assert [edge["node_to"] for edge in graph.edges_from("call-add_world")] == [
+            "call-add_goodbye"
+        ]
+        assert len(graph.edges_to("call-add_farewell")) == 2
+        assert graph.edges_from("call-add_farewell") == []
+
+    def test_section_children(self, complex_wdl):
+        graph = complex_wdl.graph
+        children = [node["id"] for node in graph.children("scatter-L120C3-idx")]
+        assert children == [
+            "call-ImportGVCFs",
+            "call-GenotypeGVCFs",
+            "call-HardFilterAndMakeSitesOnlyVcf",
+        ]
+        assert sum(len(edges) for edges in graph.out_edges.values()) == len(graph.edges)